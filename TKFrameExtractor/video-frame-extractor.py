@@ -5,25 +5,277 @@
 - tkinterベースのUI
 - サンプリングタイミング指定可能
 - 出力画像サイズをカスタマイズ可能
+- コマンドラインからフォルダ内の動画を一括処理可能
+
+使い方:
+    python video-frame-extractor.py                                  # GUIを起動
+    python video-frame-extractor.py batch 動画フォルダ 出力フォルダ [--workers N]
+    python video-frame-extractor.py rebuild-index 出力フォルダ/scene_index.ndjson [--threshold 0.08]
+    python video-frame-extractor.py benchmark-analysis 動画ファイル [--width 640]
+    python video-frame-extractor.py benchmark-progress 動画ファイル [--interval 0.1]
 """
 
 import os
+import json
+import argparse
+import queue
+import hashlib
 import cv2
 import numpy as np
 import tkinter as tk
 from tkinter import filedialog, ttk, messagebox
 from skimage.metrics import structural_similarity as ssim
-from threading import Thread
+from threading import Thread, Lock, Event
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from collections import deque, namedtuple
 from PIL import Image, ImageTk
 import time
 from datetime import timedelta
 
+
+class PipelineStats:
+    """パイプラインの各ステージ（デコード・変化検出・エンコード・書き込み）の処理量を集計するクラス"""
+
+    STAGES = ('decode', 'analyze', 'encode', 'write')
+    STAGE_NAMES = {'decode': 'デコード', 'analyze': '変化検出', 'encode': 'エンコード', 'write': '書き込み'}
+    # 変化検出の判定段階（どの段階で判定が確定したか）
+    TIERS = ('prefilter', 'ssim', 'contour', 'changed')
+    TIER_NAMES = {'prefilter': '事前判定で除外', 'ssim': 'SSIMで除外', 'contour': '輪郭判定で除外', 'changed': '変化あり'}
+
+    def __init__(self):
+        self._lock = Lock()
+        self._start = time.perf_counter()
+        self._counts = {stage: 0 for stage in self.STAGES}
+        self._busy = {stage: 0.0 for stage in self.STAGES}
+        self._tiers = {tier: 0 for tier in self.TIERS}
+
+    def add(self, stage, elapsed):
+        """ステージの処理1件分の所要時間（秒）を記録"""
+        with self._lock:
+            self._counts[stage] += 1
+            self._busy[stage] += elapsed
+
+    def add_tier(self, tier):
+        """変化検出の判定が確定した段階を記録"""
+        with self._lock:
+            self._tiers[tier] += 1
+
+    def snapshot(self, queue_depth=0):
+        """
+        現在の集計値を返す
+
+        Returns:
+        --------
+        dict
+            ステージ名ごとに count（処理件数）、fps（経過時間あたりの処理件数）、
+            avg_ms（1件あたりの平均処理時間）、busy（処理時間の合計秒）を持つ辞書。
+            queue_depth（デコードキューの滞留数）、elapsed（経過秒）、
+            tiers（判定段階ごとの件数）も含む。
+        """
+        elapsed = max(time.perf_counter() - self._start, 1e-6)
+        with self._lock:
+            stats = {
+                stage: {
+                    'count': self._counts[stage],
+                    'fps': self._counts[stage] / elapsed,
+                    'avg_ms': self._busy[stage] * 1000 / self._counts[stage] if self._counts[stage] else 0.0,
+                    'busy': self._busy[stage],
+                }
+                for stage in self.STAGES
+            }
+            stats['tiers'] = dict(self._tiers)
+        stats['queue_depth'] = queue_depth
+        stats['elapsed'] = elapsed
+        return stats
+
+    @classmethod
+    def format_stages(cls, stats):
+        """ステージごとの処理件数と処理時間を文字列にする"""
+        parts = [
+            f"{cls.STAGE_NAMES[stage]} {stats[stage]['count']}件 "
+            f"(合計 {stats[stage]['busy']:.1f}秒, 平均 {stats[stage]['avg_ms']:.1f}ms)"
+            for stage in cls.STAGES
+        ]
+        return "処理時間: " + ", ".join(parts)
+
+    @classmethod
+    def format_tiers(cls, tiers):
+        """判定段階ごとの件数を割合付きの文字列にする"""
+        total = sum(tiers.values())
+        if total == 0:
+            return "変化検出: 0フレーム"
+        parts = [f"{cls.TIER_NAMES[tier]} {tiers[tier]} ({tiers[tier] * 100 / total:.1f}%)" for tier in cls.TIERS]
+        return f"変化検出 {total}フレーム: " + ", ".join(parts)
+
+
+# 変化検出の結果
+# changed: 保存対象か, tier: 判定が確定した段階, prefilter_diff: 縮小画像の平均輝度差,
+# ssim: SSIM（未計算なら None）, max_area: 最大の変化領域の面積（元の解像度換算、未計算なら None）,
+# boxes: 最小変化領域を超えた変化の外接矩形 [x, y, w, h]（元の解像度の座標）
+ChangeResult = namedtuple('ChangeResult', ['changed', 'tier', 'prefilter_diff', 'ssim', 'max_area', 'boxes'])
+
+
+class ChangeIndex:
+    """
+    フレームごとの変化検出結果を NDJSON ファイルに逐次記録するクラス
+
+    1行目は動画と抽出設定のメタ情報（type: meta）、以降は判定したフレームごとの
+    記録（type: frame）。再開時は再開位置までの記録を引き継ぐ。
+    """
+
+    def __init__(self, path, meta, resume_frame=None):
+        records = []
+        if resume_frame is not None and os.path.exists(path):
+            _, records = load_change_index(path)
+            records = [record for record in records if record['frame'] <= resume_frame]
+        self.path = path
+        self.meta = meta
+        self._file = open(path, 'w', encoding='utf-8')
+        self._write(dict(meta, type='meta'))
+        for record in records:
+            self._write(dict(record, type='frame'))
+
+    def _write(self, data):
+        self._file.write(json.dumps(data, ensure_ascii=False) + "\n")
+
+    def add(self, record):
+        """フレーム1件分の記録を追加"""
+        self._write(dict(record, type='frame'))
+
+    def flush(self):
+        """書き込みバッファをファイルに反映"""
+        self._file.flush()
+
+    def close(self):
+        """ファイルを閉じる"""
+        if not self._file.closed:
+            self._file.close()
+
+
+def load_change_index(path):
+    """
+    変化インデックス（.ndjson または .npz）を読み込む
+
+    Returns:
+    --------
+    tuple
+        (メタ情報の辞書, フレームごとの記録の辞書のリスト)
+    """
+    if path.lower().endswith('.npz'):
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            boxes = {}
+            for frame, x, y, w, h in data['boxes'].tolist():
+                boxes.setdefault(frame, []).append([x, y, w, h])
+            records = []
+            for i, frame in enumerate(data['frame'].tolist()):
+                ssim_score = float(data['ssim'][i])
+                max_area = float(data['max_area'][i])
+                records.append({
+                    'frame': frame,
+                    'time': float(data['time'][i]),
+                    'forced': bool(data['forced'][i]),
+                    'prefilter': float(data['prefilter'][i]),
+                    'ssim': None if np.isnan(ssim_score) else ssim_score,
+                    'max_area': None if np.isnan(max_area) else max_area,
+                    'changed': bool(data['changed'][i]),
+                    'saved': bool(data['saved'][i]),
+                    'boxes': boxes.get(frame, []),
+                })
+        return meta, records
+
+    meta = {}
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                data = json.loads(line)
+            except ValueError:
+                break  # 異常終了で途中までしか書かれていない行
+            if data.pop('type', 'frame') == 'meta':
+                meta = data
+            else:
+                records.append(data)
+    return meta, records
+
+
+def save_change_index_npz(path, meta, records):
+    """変化インデックスを NumPy の .npz 形式で保存"""
+    def optional(value):
+        return np.nan if value is None else value
+
+    boxes = [[r['frame']] + list(box) for r in records for box in r['boxes']]
+    np.savez_compressed(
+        path,
+        meta=np.array(json.dumps(meta, ensure_ascii=False)),
+        frame=np.array([r['frame'] for r in records], dtype=np.int64),
+        time=np.array([r['time'] for r in records], dtype=np.float64),
+        forced=np.array([r['forced'] for r in records], dtype=bool),
+        prefilter=np.array([r['prefilter'] for r in records], dtype=np.float32),
+        ssim=np.array([optional(r['ssim']) for r in records], dtype=np.float32),
+        max_area=np.array([optional(r['max_area']) for r in records], dtype=np.float32),
+        changed=np.array([r['changed'] for r in records], dtype=bool),
+        saved=np.array([r['saved'] for r in records], dtype=bool),
+        boxes=np.array(boxes, dtype=np.int32).reshape(-1, 5),
+    )
+
+
+def rebuild_from_index(index_path, diff_threshold=None, min_area_threshold=None, prefilter_threshold=None):
+    """
+    変化インデックスに記録したスコアから、別の閾値で保存対象のフレームを求め直す（動画のデコード不要）
+
+    事前判定で除外されたフレームは SSIM と変化領域が記録されていないため、
+    記録時より小さい prefilter_threshold を指定した場合は判定できないフレームが残る。
+
+    Returns:
+    --------
+    dict
+        frames（保存対象のフレーム番号のリスト）と undetermined（判定できなかったフレーム数）
+    """
+    meta, records = load_change_index(index_path)
+    if diff_threshold is None:
+        diff_threshold = meta.get('diff_threshold', 0.05)
+    if min_area_threshold is None:
+        min_area_threshold = meta.get('min_area_threshold', 500)
+    if prefilter_threshold is None:
+        prefilter_threshold = meta.get('prefilter_threshold', 0.5)
+
+    frames = [0]  # 最初のフレームは常に保存
+    undetermined = 0
+    for record in records:
+        if record['forced']:
+            frames.append(record['frame'])
+        elif record['prefilter'] <= prefilter_threshold:
+            continue
+        elif record['ssim'] is None or record['max_area'] is None:
+            undetermined += 1
+        elif 1.0 - record['ssim'] > diff_threshold and record['max_area'] > min_area_threshold:
+            frames.append(record['frame'])
+    return {'frames': frames, 'undetermined': undetermined}
+
+
 class VideoFrameExtractor:
+    # サンプリング間隔がこの秒数以上の場合、auto モードではシークで読み飛ばす
+    SEEK_MIN_SECONDS = 2.0
+    # 事前判定に使う縮小画像の幅
+    PREFILTER_WIDTH = 64
+    # 出力フォルダに保存するジョブ情報（再開用）のファイル名
+    MANIFEST_NAME = "extraction_job.json"
+    # 変化インデックスのファイル名（拡張子なし）
+    INDEX_NAME = "scene_index"
+
     def __init__(self, video_path=None, output_dir=None, 
                  diff_threshold=0.05, min_area_threshold=500, 
                  blur_size=5, sample_interval=0, resize_output=False, 
                  output_width=None, output_height=None, force_sampling=False,
-                 output_format='jpg'):  # 追加
+                 output_format='jpg', analysis_workers=None, writer_workers=2,
+                 queue_size=32, analysis_width=None, sampling_mode='auto',
+                 prefilter_threshold=0.5, resume=True, checkpoint_interval=5.0,
+                 progress_interval=0.1, index_format=None, jpeg_quality=95,
+                 png_compression=3, webp_quality=90, roi=None, ignore_regions=None):
         """
         動画フレーム抽出のメインクラス
         
@@ -40,7 +292,8 @@ class VideoFrameExtractor:
         blur_size : int
             ノイズ除去用ブラーのサイズ
         sample_interval : float
-            サンプリング間隔（秒）。0の場合はすべてのフレームを処理
+            サンプリング間隔（秒）。0の場合はすべてのフレームを処理。
+            指定した場合は間隔ごとのフレームだけをデコードし、その間は読み飛ばす
         resize_output : bool
             出力サイズ変更フラグ
         output_width : int
@@ -50,7 +303,46 @@ class VideoFrameExtractor:
         force_sampling : bool
             サンプリング間隔ごとにフレームを強制保存するフラグ
         output_format : str
-            出力画像のフォーマット ('jpg' または 'png')
+            出力画像のフォーマット ('jpg'、'png' または 'webp')
+        analysis_workers : int
+            変化検出を行うワーカースレッド数。None の場合はCPUコア数から決定
+        writer_workers : int
+            画像のエンコードと書き込みを行うワーカースレッド数
+        queue_size : int
+            デコード済みフレームを保持するキューの最大長（メモリ使用量の上限）
+        analysis_width : int
+            変化検出を行う解析解像度の幅。None の場合は元の解像度で解析する。
+            縮小した画像で変化検出を行い、min_area_threshold は縮小率に合わせて換算する。
+            保存される画像は常に元の解像度から作成される
+        sampling_mode : str
+            サンプリング時の読み飛ばし方法。
+            'grab' は grab() でデコード結果を取り出さずに進める、
+            'seek' は CAP_PROP_POS_FRAMES で直前のキーフレームからシークする、
+            'auto' は間隔が SEEK_MIN_SECONDS 以上なら 'seek'、それ以外は 'grab'
+        prefilter_threshold : float
+            事前判定の閾値。幅 PREFILTER_WIDTH の縮小画像の平均輝度差（0～255）が
+            この値以下のフレームは SSIM を計算せずに「変化なし」とする
+        resume : bool
+            出力フォルダに未完了のジョブ情報があり設定が一致する場合、前回の続きから再開する
+        checkpoint_interval : float
+            ジョブ情報を書き出す間隔（秒）
+        progress_interval : float
+            進捗・プレビューのコールバックを呼び出す最小間隔（秒）。0 の場合は毎フレーム呼び出す
+        index_format : str
+            変化インデックスの出力形式 ('ndjson' または 'npz')。None の場合は出力しない。
+            出力する場合は、事前判定を通過したフレームについて SSIM と変化領域を常に計算し、
+            後から rebuild_from_index で閾値を変えて結果を求め直せるようにする
+        jpeg_quality : int
+            JPEG の品質 (0～100)
+        png_compression : int
+            PNG の圧縮レベル (0～9)。大きいほどファイルは小さくなるがエンコードは遅くなる
+        webp_quality : int
+            WebP の品質 (1～100)。100 より大きい値を指定するとロスレスになる
+        roi : list
+            変化検出を行う範囲 (x, y, w, h) のリスト（元の解像度の座標）。None の場合はフレーム全体。
+            ROI を囲む範囲だけを切り出して解析するため、処理量も減る
+        ignore_regions : list
+            変化検出から除外する範囲 (x, y, w, h) のリスト（時計やマウスカーソル、通知領域など）
         """
         self.video_path = video_path
         self.output_dir = output_dir
@@ -63,6 +355,35 @@ class VideoFrameExtractor:
         self.output_height = output_height
         self.force_sampling = force_sampling
         self.output_format = output_format.lower()  # jpg または png
+        self.analysis_workers = analysis_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.writer_workers = max(1, writer_workers)
+        self.queue_size = max(2, queue_size)
+        self.analysis_width = analysis_width
+        self.sampling_mode = sampling_mode
+        self.prefilter_threshold = prefilter_threshold
+        self.resume = resume
+        self.checkpoint_interval = checkpoint_interval
+        self.progress_interval = progress_interval
+        self.index_format = index_format.lower() if index_format else None
+        self.jpeg_quality = int(jpeg_quality)
+        self.png_compression = int(png_compression)
+        self.webp_quality = int(webp_quality)
+        self.roi = [tuple(int(v) for v in r) for r in roi] if roi else None
+        self.ignore_regions = [tuple(int(v) for v in r) for r in ignore_regions] if ignore_regions else None
+        self.last_stats = None
+        
+        # 再開用の状態（保存済みファイル名と最後に処理したフレームの比較用画像）
+        self._saved_files = []
+        self._checkpoint_gray = None
+        
+        # 解析解像度（_configure_analysis で設定）
+        self._analysis_size = None
+        self._analysis_scale = 1.0
+        self._analysis_min_area = min_area_threshold
+        self._crop = None
+        self._analysis_mask = None
+        self._mask_fraction = 1.0
+        self._change_index = None
         
         # 処理状態
         self.is_processing = False
@@ -72,28 +393,52 @@ class VideoFrameExtractor:
         self.saved_frames = 0
         self.video_duration = 0
         self.current_time = 0
+        self._decode_error = None
         
         # コールバック関数
         self.progress_callback = None
         self.completion_callback = None
+        self.preview_callback = None
+        self._last_progress = 0.0
+        self._last_preview = 0.0
     
-    def set_callbacks(self, progress_callback=None, completion_callback=None):
-        """コールバック関数を設定"""
+    def set_callbacks(self, progress_callback=None, completion_callback=None, preview_callback=None):
+        """
+        コールバック関数を設定
+
+        progress_callback と preview_callback は progress_interval ごとに最大1回にまとめて呼び出す。
+        preview_callback には保存したフレーム（BGR）が渡される。
+        """
         self.progress_callback = progress_callback
         self.completion_callback = completion_callback
+        self.preview_callback = preview_callback
     
     def extract_frames(self):
-        """動画からフレームを抽出する"""
+        """
+        動画からフレームを抽出する
+
+        デコード → 変化検出 → 書き込み の3ステージのパイプラインで処理する。
+        - デコードスレッドがフレームを読み込み、グレースケール化して有界キューへ送る
+        - 変化検出（SSIM・差分・輪郭抽出）はワーカープールで並列に実行する
+        - 画像の書き込みは別の書き込みプールで実行する
+        判定結果はフレーム順に回収するため、保存順序と連番は従来と同じになる。
+        """
         if not self.video_path or not self.output_dir:
             if self.completion_callback:
                 self.completion_callback(False, "入力動画または出力ディレクトリが未指定です")
             return False
-        
+
         # カウンターのリセット
         self.current_frame = 0
         self.saved_frames = 0
         self.is_processing = True
         self.stop_requested = False
+        self.last_stats = None
+        self._saved_files = []
+        self._checkpoint_gray = None
+        self._last_progress = 0.0
+        self._last_preview = 0.0
+        self._change_index = None
 
         # 出力ディレクトリを作成（日本語パス対応）
         try:
@@ -101,14 +446,30 @@ class VideoFrameExtractor:
             if not os.path.exists(output_dir):
                 os.makedirs(output_dir, exist_ok=True)
         except Exception as e:
+            self.is_processing = False
             if self.completion_callback:
                 self.completion_callback(False, f"出力ディレクトリの作成に失敗: {str(e)}")
             return False
 
+        # 書き込み権限の確認
+        if not os.access(output_dir, os.W_OK):
+            self.is_processing = False
+            if self.completion_callback:
+                self.completion_callback(False, f"出力フォルダに書き込み権限がありません: {output_dir}")
+            return False
+
+        # 動画ファイルのパスを明示的に文字列化し、日本語パスに対応
+        video_path = str(self.video_path)
+        cap = cv2.VideoCapture(video_path)
+        frame_queue = queue.Queue(maxsize=self.queue_size)
+        decode_stop = Event()
+        decoder = None
+        analysis_pool = None
+        writer_pool = None
+        job_settings = None
+        pending_writes = deque()
+
         try:
-            # 動画ファイルのパスを明示的に文字列化し、日本語パスに対応
-            video_path = str(self.video_path)
-            cap = cv2.VideoCapture(video_path)
             if not cap.isOpened():
                 if self.completion_callback:
                     self.completion_callback(False, "動画ファイルを開けませんでした")
@@ -120,142 +481,120 @@ class VideoFrameExtractor:
             self.video_duration = self.total_frames / fps if fps > 0 else 0
             frame_interval = max(1, int(fps * self.sample_interval)) if self.sample_interval > 0 else 1
 
-            # 最初のフレームの読み込みと保存
+            # 最初のフレームの読み込み
             ret, first_frame = cap.read()
-            if not ret:
+            if not ret or first_frame is None or first_frame.size == 0:
                 if self.completion_callback:
                     self.completion_callback(False, "最初のフレームを読み込めませんでした")
                 return False
 
-            # 最初のフレームを保存（エラーハンドリング強化）
-            try:
-                if self.resize_output and self.output_width and self.output_height:
-                    first_frame = cv2.resize(first_frame, (self.output_width, self.output_height))
-                
-                first_output_path = os.path.join(output_dir, f"frame_000000_00-00-00.{self.output_format}")
-                print(f"保存を試みます: {first_output_path}")
-                print(f"フレームの形状: {first_frame.shape}")
-                print(f"フレームのデータ型: {first_frame.dtype}")
-                
-                # パスが存在することを確認
-                os.makedirs(os.path.dirname(first_output_path), exist_ok=True)
-                
-                # フレームが有効か確認
-                if first_frame is None or first_frame.size == 0:
-                    print("エラー: フレームが無効です")
-                    return False
-                
-                # 絶対パスに変換
-                first_output_path = os.path.abspath(first_output_path)
-                
-                # 書き込み権限の確認
-                if not os.access(os.path.dirname(first_output_path), os.W_OK):
-                    print(f"エラー: 書き込み権限がありません - {os.path.dirname(first_output_path)}")
-                    return False
-                
-                success = cv2.imwrite(first_output_path, first_frame)
-                if not success:
-                    print(f"警告: cv2.imwrite が失敗を返しました - {first_output_path}")
-                    # 代替の保存方法を試す
-                    try:
-                        img = Image.fromarray(cv2.cvtColor(first_frame, cv2.COLOR_BGR2RGB))
-                        img.save(first_output_path, self.output_format.upper())
-                        success = True
-                        print("PIL による保存が成功しました")
-                    except Exception as e:
-                        print(f"PIL による保存も失敗: {str(e)}")
-                
-                if success:
-                    self.saved_frames += 1
-                    print(f"最初のフレームを保存しました: {first_output_path}")
-                else:
-                    print(f"警告: 最初のフレームの保存に失敗 - {first_output_path}")
+            self._configure_analysis(first_frame.shape)
+            stats = PipelineStats()
+            analysis_pool = ThreadPoolExecutor(max_workers=self.analysis_workers)
+            writer_pool = ThreadPoolExecutor(max_workers=self.writer_workers)
 
-            except Exception as e:
-                print(f"最初のフレーム保存エラーの詳細: {str(e)}")
-                print(f"エラーの種類: {type(e)}")
-                import traceback
-                traceback.print_exc()
-
-            # 以降の処理
-            prev_frame = cv2.cvtColor(first_frame, cv2.COLOR_BGR2GRAY)
-            prev_frame = cv2.GaussianBlur(prev_frame, (self.blur_size, self.blur_size), 0)
-            frame_time = 0
-
-            while not self.stop_requested:
-                ret, current_frame = cap.read()
-                if not ret:
-                    break
+            # 前回のジョブ情報があれば続きから再開する
+            job_settings = self._job_settings(video_path)
+            resumed = self._resume_job(cap, output_dir, job_settings) if self.resume else None
+            if resumed is not None:
+                start_index, prev_gray = resumed
+                print(f"フレーム {start_index} から処理を再開します（保存済み: {self.saved_frames}枚）")
+            else:
+                # 最初のフレームは常に保存する
+                start_index = 0
+                pending_writes.append((first_frame, writer_pool.submit(self._save_frame, first_frame, 0, 0, stats)))
+                prev_gray = self._prepare_gray(first_frame)
+            self.current_frame = start_index
+            self._checkpoint_gray = prev_gray
+            last_checkpoint = time.perf_counter()
+
+            # 変化インデックス（NDJSONに逐次記録し、npz形式の場合は完了時に変換する）
+            if self.index_format:
+                index_meta = dict(job_settings, fps=fps, frame_width=first_frame.shape[1],
+                                  frame_height=first_frame.shape[0], analysis_scale=self._analysis_scale)
+                self._change_index = ChangeIndex(os.path.join(output_dir, self.INDEX_NAME + ".ndjson"),
+                                                 index_meta, resume_frame=start_index if resumed else None)
 
-                self.current_frame += 1
-                frame_time = self.current_frame / fps
+            # デコードスレッドの開始（2フレーム目以降、または再開位置の次から）
+            self._decode_error = None
+            decoder = Thread(target=self._decode_frames,
+                             args=(cap, frame_queue, decode_stop, stats, frame_interval, fps, start_index))
+            decoder.daemon = True
+            decoder.start()
 
-                # サンプリング間隔のタイミングで強制保存するかどうかをチェック
-                if self.current_frame % frame_interval == 0 and self.force_sampling:
-                    save_frame = True
+            # 判定待ちのフレーム: (フレーム番号, フレーム, 比較用画像, 判定Future または None=強制保存)
+            pending = deque()
+            max_pending = self.queue_size + self.analysis_workers
+
+            while True:
+                item = frame_queue.get()
+                if item is None:
+                    break
+                if self.stop_requested:
+                    continue  # デコードスレッドの終了を待ちつつキューを空にする
+
+                frame_index, frame, gray = item
+                if self.force_sampling and frame_index % frame_interval == 0:
+                    future = None
                 else:
-                    # 通常の変化検出による保存判定
-                    gray_frame = cv2.cvtColor(current_frame, cv2.COLOR_BGR2GRAY)
-                    gray_frame = cv2.GaussianBlur(gray_frame, (self.blur_size, self.blur_size), 0)
-
-                    similarity_score = ssim(prev_frame, gray_frame)
-                    diff_frame = cv2.absdiff(prev_frame, gray_frame)
-                    _, diff_thresh = cv2.threshold(diff_frame, 25, 255, cv2.THRESH_BINARY)
-                    contours, _ = cv2.findContours(diff_thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-                    significant_change = any(cv2.contourArea(c) > self.min_area_threshold for c in contours)
-                    save_frame = 1.0 - similarity_score > self.diff_threshold and significant_change
-
-                # フレームの保存処理
-                if save_frame:
-                    try:
-                        # 必要に応じてリサイズ
-                        if self.resize_output and self.output_width and self.output_height:
-                            output_frame = cv2.resize(current_frame, (self.output_width, self.output_height))
-                        else:
-                            output_frame = current_frame.copy()
-                        
-                        # ファイル名に時間情報を含める
-                        time_str = str(timedelta(seconds=int(frame_time))).replace(':', '-')
-                        output_path = os.path.join(self.output_dir, f"frame_{self.current_frame:06d}_{time_str}.{self.output_format}")
-                        
-                        # まずOpenCVで試す
-                        success = cv2.imwrite(output_path, output_frame)
-                        if not success:
-                            print(f"警告: cv2.imwrite が失敗を返しました - {output_path}")
-                            # 代替の保存方法を試す
-                            try:
-                                img = Image.fromarray(cv2.cvtColor(output_frame, cv2.COLOR_BGR2RGB))
-                                if self.output_format == 'jpg':
-                                    img.save(output_path, "JPEG", quality=95)
-                                else:
-                                    img.save(output_path, "PNG")
-                                success = True
-                                print(f"PIL による保存が成功しました - フレーム {self.current_frame}")
-                            except Exception as e:
-                                print(f"PIL による保存も失敗: {str(e)}")
-                        
-                        if success:
-                            self.saved_frames += 1
-                            print(f"フレーム {self.current_frame} を保存しました: {output_path}")
-                        else:
-                            print(f"警告: フレーム {self.current_frame} の保存に失敗 - {output_path}")
-                            
-                    except Exception as e:
-                        print(f"フレーム {self.current_frame} 保存エラー: {str(e)}")
-                        print(f"エラーの種類: {type(e)}")
-                        import traceback
-                        traceback.print_exc()
-
-                prev_frame = gray_frame
-
-                if self.progress_callback:
-                    self.progress_callback(self.current_frame, self.total_frames, frame_time, self.video_duration, self.saved_frames)
+                    future = analysis_pool.submit(self._timed_detect, prev_gray, gray, stats)
+                pending.append((frame_index, frame, gray, future))
+                prev_gray = gray
+
+                # 判定が終わったものから順番に回収する（先頭が未完了なら待たない）
+                while pending and (len(pending) > max_pending or pending[0][3] is None or pending[0][3].done()):
+                    self._collect_result(pending.popleft(), fps, writer_pool, pending_writes, stats, frame_queue)
+                self._collect_writes(pending_writes, block=len(pending_writes) > self.queue_size)
+
+                # 一定間隔でジョブ情報を書き出す（書き込み待ちを完了させてから記録する）
+                if time.perf_counter() - last_checkpoint >= self.checkpoint_interval:
+                    self._collect_writes(pending_writes, block=True)
+                    if self._change_index is not None:
+                        self._change_index.flush()
+                    self._write_manifest(output_dir, job_settings)
+                    last_checkpoint = time.perf_counter()
+
+            if self._decode_error is not None:
+                raise self._decode_error
+
+            # 残りの判定と書き込みを回収
+            while pending and not self.stop_requested:
+                self._collect_result(pending.popleft(), fps, writer_pool, pending_writes, stats, frame_queue)
+            self._collect_writes(pending_writes, block=True)
+            self._finish_index(completed=not self.stop_requested)
+            self._write_manifest(output_dir, job_settings, completed=not self.stop_requested)
+            self._report_progress(fps, stats, frame_queue, force=True)
+
+            self.last_stats = stats.snapshot()
+            print(PipelineStats.format_tiers(self.last_stats['tiers']))
+            print(PipelineStats.format_stages(self.last_stats))
 
         except Exception as e:
+            # 異常終了時も、そこまでの進捗を記録しておく
+            if job_settings is not None and self._checkpoint_gray is not None:
+                try:
+                    self._collect_writes(pending_writes, block=True)
+                    self._finish_index(completed=False)
+                    self._write_manifest(output_dir, job_settings)
+                except Exception as checkpoint_error:
+                    print(f"ジョブ情報の保存に失敗: {str(checkpoint_error)}")
             if self.completion_callback:
                 self.completion_callback(False, f"処理中にエラーが発生しました: {str(e)}")
             return False
         finally:
+            decode_stop.set()
+            if decoder is not None:
+                # デコードスレッドがキュー待ちで止まらないようにキューを空にしながら終了を待つ
+                while decoder.is_alive():
+                    self._drain_queue(frame_queue)
+                    decoder.join(0.1)
+            if analysis_pool is not None:
+                analysis_pool.shutdown(wait=True)
+            if writer_pool is not None:
+                writer_pool.shutdown(wait=True)
+            if self._change_index is not None:
+                self._change_index.close()
+                self._change_index = None
             cap.release()
             self.is_processing = False
 
@@ -264,10 +603,474 @@ class VideoFrameExtractor:
             if self.stop_requested:
                 self.completion_callback(False, "処理が中断されました")
             else:
-                self.completion_callback(True, f"処理完了: 合計{self.current_frame}フレーム中、{self.saved_frames}フレームを抽出しました")
-        
+                message = f"処理完了: 合計{self.current_frame}フレーム中、{self.saved_frames}フレームを抽出しました"
+                if self.last_stats:
+                    message += "\n" + PipelineStats.format_tiers(self.last_stats['tiers'])
+                    message += "\n" + PipelineStats.format_stages(self.last_stats)
+                self.completion_callback(True, message)
+
         return not self.stop_requested
-    
+
+    def _decode_frames(self, cap, frame_queue, decode_stop, stats, frame_interval=1, fps=0, start_index=0):
+        """
+        デコードスレッド: フレームを読み込み、グレースケール化してキューへ送る
+
+        frame_interval が2以上の場合はサンプリング対象のフレームだけをデコードし、
+        間のフレームは grab() またはシークで読み飛ばす。
+        cap は start_index のフレームを読み込んだ直後の位置にあるものとする。
+        """
+        frame_index = start_index
+        use_seek = self._use_seek(frame_interval, fps)
+        try:
+            while not self.stop_requested and not decode_stop.is_set():
+                start = time.perf_counter()
+                target = frame_index + frame_interval
+                ret, use_seek = self._skip_to(cap, frame_index + 1, target, use_seek)
+                if not ret:
+                    break
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                frame_index = target
+                gray = self._prepare_gray(frame)
+                stats.add('decode', time.perf_counter() - start)
+                frame_queue.put((frame_index, frame, gray))
+        except Exception as e:
+            self._decode_error = e
+        finally:
+            frame_queue.put(None)
+
+    def _use_seek(self, frame_interval, fps):
+        """読み飛ばしにシークを使うかどうかを判定"""
+        if frame_interval <= 1 or self.sampling_mode == 'grab':
+            return False
+        if self.sampling_mode == 'seek':
+            return True
+        return fps > 0 and frame_interval >= fps * self.SEEK_MIN_SECONDS
+
+    @staticmethod
+    def _skip_to(cap, position, target, use_seek):
+        """
+        次に読み込まれるフレーム番号 position から target の直前までを読み飛ばす
+
+        シークに失敗した場合は grab() による読み飛ばしに切り替える。
+
+        Returns:
+        --------
+        tuple
+            (読み飛ばしに成功したか, 以降もシークを使うか)
+        """
+        if position >= target:
+            return True, use_seek
+        if use_seek:
+            if cap.set(cv2.CAP_PROP_POS_FRAMES, target):
+                return True, True
+            print("警告: シークに失敗したため grab() による読み飛ばしに切り替えます")
+            use_seek = False
+        while position < target:
+            if not cap.grab():
+                return False, use_seek
+            position += 1
+        return True, use_seek
+
+    @staticmethod
+    def _drain_queue(frame_queue):
+        """キューに残っている要素を破棄する"""
+        try:
+            while True:
+                frame_queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    @staticmethod
+    def _clip_regions(regions, width, height):
+        """矩形 (x, y, w, h) のリストをフレームの範囲に収め、(x0, y0, x1, y1) のリストにする"""
+        clipped = []
+        for x, y, w, h in regions or []:
+            x0, y0 = max(0, int(x)), max(0, int(y))
+            x1, y1 = min(width, int(x + w)), min(height, int(y + h))
+            if x1 > x0 and y1 > y0:
+                clipped.append((x0, y0, x1, y1))
+        return clipped
+
+    def _configure_analysis(self, frame_shape):
+        """
+        フレームサイズから、解析範囲の切り出し位置・解析解像度・マスク・換算後の最小変化領域を決定
+
+        ROI を指定した場合はすべての ROI を囲む範囲を切り出して解析し、
+        ROI の外側と除外領域はマスクして変化検出の対象外にする。
+        """
+        height, width = frame_shape[:2]
+
+        # 切り出し範囲（元の解像度の座標）
+        x0, y0, x1, y1 = 0, 0, width, height
+        roi_rects = self._clip_regions(self.roi, width, height)
+        if self.roi:
+            if not roi_rects:
+                raise ValueError("解析範囲（ROI）が動画の範囲外です")
+            x0 = min(r[0] for r in roi_rects)
+            y0 = min(r[1] for r in roi_rects)
+            x1 = max(r[2] for r in roi_rects)
+            y1 = max(r[3] for r in roi_rects)
+        self._crop = None if (x0, y0, x1, y1) == (0, 0, width, height) else (x0, y0, x1, y1)
+        crop_width, crop_height = x1 - x0, y1 - y0
+
+        # 解析解像度（縮小率は元のフレーム幅を基準にする）
+        if self.analysis_width and 0 < self.analysis_width < width:
+            scale = self.analysis_width / width
+            self._analysis_size = (max(1, int(round(crop_width * scale))), max(1, int(round(crop_height * scale))))
+            self._analysis_scale = scale
+            self._analysis_min_area = self.min_area_threshold * scale * scale
+        else:
+            self._analysis_size = None
+            self._analysis_scale = 1.0
+            self._analysis_min_area = self.min_area_threshold
+
+        # マスク（255 の画素だけを解析する）
+        mask = np.full((crop_height, crop_width), 255 if not self.roi else 0, dtype=np.uint8)
+        for rx0, ry0, rx1, ry1 in roi_rects:
+            mask[ry0 - y0:ry1 - y0, rx0 - x0:rx1 - x0] = 255
+        for ix0, iy0, ix1, iy1 in self._clip_regions(self.ignore_regions, width, height):
+            mask[max(0, iy0 - y0):max(0, iy1 - y0), max(0, ix0 - x0):max(0, ix1 - x0)] = 0
+        if self._analysis_size is not None:
+            mask = cv2.resize(mask, self._analysis_size, interpolation=cv2.INTER_NEAREST)
+        if not mask.any():
+            raise ValueError("解析範囲がすべて除外領域に含まれています")
+        if mask.all():
+            self._analysis_mask = None
+            self._mask_fraction = 1.0
+        else:
+            self._analysis_mask = mask
+            self._mask_fraction = float(np.count_nonzero(mask)) / mask.size
+
+    def _prepare_gray(self, frame):
+        """変化検出用のグレースケール（ブラー済み）画像を作成"""
+        if self._crop is not None:
+            x0, y0, x1, y1 = self._crop
+            frame = frame[y0:y1, x0:x1]
+        if self._analysis_size is not None:
+            frame = cv2.resize(frame, self._analysis_size, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        gray = cv2.GaussianBlur(gray, (self.blur_size, self.blur_size), 0)
+        if self._analysis_mask is not None:
+            # 除外する画素は 0 にそろえ、差分が出ないようにする
+            gray = cv2.bitwise_and(gray, self._analysis_mask)
+        return gray
+
+    def _prefilter_diff(self, prev_gray, gray):
+        """縮小画像どうしの平均輝度差を計算（事前判定用、マスクした画素は除いた平均）"""
+        height, width = gray.shape[:2]
+        if width > self.PREFILTER_WIDTH:
+            size = (self.PREFILTER_WIDTH, max(1, int(round(height * self.PREFILTER_WIDTH / width))))
+            prev_gray = cv2.resize(prev_gray, size, interpolation=cv2.INTER_AREA)
+            gray = cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+        return float(cv2.absdiff(prev_gray, gray).mean()) / self._mask_fraction
+
+    def _similarity(self, prev_gray, gray):
+        """SSIM を計算（マスクがある場合は解析対象の画素だけで平均する）"""
+        if self._analysis_mask is None:
+            return float(ssim(prev_gray, gray))
+        _, ssim_map = ssim(prev_gray, gray, full=True)
+        return float(ssim_map[self._analysis_mask > 0].mean())
+
+    def _detect_change(self, prev_gray, gray):
+        """
+        2枚のグレースケール画像を比較して保存対象かどうかを判定する
+
+        安価な判定から順に行い、変化なしと確定した時点で打ち切る。
+        1. 縮小画像の平均輝度差（prefilter）
+        2. SSIM（ssim）
+        3. 差分の輪郭面積（contour）
+        変化インデックスを出力する場合は、2と3を常に両方計算する。
+
+        Returns:
+        --------
+        ChangeResult
+            判定結果と、判定に使ったスコア
+        """
+        prefilter_diff = self._prefilter_diff(prev_gray, gray)
+        if prefilter_diff <= self.prefilter_threshold:
+            return ChangeResult(False, 'prefilter', prefilter_diff, None, None, [])
+
+        similarity_score = self._similarity(prev_gray, gray)
+        ssim_changed = 1.0 - similarity_score > self.diff_threshold
+        if not ssim_changed and not self.index_format:
+            return ChangeResult(False, 'ssim', prefilter_diff, similarity_score, None, [])
+
+        diff_frame = cv2.absdiff(prev_gray, gray)
+        _, diff_thresh = cv2.threshold(diff_frame, 25, 255, cv2.THRESH_BINARY)
+        contours, _ = cv2.findContours(diff_thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        areas = [cv2.contourArea(c) for c in contours]
+        max_area = max(areas, default=0.0) / (self._analysis_scale ** 2)
+        offset_x, offset_y = self._crop[:2] if self._crop is not None else (0, 0)
+        boxes = []
+        for c, area in zip(contours, areas):
+            if area > self._analysis_min_area:
+                x, y, w, h = (int(round(v / self._analysis_scale)) for v in cv2.boundingRect(c))
+                boxes.append([x + offset_x, y + offset_y, w, h])
+
+        if not ssim_changed:
+            tier = 'ssim'
+        elif not boxes:
+            tier = 'contour'
+        else:
+            tier = 'changed'
+        return ChangeResult(tier == 'changed', tier, prefilter_diff, similarity_score, max_area, boxes)
+
+    def _timed_detect(self, prev_gray, gray, stats):
+        """変化検出ステージ（処理時間と判定段階を記録）"""
+        start = time.perf_counter()
+        try:
+            result = self._detect_change(prev_gray, gray)
+            stats.add_tier(result.tier)
+            return result
+        finally:
+            stats.add('analyze', time.perf_counter() - start)
+
+    def _collect_result(self, entry, fps, writer_pool, pending_writes, stats, frame_queue):
+        """判定結果をフレーム順に回収し、保存が必要なら書き込みプールへ渡す"""
+        frame_index, frame, gray, future = entry
+        result = None if future is None else future.result()
+        save_frame = result is None or result.changed
+
+        self.current_frame = frame_index
+        self._checkpoint_gray = gray
+        frame_time = frame_index / fps if fps > 0 else 0
+
+        if self._change_index is not None:
+            self._change_index.add({
+                'frame': frame_index,
+                'time': frame_time,
+                'forced': result is None,
+                'prefilter': result.prefilter_diff if result else 0.0,
+                'ssim': result.ssim if result else None,
+                'max_area': result.max_area if result else None,
+                'changed': bool(result and result.changed),
+                'saved': save_frame,
+                'boxes': result.boxes if result else [],
+            })
+
+        if save_frame:
+            pending_writes.append((frame, writer_pool.submit(self._save_frame, frame, frame_index, frame_time, stats)))
+
+        self._report_progress(fps, stats, frame_queue)
+
+    def _finish_index(self, completed):
+        """変化インデックスを書き出し、完了時に npz 形式が指定されていれば変換する"""
+        if self._change_index is None:
+            return
+        self._change_index.close()
+        if completed and self.index_format == 'npz':
+            ndjson_path = self._change_index.path
+            meta, records = load_change_index(ndjson_path)
+            npz_path = os.path.join(os.path.dirname(ndjson_path), self.INDEX_NAME + ".npz")
+            save_change_index_npz(npz_path, meta, records)
+            os.remove(ndjson_path)
+            print(f"変化インデックスを保存しました: {npz_path}")
+        else:
+            print(f"変化インデックスを保存しました: {self._change_index.path}")
+
+    def _report_progress(self, fps, stats, frame_queue, force=False):
+        """進捗コールバックを呼び出す（progress_interval より短い間隔の呼び出しはまとめる）"""
+        if not self.progress_callback:
+            return
+        now = time.perf_counter()
+        if not force and now - self._last_progress < self.progress_interval:
+            return
+        self._last_progress = now
+        frame_time = self.current_frame / fps if fps > 0 else 0
+        self.progress_callback(self.current_frame, self.total_frames, frame_time, self.video_duration,
+                               self.saved_frames, stats.snapshot(frame_queue.qsize()))
+
+    def _collect_writes(self, pending_writes, block=False):
+        """書き込み結果を保存順に回収して保存枚数を更新し、保存したフレームをプレビューへ渡す"""
+        while pending_writes and (block or pending_writes[0][1].done()):
+            frame, future = pending_writes.popleft()
+            output_path = future.result()
+            if output_path:
+                self.saved_frames += 1
+                self._saved_files.append(os.path.basename(output_path))
+                now = time.perf_counter()
+                if self.preview_callback and now - self._last_preview >= self.progress_interval:
+                    self._last_preview = now
+                    self.preview_callback(frame)
+
+    def _job_settings(self, video_path):
+        """再開可否の判定に使う入力動画と抽出設定の情報"""
+        stat = os.stat(video_path)
+        return {
+            'video_path': os.path.abspath(video_path),
+            'video_size': stat.st_size,
+            'video_mtime': stat.st_mtime,
+            'diff_threshold': self.diff_threshold,
+            'min_area_threshold': self.min_area_threshold,
+            'blur_size': self.blur_size,
+            'sample_interval': self.sample_interval,
+            'force_sampling': self.force_sampling,
+            'resize_output': self.resize_output,
+            'output_width': self.output_width,
+            'output_height': self.output_height,
+            'output_format': self.output_format,
+            'analysis_width': self.analysis_width,
+            'prefilter_threshold': self.prefilter_threshold,
+            'index_format': self.index_format,
+            'jpeg_quality': self.jpeg_quality,
+            'png_compression': self.png_compression,
+            'webp_quality': self.webp_quality,
+            'roi': [list(r) for r in self.roi] if self.roi else None,
+            'ignore_regions': [list(r) for r in self.ignore_regions] if self.ignore_regions else None,
+        }
+
+    @staticmethod
+    def _gray_hash(gray):
+        """比較用画像のハッシュ値"""
+        return hashlib.sha1(gray.tobytes()).hexdigest()
+
+    def _write_manifest(self, output_dir, job_settings, completed=False):
+        """ジョブ情報を出力フォルダに書き出す（一時ファイル経由で置き換える）"""
+        manifest = {
+            'settings': job_settings,
+            'last_frame': self.current_frame,
+            'reference_hash': self._gray_hash(self._checkpoint_gray),
+            'saved_files': self._saved_files,
+            'completed': completed,
+            'updated_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        manifest_path = os.path.join(output_dir, self.MANIFEST_NAME)
+        temp_path = manifest_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, manifest_path)
+
+    def _resume_job(self, cap, output_dir, job_settings):
+        """
+        未完了のジョブ情報があれば、最後に処理したフレームまで動画の位置を進める
+
+        シーク後のフレームが記録した比較用画像のハッシュと一致しない場合は、
+        先頭から grab() で読み進めて再確認する。
+
+        Returns:
+        --------
+        tuple or None
+            (再開するフレーム番号, そのフレームの比較用画像)。再開しない場合は None
+        """
+        manifest_path = os.path.join(output_dir, self.MANIFEST_NAME)
+        if not os.path.exists(manifest_path):
+            return None
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"ジョブ情報を読み込めませんでした: {str(e)}")
+            return None
+
+        if manifest.get('completed') or manifest.get('settings') != job_settings:
+            return None
+        frame_index = manifest.get('last_frame', 0)
+        if frame_index <= 0:
+            return None
+
+        for use_seek in (True, False):
+            if use_seek:
+                positioned = cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+            else:
+                positioned = cap.set(cv2.CAP_PROP_POS_FRAMES, 0) and self._skip_to(cap, 0, frame_index, False)[0]
+            if not positioned:
+                continue
+            ret, frame = cap.read()
+            if not ret:
+                continue
+            gray = self._prepare_gray(frame)
+            if self._gray_hash(gray) == manifest.get('reference_hash'):
+                self._saved_files = list(manifest.get('saved_files', []))
+                self.saved_frames = len(self._saved_files)
+                return frame_index, gray
+
+        print("警告: 再開位置のフレームが一致しないため、最初から処理します")
+        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        cap.grab()
+        return None
+
+    def _encode_params(self):
+        """出力形式に応じた cv2.imencode の拡張子とパラメータ"""
+        if self.output_format == 'png':
+            return '.png', [cv2.IMWRITE_PNG_COMPRESSION, self.png_compression]
+        if self.output_format == 'webp':
+            return '.webp', [cv2.IMWRITE_WEBP_QUALITY, self.webp_quality]
+        return '.jpg', [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality]
+
+    def _encode_with_pil(self, frame):
+        """PIL によるエンコード（OpenCV でエンコードできない場合の代替）"""
+        import io
+        img = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        buffer = io.BytesIO()
+        if self.output_format == 'png':
+            img.save(buffer, "PNG", compress_level=self.png_compression)
+        elif self.output_format == 'webp':
+            if self.webp_quality > 100:
+                img.save(buffer, "WEBP", lossless=True)
+            else:
+                img.save(buffer, "WEBP", quality=self.webp_quality)
+        else:
+            img.save(buffer, "JPEG", quality=self.jpeg_quality)
+        return buffer.getvalue()
+
+    def _save_frame(self, frame, frame_index, frame_time, stats=None):
+        """
+        フレームを画像ファイルとして保存する（書き込みプールで実行される）
+
+        cv2.imencode でメモリ上にエンコードしてからファイルに書き込む。
+        エンコードと書き込みの処理時間は stats に別々に記録する。
+
+        Returns:
+        --------
+        str or None
+            保存したファイルのパス。失敗した場合は None
+        """
+        try:
+            start = time.perf_counter()
+            # 必要に応じてリサイズ
+            if self.resize_output and self.output_width and self.output_height:
+                output_frame = cv2.resize(frame, (self.output_width, self.output_height))
+            else:
+                output_frame = frame
+
+            # ファイル名に時間情報を含める
+            time_str = str(timedelta(seconds=int(frame_time))).replace(':', '-')
+            if frame_index == 0:
+                time_str = "00-00-00"
+            output_path = os.path.join(str(self.output_dir), f"frame_{frame_index:06d}_{time_str}.{self.output_format}")
+
+            # まずOpenCVでエンコード
+            ext, params = self._encode_params()
+            success, encoded = cv2.imencode(ext, output_frame, params)
+            if success:
+                data = encoded.tobytes()
+            else:
+                print(f"警告: cv2.imencode が失敗を返しました - {output_path}")
+                # 代替のエンコード方法を試す
+                data = self._encode_with_pil(output_frame)
+                print(f"PIL によるエンコードが成功しました - フレーム {frame_index}")
+            encoded_at = time.perf_counter()
+            if stats is not None:
+                stats.add('encode', encoded_at - start)
+
+            # 書き込み（日本語パスでも扱えるよう Python のファイルAPIで書き込む）
+            with open(output_path, 'wb') as f:
+                f.write(data)
+            if stats is not None:
+                stats.add('write', time.perf_counter() - encoded_at)
+
+            print(f"フレーム {frame_index} を保存しました: {output_path}")
+            return output_path
+
+        except Exception as e:
+            print(f"フレーム {frame_index} 保存エラー: {str(e)}")
+            print(f"エラーの種類: {type(e)}")
+            import traceback
+            traceback.print_exc()
+            return None
+
     def start_extraction(self):
         """別スレッドでフレーム抽出を開始"""
         if self.is_processing:
@@ -283,6 +1086,160 @@ class VideoFrameExtractor:
         self.stop_requested = True
 
 
+def parse_regions(text):
+    """
+    "x,y,w,h; x,y,w,h" 形式の文字列を矩形のリストに変換
+
+    Raises:
+    -------
+    ValueError
+        形式が正しくない場合
+    """
+    regions = []
+    for part in text.replace('\n', ';').split(';'):
+        part = part.strip()
+        if not part:
+            continue
+        values = [int(v) for v in part.split(',')]
+        if len(values) != 4 or values[2] <= 0 or values[3] <= 0:
+            raise ValueError(f"範囲の指定が正しくありません: {part}（x,y,幅,高さ の形式で指定してください）")
+        regions.append(tuple(values))
+    return regions
+
+
+def format_regions(regions):
+    """矩形のリストを "x,y,w,h; x,y,w,h" 形式の文字列に変換"""
+    return "; ".join(",".join(str(v) for v in region) for region in regions or [])
+
+
+class RegionSelectDialog:
+    """動画の最初のフレーム上でドラッグして解析範囲（ROI）と除外範囲を指定するダイアログ"""
+
+    MAX_WIDTH = 960
+    MAX_HEIGHT = 540
+
+    def __init__(self, parent, video_path, roi, ignore_regions, callback):
+        """
+        Parameters:
+        -----------
+        parent : tk.Widget
+            親ウィンドウ
+        video_path : str
+            入力動画ファイルのパス
+        roi, ignore_regions : list
+            現在の解析範囲・除外範囲 (x, y, w, h) のリスト
+        callback : callable
+            OK 時に (roi, ignore_regions) を受け取る関数
+        """
+        self.callback = callback
+        self.regions = {'roi': list(roi), 'ignore': list(ignore_regions)}
+        self.drag_start = None
+        self.drag_item = None
+
+        cap = cv2.VideoCapture(str(video_path))
+        ret, frame = cap.read()
+        cap.release()
+        if not ret:
+            raise IOError("動画のフレームを読み込めませんでした")
+
+        h, w = frame.shape[:2]
+        self.scale = min(self.MAX_WIDTH / w, self.MAX_HEIGHT / h, 1.0)
+        display = cv2.resize(frame, (int(w * self.scale), int(h * self.scale)), interpolation=cv2.INTER_AREA)
+
+        self.window = tk.Toplevel(parent)
+        self.window.title("解析範囲の指定")
+        self.window.transient(parent)
+        self.window.grab_set()
+
+        # 指定する範囲の種類
+        mode_frame = ttk.Frame(self.window, padding="5")
+        mode_frame.pack(fill=tk.X)
+        self.mode_var = tk.StringVar(value='roi')
+        ttk.Radiobutton(mode_frame, text="解析範囲(ROI)", variable=self.mode_var, value='roi').pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(mode_frame, text="除外範囲", variable=self.mode_var, value='ignore').pack(side=tk.LEFT, padx=5)
+        ttk.Label(mode_frame, text="(ドラッグで範囲を追加)").pack(side=tk.LEFT, padx=5)
+
+        # フレーム表示
+        self.img_tk = ImageTk.PhotoImage(image=Image.fromarray(cv2.cvtColor(display, cv2.COLOR_BGR2RGB)))
+        self.canvas = tk.Canvas(self.window, width=display.shape[1], height=display.shape[0], cursor="crosshair")
+        self.canvas.pack(padx=5, pady=5)
+        self.canvas.create_image(0, 0, anchor=tk.NW, image=self.img_tk)
+        self.canvas.bind("<ButtonPress-1>", self.on_press)
+        self.canvas.bind("<B1-Motion>", self.on_drag)
+        self.canvas.bind("<ButtonRelease-1>", self.on_release)
+
+        # ボタン
+        button_frame = ttk.Frame(self.window, padding="5")
+        button_frame.pack(fill=tk.X)
+        ttk.Button(button_frame, text="クリア", command=self.clear).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="キャンセル", command=self.window.destroy).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(button_frame, text="OK", command=self.ok).pack(side=tk.RIGHT, padx=5)
+
+        self.redraw()
+
+    def color(self, mode):
+        """範囲の種類ごとの枠の色"""
+        return "#00c000" if mode == 'roi' else "#e00000"
+
+    def redraw(self):
+        """指定済みの範囲を描き直す"""
+        self.canvas.delete("region")
+        for mode, regions in self.regions.items():
+            for x, y, w, h in regions:
+                self.canvas.create_rectangle(x * self.scale, y * self.scale, (x + w) * self.scale, (y + h) * self.scale,
+                                             outline=self.color(mode), width=2, tags="region")
+
+    def on_press(self, event):
+        """ドラッグ開始"""
+        self.drag_start = (event.x, event.y)
+        self.drag_item = self.canvas.create_rectangle(event.x, event.y, event.x, event.y,
+                                                      outline=self.color(self.mode_var.get()), width=2, dash=(4, 2))
+
+    def on_drag(self, event):
+        """ドラッグ中の範囲を表示"""
+        if self.drag_item is not None:
+            self.canvas.coords(self.drag_item, *self.drag_start, event.x, event.y)
+
+    def on_release(self, event):
+        """ドラッグ終了時に範囲を追加"""
+        if self.drag_item is None:
+            return
+        self.canvas.delete(self.drag_item)
+        self.drag_item = None
+        x0, x1 = sorted((self.drag_start[0], event.x))
+        y0, y1 = sorted((self.drag_start[1], event.y))
+        # 表示座標から元の解像度の座標に変換
+        region = (int(x0 / self.scale), int(y0 / self.scale), int((x1 - x0) / self.scale), int((y1 - y0) / self.scale))
+        if region[2] > 0 and region[3] > 0:
+            self.regions[self.mode_var.get()].append(region)
+        self.redraw()
+
+    def clear(self):
+        """指定済みの範囲をすべて消す"""
+        self.regions = {'roi': [], 'ignore': []}
+        self.redraw()
+
+    def ok(self):
+        """指定した範囲を反映して閉じる"""
+        self.callback(self.regions['roi'], self.regions['ignore'])
+        self.window.destroy()
+
+
+def make_preview_image(frame, max_size=400):
+    """BGRのフレームを長辺 max_size に縮小したプレビュー用のPILイメージに変換"""
+    h, w = frame.shape[:2]
+    if w > h:
+        new_w = max_size
+        new_h = int(h * max_size / w)
+    else:
+        new_h = max_size
+        new_w = int(w * max_size / h)
+    
+    # 縮小してからRGBに変換（OpenCVはBGR形式）
+    frame_resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_AREA)
+    return Image.fromarray(cv2.cvtColor(frame_resized, cv2.COLOR_BGR2RGB))
+
+
 class VideoFrameExtractorApp:
     def __init__(self, root):
         """
@@ -295,7 +1252,7 @@ class VideoFrameExtractorApp:
         """
         self.root = root
         self.root.title("動画フレーム抽出ツール")
-        self.root.geometry("800x700")
+        self.root.geometry("820x900")
         self.root.resizable(True, True)
         
         # スタイル設定
@@ -373,6 +1330,40 @@ class VideoFrameExtractorApp:
             variable=self.force_sampling_var)
         force_sampling_check.grid(row=2, column=2, columnspan=2, sticky=tk.W, pady=5)
         
+        # 解析解像度（変化検出を縮小画像で行う）
+        ttk.Label(settings_frame, text="解析解像度:").grid(row=3, column=0, sticky=tk.W, pady=5)
+        analysis_options = ["元の解像度", "幅1280px", "幅960px", "幅640px", "幅480px"]
+        self.analysis_combobox = ttk.Combobox(settings_frame, values=analysis_options, state="readonly", width=15)
+        self.analysis_combobox.current(0)
+        self.analysis_combobox.grid(row=3, column=1, sticky=tk.W, pady=5)
+        ttk.Label(settings_frame, text="(縮小するほど高速、保存は元の解像度)").grid(row=3, column=2, columnspan=2, sticky=tk.W, pady=5)
+        
+        # 変化インデックスの出力
+        ttk.Label(settings_frame, text="変化インデックス:").grid(row=5, column=0, sticky=tk.W, pady=5)
+        self.index_format_var = tk.StringVar(value='none')
+        index_frame = ttk.Frame(settings_frame)
+        index_frame.grid(row=5, column=1, columnspan=3, sticky=tk.W, pady=5)
+        ttk.Radiobutton(index_frame, text="出力しない", variable=self.index_format_var, value='none').pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(index_frame, text="NDJSON", variable=self.index_format_var, value='ndjson').pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(index_frame, text="NPZ", variable=self.index_format_var, value='npz').pack(side=tk.LEFT, padx=5)
+        
+        # 中断したジョブの再開
+        self.resume_var = tk.BooleanVar(value=True)
+        resume_check = ttk.Checkbutton(settings_frame,
+            text="中断した抽出を前回の続きから再開する",
+            variable=self.resume_var)
+        resume_check.grid(row=4, column=0, columnspan=4, sticky=tk.W, pady=5)
+        
+        # 解析範囲（ROI）と除外範囲
+        ttk.Label(settings_frame, text="解析範囲(ROI):").grid(row=6, column=0, sticky=tk.W, pady=5)
+        self.roi_var = tk.StringVar()
+        ttk.Entry(settings_frame, textvariable=self.roi_var, width=40).grid(row=6, column=1, columnspan=2, sticky=tk.W, pady=5)
+        ttk.Button(settings_frame, text="範囲を指定...", command=self.select_regions).grid(row=6, column=3, rowspan=2, sticky=tk.W, pady=5)
+        ttk.Label(settings_frame, text="除外範囲:").grid(row=7, column=0, sticky=tk.W, pady=5)
+        self.ignore_var = tk.StringVar()
+        ttk.Entry(settings_frame, textvariable=self.ignore_var, width=40).grid(row=7, column=1, columnspan=2, sticky=tk.W, pady=5)
+        ttk.Label(settings_frame, text="(x,y,幅,高さ を ; 区切りで指定、空欄は全体)").grid(row=8, column=1, columnspan=3, sticky=tk.W)
+        
         # 出力サイズ設定
         size_frame = ttk.LabelFrame(main_frame, text="出力サイズ設定", padding="10")
         size_frame.pack(fill=tk.X, pady=5)
@@ -401,6 +1392,15 @@ class VideoFrameExtractorApp:
         format_frame.grid(row=2, column=1, columnspan=3, sticky=tk.W, pady=5)
         ttk.Radiobutton(format_frame, text="JPEG", variable=self.format_var, value='jpg').pack(side=tk.LEFT, padx=5)
         ttk.Radiobutton(format_frame, text="PNG", variable=self.format_var, value='png').pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(format_frame, text="WebP", variable=self.format_var, value='webp').pack(side=tk.LEFT, padx=5)
+        
+        # 画質・圧縮レベル
+        ttk.Label(size_frame, text="JPEG/WebP品質:").grid(row=3, column=0, sticky=tk.W, pady=5)
+        self.quality_var = tk.IntVar(value=95)
+        ttk.Spinbox(size_frame, from_=1, to=100, textvariable=self.quality_var, width=8).grid(row=3, column=1, sticky=tk.W, pady=5, padx=5)
+        ttk.Label(size_frame, text="PNG圧縮レベル:").grid(row=3, column=2, sticky=tk.W, pady=5)
+        self.png_compression_var = tk.IntVar(value=3)
+        ttk.Spinbox(size_frame, from_=0, to=9, textvariable=self.png_compression_var, width=8).grid(row=3, column=3, sticky=tk.W, pady=5, padx=5)
         
         # プレビューフレーム
         preview_frame = ttk.LabelFrame(main_frame, text="プレビューと進捗", padding="10")
@@ -419,6 +1419,10 @@ class VideoFrameExtractorApp:
         self.progress_label = ttk.Label(preview_frame, text="準備完了")
         self.progress_label.pack(pady=5)
         
+        # ステージ別スループット
+        self.stage_label = ttk.Label(preview_frame, text="")
+        self.stage_label.pack(pady=2)
+        
         # ボタンフレーム
         button_frame = ttk.Frame(main_frame)
         button_frame.pack(fill=tk.X, pady=10)
@@ -452,6 +1456,27 @@ class VideoFrameExtractorApp:
             # サムネイル表示
             self.load_video_thumbnail(file_path)
     
+    def select_regions(self):
+        """解析範囲・除外範囲の指定ダイアログを開く"""
+        if not self.video_path_var.get():
+            messagebox.showerror("エラー", "動画ファイルを選択してください")
+            return
+        try:
+            roi = parse_regions(self.roi_var.get())
+            ignore_regions = parse_regions(self.ignore_var.get())
+        except ValueError as e:
+            messagebox.showerror("エラー", str(e))
+            return
+        
+        def apply(new_roi, new_ignore):
+            self.roi_var.set(format_regions(new_roi))
+            self.ignore_var.set(format_regions(new_ignore))
+        
+        try:
+            RegionSelectDialog(self.root, self.video_path_var.get(), roi, ignore_regions, apply)
+        except Exception as e:
+            messagebox.showerror("エラー", f"範囲指定画面を開けませんでした: {str(e)}")
+    
     def browse_output_dir(self):
         """出力フォルダ選択ダイアログ"""
         dir_path = filedialog.askdirectory(title="出力フォルダを選択")
@@ -464,6 +1489,14 @@ class VideoFrameExtractorApp:
         self.width_entry.config(state=state)
         self.height_entry.config(state=state)
     
+    def get_analysis_width(self):
+        """解析解像度の選択値から幅を取得（元の解像度の場合は None）"""
+        selection = self.analysis_combobox.get()
+        if selection == "元の解像度":
+            return None
+        # "幅Xpx"の形式から数値部分を取り出す
+        return int(selection.replace("幅", "").replace("px", ""))
+    
     def update_interval(self, event=None):
         """サンプリング間隔の更新"""
         selection = self.interval_combobox.get()
@@ -523,36 +1556,38 @@ class VideoFrameExtractorApp:
         if frame is None:
             # デフォルト画像（グレーの背景）
             img = Image.new('RGB', (400, 300), color=(200, 200, 200))
-            img_tk = ImageTk.PhotoImage(image=img)
-            self.preview_label.config(image=img_tk)
-            self.preview_label.image = img_tk
-            return
-        
-        # OpenCVはBGR形式なのでRGBに変換
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        
-        # プレビューサイズに調整
-        h, w = frame_rgb.shape[:2]
-        max_size = 400
-        if w > h:
-            new_w = max_size
-            new_h = int(h * max_size / w)
         else:
-            new_h = max_size
-            new_w = int(w * max_size / h)
-        
-        frame_resized = cv2.resize(frame_rgb, (new_w, new_h))
-        
-        # PILイメージに変換
-        img = Image.fromarray(frame_resized)
+            img = make_preview_image(frame)
+        self._show_preview_image(img)
+    
+    def _show_preview_image(self, img):
+        """プレビュー用のPILイメージを表示（Tkのスレッドで呼び出す）"""
         img_tk = ImageTk.PhotoImage(image=img)
-        
-        # 画像を表示
         self.preview_label.config(image=img_tk)
         self.preview_label.image = img_tk  # GC対策の参照保持
     
-    def update_progress(self, current_frame, total_frames, current_time, total_time, saved_frames):
-        """進捗状況の更新"""
+    def on_frame_saved(self, frame):
+        """フレーム保存時のコールバック（抽出スレッドから呼ばれる）"""
+        # 縮小は抽出スレッドで行い、表示だけをTkのスレッドに渡す
+        img = make_preview_image(frame)
+        self.root.after(0, self._show_preview_image, img)
+    
+    def update_progress(self, *args):
+        """進捗状況の更新（抽出スレッドから呼ばれるため、Tkのスレッドに渡す）"""
+        self.root.after(0, self._show_progress, *args)
+    
+    def _show_progress(self, current_frame, total_frames, current_time, total_time, saved_frames, stage_stats=None):
+        """進捗状況の表示"""
+        if stage_stats:
+            self.stage_label.config(
+                text=f"デコード: {stage_stats['decode']['fps']:.1f} fps, "
+                     f"変化検出: {stage_stats['analyze']['fps']:.1f} fps "
+                     f"({stage_stats['analyze']['avg_ms']:.1f} ms/枚), "
+                     f"エンコード: {stage_stats['encode']['avg_ms']:.1f} ms/枚, "
+                     f"書き込み: {stage_stats['write']['fps']:.1f} 枚/秒, "
+                     f"キュー: {stage_stats['queue_depth']}"
+            )
+
         if total_frames > 0:
             progress = (current_frame / total_frames) * 100
             self.progress_var.set(progress)
@@ -564,21 +1599,13 @@ class VideoFrameExtractorApp:
                 text=f"進捗: {current_frame}/{total_frames} フレーム ({progress:.1f}%), "
                      f"時間: {time_str}/{total_str}, 保存済み: {saved_frames}枚"
             )
-            
-            # 適当な間隔でプレビューを更新（リソース節約のため）
-            if current_frame % 30 == 0 and not self.extractor.stop_requested:
-                try:
-                    cap = cv2.VideoCapture(self.video_path_var.get())
-                    cap.set(cv2.CAP_PROP_POS_FRAMES, current_frame)
-                    ret, frame = cap.read()
-                    if ret:
-                        self.update_preview(frame)
-                    cap.release()
-                except:
-                    pass
     
     def process_completed(self, success, message):
-        """処理完了時のコールバック"""
+        """処理完了時のコールバック（抽出スレッドから呼ばれるため、Tkのスレッドに渡す）"""
+        self.root.after(0, self._on_completed, success, message)
+    
+    def _on_completed(self, success, message):
+        """処理完了時のUI更新"""
         self.processing = False
         self.start_button.config(state="normal")
         self.stop_button.config(state="disabled")
@@ -602,6 +1629,14 @@ class VideoFrameExtractorApp:
             messagebox.showerror("エラー", "出力フォルダを選択してください")
             return
         
+        # 解析範囲の確認
+        try:
+            roi = parse_regions(self.roi_var.get())
+            ignore_regions = parse_regions(self.ignore_var.get())
+        except ValueError as e:
+            messagebox.showerror("エラー", str(e))
+            return
+        
         # 出力ディレクトリの確認
         output_dir = self.output_dir_var.get()
         if not os.path.exists(output_dir):
@@ -623,13 +1658,22 @@ class VideoFrameExtractorApp:
             output_width=self.width_var.get() if self.resize_var.get() else None,
             output_height=self.height_var.get() if self.resize_var.get() else None,
             force_sampling=self.force_sampling_var.get(),
-            output_format=self.format_var.get()  # 追加
+            output_format=self.format_var.get(),
+            analysis_width=self.get_analysis_width(),
+            resume=self.resume_var.get(),
+            index_format=None if self.index_format_var.get() == 'none' else self.index_format_var.get(),
+            jpeg_quality=self.quality_var.get(),
+            webp_quality=self.quality_var.get(),
+            png_compression=self.png_compression_var.get(),
+            roi=roi or None,
+            ignore_regions=ignore_regions or None
         )
         
         # コールバックの設定
         self.extractor.set_callbacks(
             progress_callback=self.update_progress,
-            completion_callback=self.process_completed
+            completion_callback=self.process_completed,
+            preview_callback=self.on_frame_saved
         )
         
         # 抽出開始
@@ -650,8 +1694,358 @@ class VideoFrameExtractorApp:
             self.progress_label.config(text="停止中...")
 
 
+def benchmark_analysis_resolution(video_path, analysis_width=640, max_frames=None, **extractor_options):
+    """
+    元の解像度と縮小解像度で変化検出を行い、処理時間と検出結果の一致度を比較する
+
+    画像の書き込みは行わず、デコードと変化検出のみを計測する。
+
+    Parameters:
+    -----------
+    video_path : str
+        入力動画ファイルのパス
+    analysis_width : int
+        比較する解析解像度の幅
+    max_frames : int
+        計測するフレーム数の上限。None の場合は動画全体
+    extractor_options : dict
+        VideoFrameExtractor に渡すその他の設定（diff_threshold など）
+
+    Returns:
+    --------
+    dict
+        各解像度の処理時間・検出フレーム数と、一致したフレーム数
+    """
+    def run(width):
+        extractor = VideoFrameExtractor(video_path=video_path, analysis_width=width, **extractor_options)
+        cap = cv2.VideoCapture(str(video_path))
+        if not cap.isOpened():
+            raise IOError(f"動画ファイルを開けませんでした: {video_path}")
+        detected = set()
+        try:
+            start = time.perf_counter()
+            ret, frame = cap.read()
+            if not ret:
+                raise IOError("最初のフレームを読み込めませんでした")
+            extractor._configure_analysis(frame.shape)
+            prev_gray = extractor._prepare_gray(frame)
+            frame_index = 0
+            while max_frames is None or frame_index < max_frames:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                frame_index += 1
+                gray = extractor._prepare_gray(frame)
+                if extractor._detect_change(prev_gray, gray).changed:
+                    detected.add(frame_index)
+                prev_gray = gray
+            elapsed = time.perf_counter() - start
+        finally:
+            cap.release()
+        return {'seconds': elapsed, 'frames': frame_index, 'detected': detected}
+
+    full = run(None)
+    scaled = run(analysis_width)
+    matched = full['detected'] & scaled['detected']
+    result = {
+        'frames': full['frames'],
+        'full_seconds': full['seconds'],
+        'scaled_seconds': scaled['seconds'],
+        'speedup': full['seconds'] / scaled['seconds'] if scaled['seconds'] > 0 else 0.0,
+        'full_detected': len(full['detected']),
+        'scaled_detected': len(scaled['detected']),
+        'matched': len(matched),
+        'full_only': sorted(full['detected'] - scaled['detected']),
+        'scaled_only': sorted(scaled['detected'] - full['detected']),
+    }
+
+    print(f"フレーム数: {result['frames']}")
+    print(f"元の解像度: {result['full_seconds']:.2f}秒, 検出 {result['full_detected']}枚")
+    print(f"解析幅 {analysis_width}px: {result['scaled_seconds']:.2f}秒, 検出 {result['scaled_detected']}枚")
+    print(f"高速化: {result['speedup']:.2f}倍, 一致: {result['matched']}枚 "
+          f"(元の解像度のみ: {len(result['full_only'])}枚, 縮小のみ: {len(result['scaled_only'])}枚)")
+    return result
+
+
+# 一括処理の対象とする動画の拡張子
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.flv')
+
+
+def find_videos(input_dir):
+    """フォルダ内の動画ファイルを名前順に列挙"""
+    return sorted(
+        entry.path for entry in os.scandir(input_dir)
+        if entry.is_file() and entry.name.lower().endswith(VIDEO_EXTENSIONS)
+    )
+
+
+def extract_video_job(video_path, output_dir, extractor_options):
+    """
+    動画1本分の抽出処理（一括処理のプロセスプールで実行される）
+
+    Returns:
+    --------
+    dict
+        動画ごとの処理結果（成否、メッセージ、処理フレーム数、保存枚数、所要時間）
+    """
+    result = {'video': video_path, 'output_dir': output_dir}
+    start = time.perf_counter()
+
+    def on_complete(success, message):
+        result['success'] = success
+        result['message'] = message
+
+    extractor = VideoFrameExtractor(video_path=video_path, output_dir=output_dir, **extractor_options)
+    extractor.set_callbacks(completion_callback=on_complete)
+    try:
+        extractor.extract_frames()
+    except Exception as e:
+        result['success'] = False
+        result['message'] = f"処理中にエラーが発生しました: {str(e)}"
+
+    result.setdefault('success', False)
+    result.setdefault('message', "")
+    result['frames_processed'] = extractor.current_frame
+    result['frames_saved'] = extractor.saved_frames
+    result['wall_time'] = time.perf_counter() - start
+    if extractor.last_stats:
+        result['encode_time'] = extractor.last_stats['encode']['busy']
+        result['write_time'] = extractor.last_stats['write']['busy']
+    return result
+
+
+def batch_output_dirs(videos, output_root):
+    """
+    動画ごとの出力フォルダを決める
+
+    通常は 出力フォルダ/動画ファイル名（拡張子なし）/ とし、clip.mp4 と clip.mkv のように
+    拡張子を除くと同名になる動画（大文字小文字の違いを含む）は 出力フォルダ/clip_mp4/ のように
+    拡張子を付けて区別する（同じフォルダとレジューム情報を取り合わないようにする）。
+
+    Returns:
+    --------
+    dict
+        {動画のパス: 出力フォルダ}
+    """
+    stems = [os.path.splitext(os.path.basename(video_path))[0] for video_path in videos]
+    counts = {}
+    for stem in stems:
+        counts[stem.lower()] = counts.get(stem.lower(), 0) + 1
+
+    output_dirs = {}
+    used = {stem.lower() for stem in stems if counts[stem.lower()] == 1}
+    for video_path, stem in zip(videos, stems):
+        name = stem
+        if counts[stem.lower()] > 1:
+            name = base = f"{stem}_{os.path.splitext(video_path)[1].lstrip('.')}"
+            number = 2
+            while name.lower() in used:  # 付けた名前が別の動画と重なる場合は番号を付ける
+                name = f"{base}_{number}"
+                number += 1
+            used.add(name.lower())
+        output_dirs[video_path] = os.path.join(output_root, name)
+    return output_dirs
+
+
+def run_batch(input_dir, output_root, workers=None, summary_path=None, **extractor_options):
+    """
+    フォルダ内の動画を、1動画1プロセスのプロセスプールで一括処理する
+
+    各動画は 出力フォルダ/動画ファイル名（拡張子なし）/ に出力し（同名の動画は batch_output_dirs を参照）、
+    最後に動画ごとの結果を JSON のサマリーとして書き出す。
+
+    Parameters:
+    -----------
+    input_dir : str
+        動画ファイルを含むフォルダ
+    output_root : str
+        出力先のフォルダ
+    workers : int
+        同時に処理する動画の数（プロセス数）。None の場合はCPUコア数
+    summary_path : str
+        サマリーの出力先。None の場合は 出力フォルダ/batch_summary.json
+    extractor_options : dict
+        VideoFrameExtractor に渡す設定
+
+    Returns:
+    --------
+    dict
+        サマリー（動画ごとの結果と全体の所要時間）
+    """
+    videos = find_videos(input_dir)
+    workers = max(1, workers or os.cpu_count() or 1)
+    # 1プロセス内の変化検出スレッド数は、コア数をプロセス数で分け合う
+    extractor_options.setdefault('analysis_workers', max(1, (os.cpu_count() or 1) // workers))
+    os.makedirs(output_root, exist_ok=True)
+    output_dirs = batch_output_dirs(videos, output_root)
+
+    start = time.perf_counter()
+    results = []
+    print(f"{len(videos)}本の動画を {min(workers, max(1, len(videos)))} プロセスで処理します")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(extract_video_job, video_path, output_dirs[video_path], extractor_options): video_path
+            for video_path in videos
+        }
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {'video': futures[future], 'success': False, 'message': str(e),
+                          'frames_processed': 0, 'frames_saved': 0, 'wall_time': 0.0}
+            results.append(result)
+            status = "完了" if result['success'] else "失敗"
+            print(f"[{status}] {os.path.basename(result['video'])}: "
+                  f"{result['frames_processed']}フレーム処理, {result['frames_saved']}枚保存, "
+                  f"{result['wall_time']:.1f}秒")
+
+    results.sort(key=lambda r: r['video'])
+    summary = {
+        'input_dir': os.path.abspath(input_dir),
+        'output_dir': os.path.abspath(output_root),
+        'workers': workers,
+        'total_wall_time': time.perf_counter() - start,
+        'videos': results,
+    }
+    summary_path = summary_path or os.path.join(output_root, "batch_summary.json")
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    print(f"サマリーを保存しました: {summary_path}")
+    return summary
+
+
+def build_arg_parser():
+    """コマンドライン引数の定義"""
+    parser = argparse.ArgumentParser(description="動画フレーム抽出ツール（引数なしでGUIを起動）")
+    subparsers = parser.add_subparsers(dest='command')
+
+    batch = subparsers.add_parser('batch', help="フォルダ内の動画を一括処理")
+    batch.add_argument('input_dir', help="動画ファイルを含むフォルダ")
+    batch.add_argument('output_dir', help="出力先フォルダ（動画ごとにサブフォルダを作成）")
+    batch.add_argument('--workers', type=int, default=None, help="同時に処理する動画の数（既定: CPUコア数）")
+    batch.add_argument('--summary', default=None, help="サマリーJSONの出力先")
+    batch.add_argument('--threshold', type=float, default=0.05, help="変化検出感度 (0.0～1.0)")
+    batch.add_argument('--min-area', type=int, default=500, help="最小変化領域 (px^2)")
+    batch.add_argument('--interval', type=float, default=0, help="サンプリング間隔（秒）")
+    batch.add_argument('--force-sampling', action='store_true', help="サンプリング間隔で強制抽出")
+    batch.add_argument('--resize', type=int, nargs=2, metavar=('WIDTH', 'HEIGHT'), help="出力サイズ")
+    batch.add_argument('--format', choices=['jpg', 'png', 'webp'], default='jpg', help="出力形式")
+    batch.add_argument('--quality', type=int, default=None, help="JPEG/WebP の品質（既定: JPEG 95, WebP 90）")
+    batch.add_argument('--png-compression', type=int, default=3, choices=range(10), metavar='0-9', help="PNG の圧縮レベル")
+    batch.add_argument('--analysis-width', type=int, default=None, help="解析解像度の幅")
+    batch.add_argument('--no-resume', action='store_true', help="前回の続きから再開しない")
+    batch.add_argument('--index', choices=['ndjson', 'npz'], default=None, help="変化インデックスの出力形式")
+    batch.add_argument('--roi', type=parse_regions, default=None, help="解析範囲 \"x,y,w,h; x,y,w,h\"")
+    batch.add_argument('--ignore', type=parse_regions, default=None, help="除外範囲 \"x,y,w,h; x,y,w,h\"")
+
+    bench = subparsers.add_parser('benchmark-analysis', help="解析解像度による速度と検出結果の比較")
+    bench.add_argument('video', help="入力動画ファイル")
+    bench.add_argument('--width', type=int, default=640, help="比較する解析解像度の幅")
+    bench.add_argument('--max-frames', type=int, default=None, help="計測するフレーム数の上限")
+
+    rebuild = subparsers.add_parser('rebuild-index', help="変化インデックスから別の閾値で抽出結果を求め直す")
+    rebuild.add_argument('index', help="変化インデックス (.ndjson または .npz)")
+    rebuild.add_argument('--threshold', type=float, default=None, help="変化検出感度（既定: 記録時の値）")
+    rebuild.add_argument('--min-area', type=float, default=None, help="最小変化領域（既定: 記録時の値）")
+    rebuild.add_argument('--prefilter', type=float, default=None, help="事前判定の閾値（既定: 記録時の値）")
+
+    bench_progress = subparsers.add_parser('benchmark-progress', help="進捗通知をまとめる前後の所要時間の比較")
+    bench_progress.add_argument('video', help="入力動画ファイル")
+    bench_progress.add_argument('--interval', type=float, default=0.1, help="進捗通知の最小間隔（秒）")
+    return parser
+
+
+def benchmark_progress_throttling(video_path, **extractor_options):
+    """
+    進捗通知をまとめる前後で抽出処理の所要時間を比較する
+
+    Tk を起動せずに、GUIの進捗コールバックと同等の処理を模擬する。
+    - 従来: 毎フレーム進捗を通知し、30フレームごとに動画を開き直してプレビューを作成
+    - 現在: progress_interval ごとに進捗を通知し、保存したフレームだけをプレビューに使用
+
+    Returns:
+    --------
+    dict
+        それぞれの所要時間（秒）、進捗通知の回数、プレビュー作成回数
+    """
+    import tempfile
+
+    def run(progress_interval, legacy):
+        counts = {'progress': 0, 'preview': 0}
+
+        def on_progress(current_frame, total_frames, current_time, total_time, saved_frames, stage_stats=None):
+            counts['progress'] += 1
+            if legacy and current_frame % 30 == 0:
+                cap = cv2.VideoCapture(str(video_path))
+                cap.set(cv2.CAP_PROP_POS_FRAMES, current_frame)
+                ret, frame = cap.read()
+                if ret:
+                    make_preview_image(frame)
+                    counts['preview'] += 1
+                cap.release()
+
+        def on_preview(frame):
+            make_preview_image(frame)
+            counts['preview'] += 1
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            options = dict(extractor_options, progress_interval=progress_interval, resume=False)
+            extractor = VideoFrameExtractor(video_path=video_path, output_dir=output_dir, **options)
+            extractor.set_callbacks(progress_callback=on_progress,
+                                    preview_callback=None if legacy else on_preview)
+            start = time.perf_counter()
+            extractor.extract_frames()
+            counts['seconds'] = time.perf_counter() - start
+        return counts
+
+    legacy = run(0, legacy=True)
+    throttled = run(extractor_options.pop('progress_interval', 0.1), legacy=False)
+    print(f"従来（毎フレーム通知）: {legacy['seconds']:.2f}秒, 進捗通知 {legacy['progress']}回, "
+          f"プレビュー {legacy['preview']}回")
+    print(f"まとめて通知: {throttled['seconds']:.2f}秒, 進捗通知 {throttled['progress']}回, "
+          f"プレビュー {throttled['preview']}回")
+    saved = legacy['seconds'] - throttled['seconds']
+    print(f"短縮: {saved:.2f}秒 ({saved * 100 / legacy['seconds'] if legacy['seconds'] > 0 else 0:.1f}%)")
+    return {'legacy': legacy, 'throttled': throttled}
+
+
 def main():
     """メインエントリーポイント"""
+    args = build_arg_parser().parse_args()
+
+    if args.command == 'batch':
+        run_batch(
+            args.input_dir, args.output_dir, workers=args.workers, summary_path=args.summary,
+            diff_threshold=args.threshold,
+            min_area_threshold=args.min_area,
+            sample_interval=args.interval,
+            force_sampling=args.force_sampling,
+            resize_output=args.resize is not None,
+            output_width=args.resize[0] if args.resize else None,
+            output_height=args.resize[1] if args.resize else None,
+            output_format=args.format,
+            analysis_width=args.analysis_width,
+            resume=not args.no_resume,
+            index_format=args.index,
+            jpeg_quality=args.quality or 95,
+            webp_quality=args.quality or 90,
+            png_compression=args.png_compression,
+            roi=args.roi or None,
+            ignore_regions=args.ignore or None,
+        )
+        return
+    if args.command == 'benchmark-analysis':
+        benchmark_analysis_resolution(args.video, analysis_width=args.width, max_frames=args.max_frames)
+        return
+    if args.command == 'rebuild-index':
+        result = rebuild_from_index(args.index, diff_threshold=args.threshold,
+                                    min_area_threshold=args.min_area, prefilter_threshold=args.prefilter)
+        print(json.dumps(result, ensure_ascii=False))
+        return
+    if args.command == 'benchmark-progress':
+        benchmark_progress_throttling(args.video, progress_interval=args.interval)
+        return
+    
     root = tk.Tk()
     app = VideoFrameExtractorApp(root)
     root.mainloop()
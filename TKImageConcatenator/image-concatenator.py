@@ -4,22 +4,88 @@
 - 連結方向: 上から下、右から左、左から右、ジグザグ(左右交互、2行)
 - 画像間に10pxの黒い帯を追加
 - ファイル名から時系列順にソート
+- PNG出力時は帯ごとに書き出し、連結結果全体をメモリに持たない
 """
 
 import os
 import re
 import tkinter as tk
 from tkinter import filedialog, ttk, messagebox
-from PIL import Image, ImageTk, ImageDraw
+from PIL import Image, ImageTk, ImageChops
 import datetime
+import struct
+import tempfile
+import zlib
 from functools import cmp_to_key
 from threading import Thread
 
+STREAM_BAND_BYTES = 16 * 1024 * 1024  # 帯ごとに書き出す場合の1帯あたりのバイト数の目安
+
+
+class PNGStreamWriter:
+    """
+    RGB画像を上から帯ごとに受け取ってPNGに書き出すエンコーダ
+
+    画像全体をメモリに持たずに保存するため、各行にUpフィルタを掛けて
+    zlibで逐次圧縮し、IDATチャンクとして書き出す。
+    """
+
+    def __init__(self, path, width, height, compress_level=6):
+        self.width = width
+        self.height = height
+        self.prev_row = Image.new('RGB', (width, 1))  # 1行目の「上の行」はゼロとして扱う
+        self.compressor = zlib.compressobj(compress_level)
+        self.file = open(path, 'wb')
+        self.file.write(b'\x89PNG\r\n\x1a\n')
+        # 8bit RGB、インターレースなし
+        self._write_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+
+    def _write_chunk(self, chunk_type, data):
+        self.file.write(struct.pack('>I', len(data)))
+        self.file.write(chunk_type)
+        self.file.write(data)
+        self.file.write(struct.pack('>I', zlib.crc32(chunk_type + data) & 0xffffffff))
+
+    def write_band(self, band):
+        """
+        次の帯を書き出す
+
+        Parameters:
+        -----------
+        band : PIL.Image
+            幅が出力と同じRGB画像
+        """
+        # Upフィルタ: 各行から1行上の値を引く (1行下にずらした画像との差分)
+        shifted = Image.new('RGB', band.size)
+        shifted.paste(self.prev_row, (0, 0))
+        if band.height > 1:
+            shifted.paste(band.crop((0, 0, self.width, band.height - 1)), (0, 1))
+        filtered = ImageChops.subtract_modulo(band, shifted).tobytes()
+        self.prev_row = band.crop((0, band.height - 1, self.width, band.height))
+
+        stride = self.width * 3
+        raw = b''.join(b'\x02' + filtered[i:i + stride] for i in range(0, len(filtered), stride))
+        data = self.compressor.compress(raw)
+        if data:
+            self._write_chunk(b'IDAT', data)
+
+    def close(self):
+        """残りの圧縮データと終端を書き出してファイルを閉じる"""
+        if self.file.closed:
+            return
+        try:
+            self._write_chunk(b'IDAT', self.compressor.flush())
+            self._write_chunk(b'IEND', b'')
+        finally:
+            self.file.close()
+
+
+
 class ImageConcatenator:
     """画像連結の核となるロジッククラス"""
 
     def __init__(self, image_paths=None, output_path=None, 
-                 direction="vertical", boundary_size=10):
+                 direction="vertical", boundary_size=10, streaming=True):
         """
         初期化メソッド
         
@@ -33,11 +99,14 @@ class ImageConcatenator:
             連結方向 ("vertical", "right_to_left", "left_to_right", "zigzag")
         boundary_size : int
             画像間の境界線のサイズ (px)
+        streaming : bool
+            PNGで出力する場合に、結果全体をメモリに持たず帯ごとに書き出すかどうか
         """
         self.image_paths = image_paths or []
         self.output_path = output_path
         self.direction = direction
         self.boundary_size = boundary_size
+        self.streaming = streaming
         
         # 処理状態
         self.is_processing = False
@@ -90,182 +159,224 @@ class ImageConcatenator:
         sorted_paths = sorted(self.image_paths, key=cmp_to_key(compare_images))
         return sorted_paths
     
+    def compute_layout(self, sizes):
+        """
+        画像サイズから連結後のサイズと各画像の配置を計算する
+
+        Parameters:
+        -----------
+        sizes : list
+            連結順に並べた画像サイズ (幅, 高さ) のリスト
+
+        Returns:
+        --------
+        tuple
+            (連結後の幅, 連結後の高さ, [(画像のインデックス, x, y), ...]) 配置は貼り付け順
+        """
+        count = len(sizes)
+        if self.direction == "vertical":  # 上から下
+            result_width = max(w for w, _ in sizes)
+            result_height = sum(h for _, h in sizes) + (count - 1) * self.boundary_size
+            placements = []
+            y_offset = 0
+            for i, (w, h) in enumerate(sizes):
+                # 水平方向中央揃え
+                placements.append((i, (result_width - w) // 2, y_offset))
+                y_offset += h + self.boundary_size
+
+        elif self.direction in ("left_to_right", "right_to_left"):
+            # 右から左の場合は逆順に並べて、左から右と同じように配置する
+            order = list(range(count))
+            if self.direction == "right_to_left":
+                order.reverse()
+            result_width = sum(w for w, _ in sizes) + (count - 1) * self.boundary_size
+            result_height = max(h for _, h in sizes)
+            placements = []
+            x_offset = 0
+            for i in order:
+                w, h = sizes[i]
+                # 垂直方向中央揃え
+                placements.append((i, x_offset, (result_height - h) // 2))
+                x_offset += w + self.boundary_size
+
+        elif self.direction == "zigzag":  # ジグザグ（左、右、左、右...）
+            # 画像を2行に分ける
+            half_count = (count + 1) // 2  # 奇数の場合は1行目が多くなる
+            first_row = list(range(half_count))
+            second_row = list(range(half_count, count))
+
+            # 各行の幅と高さを計算
+            first_row_width = sum(sizes[i][0] for i in first_row) + (len(first_row) - 1) * self.boundary_size
+            second_row_width = sum(sizes[i][0] for i in second_row) + (len(second_row) - 1) * self.boundary_size if second_row else 0
+            max_first_row_height = max(sizes[i][1] for i in first_row)
+            max_second_row_height = max(sizes[i][1] for i in second_row) if second_row else 0
+
+            result_width = max(first_row_width, second_row_width)
+            result_height = max_first_row_height + max_second_row_height + self.boundary_size if second_row else max_first_row_height
+
+            placements = []
+            # 1行目（左から右）
+            x_offset = 0
+            for i in first_row:
+                placements.append((i, x_offset, 0))
+                x_offset += sizes[i][0] + self.boundary_size
+
+            # 2行目（右から左）
+            if second_row:
+                x_offset = result_width - sizes[second_row[0]][0]
+                y_offset = max_first_row_height + self.boundary_size
+                for i in second_row:
+                    placements.append((i, x_offset, y_offset))
+                    x_offset -= (sizes[i][0] + self.boundary_size)
+        else:
+            raise ValueError(f"不明な連結方向です: {self.direction}")
+
+        return result_width, result_height, placements
+
     def concatenate_images(self):
-        """指定された方向に画像を連結"""
+        """
+        指定された方向に画像を連結
+
+        1パス目でヘッダーだけを読んで画像サイズと配置を決め、2パス目で画像を1枚ずつ
+        読み込んで貼り付ける。PNGで出力する場合 (streaming=True) は結果全体を
+        メモリに持たず、行の帯ごとに作成して書き出す。
+        """
         if not self.image_paths or not self.output_path:
             return False
-        
+
         try:
             # 画像を時系列でソート
             sorted_paths = self.sort_images_by_timestamp()
-            
-            # 画像を読み込む
-            images = []
-            total_width = 0
-            total_height = 0
-            max_width = 0
-            max_height = 0
-            
-            # 進捗情報
+
+            # 1パス目: ヘッダーだけを読んで画像サイズを取得
+            sizes = []
             total_files = len(sorted_paths)
-            current_file = 0
-            
-            for img_path in sorted_paths:
-                current_file += 1
-                
+            for current_file, img_path in enumerate(sorted_paths, 1):
                 if self.stop_requested:
                     break
-                
+
                 try:
-                    img = Image.open(img_path)
-                    images.append(img)
-                    
-                    # 最大サイズを更新
-                    max_width = max(max_width, img.width)
-                    max_height = max(max_height, img.height)
-                    
-                    # 合計サイズを計算
-                    total_width += img.width
-                    total_height += img.height
-                    
+                    with Image.open(img_path) as img:
+                        sizes.append(img.size)
+
                     # 進捗通知
                     if self.progress_callback:
-                        progress = (current_file / total_files) * 40  # 40%: 画像読み込み
-                        self.progress_callback(progress, f"画像を読み込み中 ({current_file}/{total_files})")
-                
+                        progress = (current_file / total_files) * 10  # 10%: 画像サイズの取得
+                        self.progress_callback(progress, f"画像サイズを取得中 ({current_file}/{total_files})")
+
                 except Exception as e:
                     if self.completion_callback:
                         self.completion_callback(False, f"画像の読み込みエラー: {str(e)}")
                     return False
-            
+
             if self.stop_requested:
                 if self.completion_callback:
                     self.completion_callback(False, "処理が中断されました")
                 return False
-            
-            # 方向に応じて新しい画像を作成
-            if self.direction == "vertical":  # 上から下
-                # 10pxの境界線を考慮
-                result_width = max_width
-                result_height = total_height + (len(images) - 1) * self.boundary_size
-                
-                result = Image.new('RGB', (result_width, result_height), color='black')
-                draw = ImageDraw.Draw(result)
-                
-                y_offset = 0
-                for i, img in enumerate(images):
-                    # 水平方向中央揃え
-                    x_offset = (result_width - img.width) // 2
-                    
-                    result.paste(img, (x_offset, y_offset))
-                    y_offset += img.height + self.boundary_size
-                    
-                    # 進捗通知
-                    if self.progress_callback:
-                        progress = 40 + (i / len(images)) * 60  # 40-100%: 画像処理
-                        self.progress_callback(progress, f"画像を連結中 ({i+1}/{len(images)})")
-            
-            elif self.direction == "left_to_right":  # 左から右
-                # 10pxの境界線を考慮
-                result_width = total_width + (len(images) - 1) * self.boundary_size
-                result_height = max_height
-                
-                result = Image.new('RGB', (result_width, result_height), color='black')
-                draw = ImageDraw.Draw(result)
-                
-                x_offset = 0
-                for i, img in enumerate(images):
-                    # 垂直方向中央揃え
-                    y_offset = (result_height - img.height) // 2
-                    
-                    result.paste(img, (x_offset, y_offset))
-                    x_offset += img.width + self.boundary_size
-                    
-                    # 進捗通知
-                    if self.progress_callback:
-                        progress = 40 + (i / len(images)) * 60
-                        self.progress_callback(progress, f"画像を連結中 ({i+1}/{len(images)})")
-            
-            elif self.direction == "right_to_left":  # 右から左
-                # まず左から右に連結してから水平反転
-                result_width = total_width + (len(images) - 1) * self.boundary_size
-                result_height = max_height
-                
-                result = Image.new('RGB', (result_width, result_height), color='black')
-                draw = ImageDraw.Draw(result)
-                
-                x_offset = 0
-                for i, img in enumerate(reversed(images)):  # 逆順に配置
-                    # 垂直方向中央揃え
-                    y_offset = (result_height - img.height) // 2
-                    
-                    result.paste(img, (x_offset, y_offset))
-                    x_offset += img.width + self.boundary_size
-                    
-                    # 進捗通知
-                    if self.progress_callback:
-                        progress = 40 + (i / len(images)) * 60
-                        self.progress_callback(progress, f"画像を連結中 ({i+1}/{len(images)})")
-            
-            elif self.direction == "zigzag":  # ジグザグ（左、右、左、右...）
-                # 画像を2行に分ける
-                half_count = (len(images) + 1) // 2  # 奇数の場合は1行目が多くなる
-                first_row = images[:half_count]
-                second_row = images[half_count:]
-                
-                # 各行の幅と高さを計算
-                first_row_width = sum(img.width for img in first_row) + (len(first_row) - 1) * self.boundary_size
-                second_row_width = sum(img.width for img in second_row) + (len(second_row) - 1) * self.boundary_size if second_row else 0
-                
-                max_row_width = max(first_row_width, second_row_width)
-                max_first_row_height = max(img.height for img in first_row) if first_row else 0
-                max_second_row_height = max(img.height for img in second_row) if second_row else 0
-                
-                # 結果画像のサイズを計算
-                result_width = max_row_width
-                result_height = max_first_row_height + max_second_row_height + self.boundary_size if second_row else max_first_row_height
-                
-                result = Image.new('RGB', (result_width, result_height), color='black')
-                draw = ImageDraw.Draw(result)
-                
-                # 1行目（左から右）
-                x_offset = 0
-                for i, img in enumerate(first_row):
-                    result.paste(img, (x_offset, 0))
-                    x_offset += img.width + self.boundary_size
-                    
-                    # 進捗通知
-                    if self.progress_callback:
-                        progress = 40 + (i / len(images)) * 30
-                        self.progress_callback(progress, f"1行目を連結中 ({i+1}/{len(first_row)})")
-                
-                # 2行目（右から左）
-                if second_row:
-                    x_offset = result_width - second_row[0].width
-                    y_offset = max_first_row_height + self.boundary_size
-                    
-                    for i, img in enumerate(second_row):
-                        result.paste(img, (x_offset, y_offset))
-                        x_offset -= (img.width + self.boundary_size)
-                        
-                        # 進捗通知
-                        if self.progress_callback:
-                            progress = 70 + (i / len(images)) * 30
-                            self.progress_callback(progress, f"2行目を連結中 ({i+1}/{len(second_row)})")
-            
-            # 結果を保存
-            result.save(self.output_path)
-            
+
+            result_width, result_height, placements = self.compute_layout(sizes)
+            placements = [(sorted_paths[i], sizes[i], x, y) for i, x, y in placements]
+
+            # 2パス目: 画像を1枚ずつ読み込んで貼り付ける
+            if self.streaming and os.path.splitext(self.output_path)[1].lower() == '.png':
+                completed = self._write_banded(result_width, result_height, placements)
+            else:
+                completed = self._write_canvas(result_width, result_height, placements)
+
+            if not completed:
+                if self.completion_callback:
+                    self.completion_callback(False, "処理が中断されました")
+                return False
+
             if self.completion_callback:
                 self.completion_callback(True, f"画像の連結が完了しました: {self.output_path}")
-            
+
             return True
-        
+
         except Exception as e:
             if self.completion_callback:
                 self.completion_callback(False, f"画像の連結エラー: {str(e)}")
             return False
-    
+
+    def _write_canvas(self, result_width, result_height, placements):
+        """結果全体の画像を作成して保存する (PNG以外の形式)"""
+        result = Image.new('RGB', (result_width, result_height), color='black')
+        for i, (img_path, _, x, y) in enumerate(placements):
+            if self.stop_requested:
+                return False
+            with Image.open(img_path) as img:
+                result.paste(img, (x, y))
+
+            # 進捗通知
+            if self.progress_callback:
+                progress = 10 + ((i + 1) / len(placements)) * 80  # 10-90%: 画像の連結
+                self.progress_callback(progress, f"画像を連結中 ({i+1}/{len(placements)})")
+
+        # 結果を保存
+        if self.progress_callback:
+            self.progress_callback(90, "画像を保存中...")
+        result.save(self.output_path)
+        return True
+
+    def _write_banded(self, result_width, result_height, placements):
+        """
+        結果を行の帯ごとに作成してPNGに書き出す
+
+        画像は1枚ずつ展開して帯に必要な行だけを貼り付ける。横に連結する場合のように
+        複数の帯に掛かる画像は、最初に展開したときにRGBの画素データを出力先と同じフォルダの
+        一時ファイルに書き出し、以降の帯ではそこから必要な行だけを読み込む。
+        そのためメモリに置くのは現在の帯と、展開中の画像1枚だけになる。
+        """
+        band_height = max(1, STREAM_BAND_BYTES // (result_width * 3))
+        spilled = {} # {placementのインデックス: 一時ファイル内の開始位置} 以降の帯にも掛かる画像
+        writer = PNGStreamWriter(self.output_path, result_width, result_height)
+        completed = False
+        try:
+            with tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(self.output_path))) as scratch:
+                for band_top in range(0, result_height, band_height):
+                    if self.stop_requested:
+                        return False
+                    band_bottom = min(result_height, band_top + band_height)
+                    band = Image.new('RGB', (result_width, band_bottom - band_top), color='black')
+
+                    # 貼り付け順を保ったまま、この帯に掛かっている行を貼り付ける
+                    for i, (img_path, (w, h), x, y) in enumerate(placements):
+                        if y >= band_bottom or y + h <= band_top:
+                            continue
+                        top = max(y, band_top)
+                        bottom = min(y + h, band_bottom)
+                        if i in spilled:
+                            scratch.seek(spilled[i] + (top - y) * w * 3)
+                            rows = Image.frombytes('RGB', (w, bottom - top), scratch.read((bottom - top) * w * 3))
+                        else:
+                            with Image.open(img_path) as src:
+                                src.load()
+                                img = src if src.mode == 'RGB' else src.convert('RGB')
+                            if y + h > band_bottom:
+                                # 以降の帯にも掛かるので、展開した画素データを一時ファイルに書き出しておく
+                                scratch.seek(0, os.SEEK_END)
+                                spilled[i] = scratch.tell()
+                                for row in range(0, h, band_height):
+                                    scratch.write(img.crop((0, row, w, min(h, row + band_height))).tobytes())
+                            rows = img.crop((0, top - y, w, bottom - y))
+                            del img
+                        band.paste(rows, (x, top - band_top))
+                        if y + h <= band_bottom:
+                            spilled.pop(i, None)
+
+                    writer.write_band(band)
+
+                    # 進捗通知
+                    if self.progress_callback:
+                        progress = 10 + (band_bottom / result_height) * 90  # 10-100%: 画像の連結と書き出し
+                        self.progress_callback(progress, f"画像を連結中 ({band_bottom}/{result_height} 行)")
+            completed = True
+            return True
+        finally:
+            writer.close()
+            if not completed and os.path.exists(self.output_path):
+                os.remove(self.output_path) # 途中までのファイルは残さない
+
     def start_concatenation(self):
         """別スレッドで連結処理を開始"""
         if self.is_processing:
@@ -381,6 +492,11 @@ class ImageConcatenatorApp:
         boundary_scale.grid(row=2, column=1, sticky=tk.W, pady=5)
         ttk.Label(settings_frame, textvariable=self.boundary_size_var).grid(row=2, column=2, sticky=tk.W, pady=5)
         ttk.Label(settings_frame, text="px").grid(row=2, column=3, sticky=tk.W, pady=5)
+
+        # 省メモリモード (PNG出力時のみ有効)
+        self.streaming_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(settings_frame, text="省メモリモード (PNG出力時に帯ごとに書き出す)",
+                        variable=self.streaming_var).grid(row=3, column=0, columnspan=4, sticky=tk.W, pady=5)
         
         # 出力設定フレーム
         output_frame = ttk.LabelFrame(main_frame, text="出力設定", padding="10")
@@ -513,7 +629,8 @@ class ImageConcatenatorApp:
             image_paths=self.image_paths,
             output_path=self.output_path_var.get(),
             direction=self.direction_var.get(),
-            boundary_size=self.boundary_size_var.get()
+            boundary_size=self.boundary_size_var.get(),
+            streaming=self.streaming_var.get()
         )
         
         # コールバックの設定
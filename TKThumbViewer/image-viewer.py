@@ -1,13 +1,645 @@
 import os
+import io
+import sys
+import errno
+import argparse
 import json
+import time
 import shutil
+import sqlite3
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
-from PIL import Image, ImageTk, ImageDraw
+from tkinter import ttk, filedialog, messagebox, colorchooser
+from PIL import Image, ImageTk, ImageDraw, ExifTags
 import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from collections import OrderedDict
 from functools import partial
 
+
+def _exif_thumbnail(img):
+    """JPEGのEXIFに埋め込まれたサムネイルを取り出す（なければ None）"""
+    raw = img.info.get("exif")
+    if not raw:
+        return None
+    try:
+        ifd1 = img.getexif().get_ifd(ExifTags.IFD.IFD1)
+        offset = ifd1.get(0x0201)  # JPEGInterchangeFormat
+        length = ifd1.get(0x0202)  # JPEGInterchangeFormatLength
+        if not offset or not length:
+            return None
+        # オフセットは "Exif\0\0" の後ろにあるTIFFヘッダーからの位置
+        start = 6 + offset if raw.startswith(b"Exif\x00\x00") else offset
+        thumb = Image.open(io.BytesIO(raw[start:start + length]))
+        thumb.load()
+        return thumb
+    except Exception:
+        return None
+
+
+def load_image_fast(path, max_size, upscale=False, use_exif_thumbnail=False):
+    """
+    画像を指定サイズに収まるように高速に読み込む
+
+    JPEGはEXIFの埋め込みサムネイル（十分な大きさでアスペクト比が一致する場合）か、
+    draft() による 1/2・1/4・1/8 の縮小デコードを使い、フル解像度での展開を避ける。
+    それ以外の形式は reducing_gap 付きのリサイズ（reduce() による事前縮小）で処理する。
+
+    Parameters:
+    -----------
+    path : str
+        画像ファイルのパス
+    max_size : tuple
+        収める大きさ（幅, 高さ）
+    upscale : bool
+        小さい画像を max_size まで拡大するかどうか
+    use_exif_thumbnail : bool
+        EXIFの埋め込みサムネイルを使ってよいかどうか（サムネイル表示向け）
+
+    Returns:
+    --------
+    tuple
+        (縮小済みの画像, 元画像のサイズ)
+    """
+    img = Image.open(path)
+    width, height = img.size
+    ratio = min(max_size[0] / width, max_size[1] / height)
+    if not upscale:
+        ratio = min(ratio, 1.0)
+    new_size = (max(1, int(width * ratio)), max(1, int(height * ratio)))
+    if new_size == (width, height):
+        img.load()
+        return img, (width, height)
+    
+    if img.format == "JPEG":
+        if use_exif_thumbnail:
+            thumb = _exif_thumbnail(img)
+            if (thumb is not None and thumb.width >= new_size[0] and thumb.height >= new_size[1]
+                    and abs(thumb.width / thumb.height - width / height) < 0.02):
+                return thumb.resize(new_size, Image.LANCZOS), (width, height)
+        # 仕上げのリサイズ用に目標の2倍以上の大きさでデコードする
+        img.draft(img.mode if img.mode in ("RGB", "L") else None, (new_size[0] * 2, new_size[1] * 2))
+    
+    return img.resize(new_size, Image.LANCZOS, reducing_gap=2.0), (width, height)
+
+
+def benchmark_image_loader(image_paths=None, thumbnail_size=(160, 90), preview_size=(1200, 700)):
+    """
+    フル解像度でのデコードと load_image_fast の読み込み時間を比較する
+
+    image_paths を省略した場合は 24MP (6000x4000) のJPEGを一時フォルダに作成して計測する。
+
+    Returns:
+    --------
+    dict
+        サムネイル・プレビューそれぞれの平均時間（秒）
+    """
+    import tempfile
+    
+    def full_decode(path, max_size, upscale):
+        # 従来の処理: フル解像度で展開してから LANCZOS で縮小
+        img = Image.open(path)
+        width, height = img.size
+        ratio = min(max_size[0] / width, max_size[1] / height)
+        if not upscale:
+            ratio = min(ratio, 1.0)
+        return img.resize((max(1, int(width * ratio)), max(1, int(height * ratio))), Image.LANCZOS)
+    
+    def measure(func, paths):
+        start = time.perf_counter()
+        for path in paths:
+            func(path)
+        return (time.perf_counter() - start) / len(paths)
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if not image_paths:
+            image_paths = []
+            base = Image.linear_gradient("L").resize((6000, 4000))
+            for i in range(3):
+                path = os.path.join(temp_dir, f"bench_{i}.jpg")
+                # 写真に近いファイルサイズになるよう、粗いノイズを拡大して使う
+                noise = Image.effect_noise((1500, 1000), 40 + i * 10).resize((6000, 4000), Image.BICUBIC)
+                Image.merge("RGB", (base, noise, base.rotate(180))).save(path, "JPEG", quality=92)
+                image_paths.append(path)
+        
+        results = {
+            "thumbnail_full": measure(lambda p: full_decode(p, thumbnail_size, True), image_paths),
+            "thumbnail_fast": measure(lambda p: load_image_fast(p, thumbnail_size, upscale=True, use_exif_thumbnail=True), image_paths),
+            "preview_full": measure(lambda p: full_decode(p, preview_size, False), image_paths),
+            "preview_fast": measure(lambda p: load_image_fast(p, preview_size), image_paths),
+        }
+    
+    for kind, size in (("thumbnail", thumbnail_size), ("preview", preview_size)):
+        full, fast = results[f"{kind}_full"], results[f"{kind}_fast"]
+        print(f"{kind} {size[0]}x{size[1]}: フルデコード {full * 1000:.1f}ms, "
+              f"高速読み込み {fast * 1000:.1f}ms ({full / fast if fast > 0 else 0:.1f}倍)")
+    return results
+
+
+def _flatten_alpha(img, format_type):
+    """JPEGで保存する場合はアルファチャンネルを白背景に合成する"""
+    if img.mode == 'RGBA' and format_type and format_type.lower() == 'jpg':
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.split()[3])
+        return background
+    return img
+
+
+def _save_image(img, src_path, dst_path, format_type, quality):
+    """指定形式（未指定の場合は元の形式）で保存"""
+    ext = f".{format_type.lower()}" if format_type else os.path.splitext(src_path)[1].lower()
+    if ext in ('.jpg', '.jpeg'):
+        img.save(dst_path, 'JPEG', quality=quality)
+    elif ext == '.png':
+        img.save(dst_path, 'PNG')
+    elif ext == '.bmp':
+        img.save(dst_path, 'BMP')
+    else:
+        img.save(dst_path)
+
+
+def convert_image_task(src_path, dst_path, options):
+    """形式変換（ワーカープロセスで実行）"""
+    img = Image.open(src_path)
+    img.load()
+    img = _flatten_alpha(img, options['format_type'])
+    _save_image(img, src_path, dst_path, options['format_type'], options['quality'])
+    return dst_path
+
+
+def resize_image_task(src_path, dst_path, options):
+    """リサイズ（ワーカープロセスで実行）"""
+    img = Image.open(src_path)
+    orig_width, orig_height = img.size
+    resize_mode = options['resize_mode']
+    width = options['width'] or orig_width
+    height = options['height'] or orig_height
+    
+    if resize_mode == "比率を維持":
+        # アスペクト比を維持
+        if options['width'] and options['height']:
+            ratio = min(width / orig_width, height / orig_height)
+        elif options['width']:
+            ratio = width / orig_width
+        elif options['height']:
+            ratio = height / orig_height
+        else:
+            ratio = 1.0
+        resized_img = img.resize((int(orig_width * ratio), int(orig_height * ratio)), Image.LANCZOS)
+    
+    elif resize_mode == "指定サイズに合わせる":
+        # 指定サイズに合わせる（余白なし）
+        resized_img = img.resize((width, height), Image.LANCZOS)
+    
+    elif resize_mode == "トリミング":
+        # アスペクト比を維持しつつ、はみ出た部分をトリミング
+        ratio = max(width / orig_width, height / orig_height)
+        interim_width = int(orig_width * ratio)
+        interim_height = int(orig_height * ratio)
+        interim_img = img.resize((interim_width, interim_height), Image.LANCZOS)
+        
+        # 中央部分を切り出し
+        left = (interim_width - width) // 2
+        top = (interim_height - height) // 2
+        resized_img = interim_img.crop((left, top, left + width, top + height))
+    
+    else:
+        raise ValueError(f"不明なリサイズ方法です: {resize_mode}")
+    
+    resized_img = _flatten_alpha(resized_img, options['format_type'])
+    _save_image(resized_img, src_path, dst_path, options['format_type'], options['quality'])
+    return dst_path
+
+
+def fill_region_task(src_path, dst_path, options):
+    """領域の塗りつぶし（ワーカープロセスで実行）"""
+    img = Image.open(src_path)
+    img.load()
+    
+    # 指定領域を塗りつぶし
+    draw = ImageDraw.Draw(img)
+    draw.rectangle([options['x1'], options['y1'], options['x2'], options['y2']], fill=options['color'])
+    
+    img = _flatten_alpha(img, options['format_type'])
+    _save_image(img, src_path, dst_path, options['format_type'], options['quality'])
+    return dst_path
+
+
+def run_batch_operation(task, jobs, options, max_workers=None, progress_callback=None, cancel_event=None):
+    """
+    画像処理タスクを複数プロセスで並列に実行する
+
+    ファイル単位でワーカープロセスに割り振り、終わったものから順に結果を通知する。
+    ワーカーはダイアログを表示しないため、上書きの扱いは呼び出し側で事前に決めておく。
+
+    Parameters:
+    -----------
+    task : callable
+        task(入力パス, 出力パス, options) の形で呼び出すモジュールレベルの関数
+    jobs : list
+        (入力パス, 出力パス) のリスト
+    options : dict
+        タスクに渡す設定
+    max_workers : int
+        プロセス数（既定: CPUコア数）
+    progress_callback : callable
+        1ファイル終わるごとに progress_callback(完了数, 総数, 入力パス, エラー文字列またはNone) を呼ぶ
+        （実行中のスレッドから呼ばれる）
+    cancel_event : threading.Event
+        セットされると、まだ開始していないファイルを取り消す
+
+    Returns:
+    --------
+    dict
+        processed: 出力したファイルのリスト, errors: (入力パス, エラー) のリスト, cancelled: 取り消したかどうか
+    """
+    results = {'processed': [], 'errors': [], 'cancelled': False}
+    if not jobs:
+        return results
+    
+    workers = max(1, min(max_workers or os.cpu_count() or 1, len(jobs)))
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = {executor.submit(task, src_path, dst_path, options): src_path for src_path, dst_path in jobs}
+        done_count = 0
+        for future in as_completed(futures):
+            if future.cancelled():
+                continue
+            src_path = futures[future]
+            error = None
+            try:
+                results['processed'].append(future.result())
+            except Exception as e:
+                error = str(e)
+                results['errors'].append((src_path, error))
+                print(f"処理エラー: {os.path.basename(src_path)}: {error}")
+            
+            done_count += 1
+            if progress_callback:
+                progress_callback(done_count, len(jobs), src_path, error)
+            
+            # 取り消し要求があれば未開始のファイルを取り消す（実行中のものは完了を待つ）
+            if cancel_event is not None and cancel_event.is_set() and not results['cancelled']:
+                results['cancelled'] = True
+                for pending in futures:
+                    pending.cancel()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    
+    return results
+
+
+# コピー時に一度に転送するバイト数
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+class TransferCancelled(Exception):
+    """ファイル転送が取り消された"""
+
+
+def _copy_with_kernel(src, dst, size, on_bytes, cancel_event):
+    """
+    copy_file_range / sendfile でカーネル内コピーする
+
+    Returns:
+    --------
+    int or None
+        コピーしたバイト数。この環境で使えない場合は None（通常の読み書きで代替する）
+    """
+    copy_file_range = getattr(os, 'copy_file_range', None)
+    sendfile = getattr(os, 'sendfile', None) if sys.platform.startswith('linux') else None
+    if copy_file_range is None and sendfile is None:
+        return None
+    
+    in_fd, out_fd = src.fileno(), dst.fileno()
+    offset = 0
+    while offset < size:
+        if cancel_event is not None and cancel_event.is_set():
+            raise TransferCancelled()
+        count = min(COPY_CHUNK_SIZE, size - offset)
+        try:
+            if copy_file_range is not None:
+                copied = copy_file_range(in_fd, out_fd, count)
+            else:
+                copied = sendfile(out_fd, in_fd, offset, count)
+        except OSError as e:
+            # 異なるファイルシステム間などで使えない場合は最初のチャンクで判定できる
+            if offset == 0 and e.errno in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EPERM):
+                return None
+            raise
+        if copied == 0:
+            break
+        offset += copied
+        on_bytes(copied)
+    return offset
+
+
+def _copy_file_data(src_path, dst_path, on_bytes, cancel_event):
+    """
+    ファイルの内容と更新日時などの属性をコピーする
+
+    チャンクごとに取り消しを確認し、取り消しや失敗の場合は書きかけのファイルを削除する。
+    """
+    try:
+        with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+            size = os.fstat(src.fileno()).st_size
+            if _copy_with_kernel(src, dst, size, on_bytes, cancel_event) is None:
+                # 大きなバッファで読み書き
+                buffer = bytearray(COPY_CHUNK_SIZE)
+                view = memoryview(buffer)
+                while True:
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise TransferCancelled()
+                    length = src.readinto(buffer)
+                    if not length:
+                        break
+                    dst.write(view[:length])
+                    on_bytes(length)
+    except BaseException:
+        try:
+            os.remove(dst_path)
+        except OSError:
+            pass
+        raise
+    shutil.copystat(src_path, dst_path)
+
+
+def transfer_files(jobs, move=False, max_workers=4, progress_callback=None, cancel_event=None, progress_interval=0.1):
+    """
+    ファイルを一括でコピー・移動する
+
+    - 移動で入力と出力が同じファイルシステムにある場合は名前の変更（os.replace）だけで済ませる
+    - それ以外はスレッドプールで並列にコピーする（移動の場合はコピー後に元のファイルを削除）
+    上書きの扱いは呼び出し側で事前に決めておく（出力先の既存ファイルは上書きする）。
+
+    Parameters:
+    -----------
+    jobs : list
+        (入力パス, 出力パス) のリスト
+    move : bool
+        移動する場合 True
+    max_workers : int
+        並列にコピーするファイル数
+    progress_callback : callable
+        progress_callback(完了ファイル数, 総ファイル数, 転送バイト数, 総バイト数, バイト/秒) を
+        progress_interval 秒ごとに呼ぶ（実行中のスレッドから呼ばれる）
+    cancel_event : threading.Event
+        セットされると、コピー中のファイルも途中で中断する
+    progress_interval : float
+        進捗通知の最小間隔（秒）
+
+    Returns:
+    --------
+    dict
+        processed: 出力したファイルのリスト, errors: (入力パス, エラー) のリスト,
+        cancelled: 取り消したかどうか, bytes: 転送バイト数, seconds: 所要時間
+    """
+    results = {'processed': [], 'errors': [], 'cancelled': False, 'bytes': 0, 'seconds': 0.0}
+    if not jobs:
+        return results
+    
+    start = time.perf_counter()
+    lock = threading.Lock()
+    state = {'done': 0, 'bytes': 0, 'last_report': 0.0}
+    sizes = {}
+    for src_path, _ in jobs:
+        try:
+            sizes[src_path] = os.path.getsize(src_path)
+        except OSError:
+            sizes[src_path] = 0
+    total_bytes = sum(sizes.values())
+    
+    def report(force=False):
+        now = time.perf_counter()
+        with lock:
+            if not force and now - state['last_report'] < progress_interval:
+                return
+            state['last_report'] = now
+            done_count, done_bytes = state['done'], state['bytes']
+        if progress_callback:
+            elapsed = now - start
+            progress_callback(done_count, len(jobs), done_bytes, total_bytes, done_bytes / elapsed if elapsed > 0 else 0)
+    
+    def on_bytes(length):
+        with lock:
+            state['bytes'] += length
+        report()
+    
+    def transfer_one(src_path, dst_path):
+        if cancel_event is not None and cancel_event.is_set():
+            raise TransferCancelled()
+        if os.path.exists(dst_path) and os.path.samefile(src_path, dst_path):
+            raise shutil.SameFileError(f"同じファイルです: {dst_path}")
+        
+        if move and os.stat(src_path).st_dev == os.stat(os.path.dirname(dst_path) or '.').st_dev:
+            # 同じファイルシステム内の移動は名前の変更だけで済む
+            os.replace(src_path, dst_path)
+            on_bytes(sizes[src_path])
+        else:
+            _copy_file_data(src_path, dst_path, on_bytes, cancel_event)
+            if move:
+                os.remove(src_path)
+        return dst_path
+    
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs))))
+    try:
+        futures = {executor.submit(transfer_one, src_path, dst_path): src_path for src_path, dst_path in jobs}
+        for future in as_completed(futures):
+            if future.cancelled():
+                continue
+            src_path = futures[future]
+            try:
+                results['processed'].append(future.result())
+            except TransferCancelled:
+                pass
+            except Exception as e:
+                results['errors'].append((src_path, str(e)))
+                print(f"転送エラー: {os.path.basename(src_path)}: {e}")
+            with lock:
+                state['done'] += 1
+            report()
+            
+            if cancel_event is not None and cancel_event.is_set() and not results['cancelled']:
+                results['cancelled'] = True
+                for pending in futures:
+                    pending.cancel()
+    finally:
+        executor.shutdown(wait=True)
+    
+    report(force=True)
+    results['bytes'] = state['bytes']
+    results['seconds'] = time.perf_counter() - start
+    return results
+
+
+def format_transfer_rate(bytes_per_second):
+    """転送速度を表示用の文字列にする"""
+    for unit in ('B/s', 'KB/s', 'MB/s'):
+        if bytes_per_second < 1024:
+            return f"{bytes_per_second:.1f} {unit}"
+        bytes_per_second /= 1024
+    return f"{bytes_per_second:.1f} GB/s"
+
+
+class ThumbnailCache:
+    """
+    生成済みサムネイルをSQLiteに保存する永続キャッシュ
+
+    (パス, 更新日時, ファイルサイズ, サムネイルサイズ) をキーにPNGデータを保存し、
+    合計サイズが上限を超えたら最後に参照された日時が古いものから削除する（LRU）。
+    アプリを終了しても残るため、同じフォルダを再表示したときは画像を開き直さずに済む。
+    """
+    DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".image_viewer", "thumbnails.db")
+    DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+    def __init__(self, db_path=DEFAULT_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS thumbnails (
+                path TEXT NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                file_size INTEGER NOT NULL,
+                thumb_width INTEGER NOT NULL,
+                thumb_height INTEGER NOT NULL,
+                data BLOB NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (path, thumb_width, thumb_height)
+            )"""
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_thumbnails_access ON thumbnails (last_access)")
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(LENGTH(data)), 0) FROM thumbnails").fetchone()[0]
+
+    @staticmethod
+    def _key(path, thumb_size):
+        # 更新日時とサイズが変わったファイルは別物として扱う
+        stat = os.stat(path)
+        return os.path.abspath(path), stat.st_mtime_ns, stat.st_size, thumb_size[0], thumb_size[1]
+
+    def get(self, path, thumb_size):
+        """キャッシュ済みのサムネイルを返す（なければ None）"""
+        try:
+            abs_path, mtime_ns, file_size, width, height = self._key(path, thumb_size)
+            with self.lock:
+                row = self.conn.execute(
+                    """SELECT data FROM thumbnails
+                       WHERE path=? AND thumb_width=? AND thumb_height=? AND mtime_ns=? AND file_size=?""",
+                    (abs_path, width, height, mtime_ns, file_size)
+                ).fetchone()
+                if row is None:
+                    return None
+                self.conn.execute(
+                    "UPDATE thumbnails SET last_access=? WHERE path=? AND thumb_width=? AND thumb_height=?",
+                    (time.time(), abs_path, width, height)
+                )
+            img = Image.open(io.BytesIO(row[0]))
+            img.load()
+            return img
+        except Exception as e:
+            print(f"サムネイルキャッシュの読み込みに失敗しました: {e}")
+            return None
+
+    def put(self, path, thumb_size, img):
+        """サムネイルをキャッシュに保存し、上限を超えた分を古い順に削除"""
+        try:
+            abs_path, mtime_ns, file_size, width, height = self._key(path, thumb_size)
+            buffer = io.BytesIO()
+            img.save(buffer, "PNG")
+            data = buffer.getvalue()
+            with self.lock:
+                old = self.conn.execute(
+                    "SELECT LENGTH(data) FROM thumbnails WHERE path=? AND thumb_width=? AND thumb_height=?",
+                    (abs_path, width, height)
+                ).fetchone()
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO thumbnails VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (abs_path, mtime_ns, file_size, width, height, data, time.time())
+                )
+                self.total_bytes += len(data) - (old[0] if old else 0)
+                if self.total_bytes > self.max_bytes:
+                    self._evict()
+        except Exception as e:
+            print(f"サムネイルキャッシュの保存に失敗しました: {e}")
+
+    def _evict(self):
+        # 上限の9割になるまで、参照が古いものから削除（呼び出し側でロックを取得済み）
+        target = self.max_bytes * 0.9
+        rows = self.conn.execute(
+            "SELECT rowid, LENGTH(data) FROM thumbnails ORDER BY last_access"
+        ).fetchall()
+        removed = []
+        for rowid, size in rows:
+            if self.total_bytes <= target:
+                break
+            removed.append((rowid,))
+            self.total_bytes -= size
+        self.conn.executemany("DELETE FROM thumbnails WHERE rowid=?", removed)
+
+    def clear(self):
+        """キャッシュをすべて削除"""
+        with self.lock:
+            self.conn.execute("DELETE FROM thumbnails")
+            self.conn.execute("VACUUM")
+            self.total_bytes = 0
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class ThumbnailSlot:
+    """
+    サムネイル一覧で再利用する1枠分のウィジェット
+
+    スクロールに合わせて表示する画像番号（index）を付け替えて使い回す。
+    """
+    def __init__(self, app):
+        cell_width, cell_height = app.thumbnail_cell_size()
+        self.index = -1
+        self.photo = None
+        
+        self.frame = ttk.Frame(app.thumbnail_canvas, width=cell_width - 10, height=cell_height)
+        self.frame.pack_propagate(False)
+        
+        # 画像ボタン
+        self.btn = tk.Button(self.frame, compound=tk.CENTER, command=lambda: app.select_image(self.index))
+        self.btn.pack()
+        
+        # チェックボックス
+        self.var = tk.BooleanVar()
+        self.cb = ttk.Checkbutton(self.frame, text="", variable=self.var,
+                                  command=lambda: app.toggle_check(self.index, self.var.get()))
+        self.cb.pack()
+        
+        # ファイル名ラベル
+        self.lbl = ttk.Label(self.frame)
+        self.lbl.pack()
+        
+        # ツールチップ（表示する文字列は割り当て時に差し替える）
+        self.btn_tooltip = app.create_tooltip(self.btn, "")
+        self.lbl_tooltip = app.create_tooltip(self.lbl, "")
+        
+        # 割り当てるまでは表示範囲外に置いておく
+        self.window_id = app.thumbnail_canvas.create_window(-cell_width * 2, 0, window=self.frame, anchor=tk.NW)
+
+
 class ImageViewerApp:
+    # 表示範囲の前後に余分に用意するサムネイル数
+    THUMBNAIL_MARGIN = 10
+    # メモリに保持するサムネイル画像の上限
+    THUMBNAIL_MEMORY_LIMIT = 500
+    # 選択中の画像の前後に先読みする枚数
+    PREFETCH_COUNT = 2
+    # 表示用に縮小済みの画像を保持する枚数（先読み分＋戻った時の分）
+    PREVIEW_CACHE_SIZE = PREFETCH_COUNT * 2 + 3
+    # フォルダの自動更新を確認する間隔（ミリ秒）
+    AUTO_REFRESH_INTERVAL_MS = 2000
+
     def __init__(self, root):
         self.root = root
         self.root.title("画像ビューワ")
@@ -16,10 +648,40 @@ class ImageViewerApp:
         # アプリケーションの状態変数
         self.current_folder = None
         self.image_files = []
-        self.thumbnails = []
+        self.image_stats = {}  # パス -> (更新日時, ファイルサイズ)
+        self.folder_mtime = None  # フォルダの更新日時（自動更新の判定用）
         self.thumbnail_size = (80, 45)  # デフォルトサイズ
         self.checked_images = set()
         self.selected_image_index = -1
+        self.invalid_images = set()  # サムネイル生成時に開けなかった画像
+        
+        # サムネイル一覧（表示範囲の分だけ枠を作って再利用する）
+        self.thumbnail_slots = []  # 再利用する ThumbnailSlot
+        self.thumbnail_images = OrderedDict()  # 画像番号 -> 生成済みサムネイル（LRU）
+        self.thumbnail_placeholder = None
+        self.thumbnail_job = None  # 実行中のサムネイル生成ジョブ
+        self.thumbnail_requests = []  # 生成待ちの画像番号（優先順）
+        self.thumbnail_lock = threading.Lock()
+        self.thumbnail_wakeup = threading.Event()
+        
+        # 選択画像の表示（キャンバスに合わせて縮小済みの画像を前後の分まで先読みする）
+        self.preview_cache = OrderedDict()  # (パス, キャンバスサイズ) -> (表示用画像, 元のサイズ)
+        self.preview_cache_lock = threading.Lock()
+        self.preview_canvas_size = None
+        self.prefetch_executor = ThreadPoolExecutor(max_workers=1)
+        self.prefetch_generation = 0
+        self.redisplay_after_id = None
+        
+        # フォルダの自動更新
+        self.auto_refresh_var = tk.BooleanVar(value=False)
+        self.auto_refresh_after_id = None
+        
+        # サムネイルの永続キャッシュ（開けない場合はキャッシュなしで動作）
+        try:
+            self.thumbnail_cache = ThumbnailCache()
+        except Exception as e:
+            print(f"サムネイルキャッシュを開けませんでした: {e}")
+            self.thumbnail_cache = None
         
         # メインフレームの作成
         self.main_frame = ttk.Frame(self.root)
@@ -72,6 +734,12 @@ class ImageViewerApp:
         size_menu.add_command(label="小 (80x45)", command=lambda: self.change_thumbnail_size((80, 45)))
         size_menu.add_command(label="大 (160x90)", command=lambda: self.change_thumbnail_size((160, 90)))
         view_menu.add_cascade(label="サムネイルサイズ", menu=size_menu)
+        view_menu.add_separator()
+        view_menu.add_command(label="フォルダを更新", command=self.refresh_images, accelerator="F5")
+        view_menu.add_checkbutton(label="フォルダを自動更新", variable=self.auto_refresh_var,
+                                  command=self.toggle_auto_refresh)
+        view_menu.add_separator()
+        view_menu.add_command(label="サムネイルキャッシュを削除", command=self.clear_thumbnail_cache)
         
         menubar.add_cascade(label="表示", menu=view_menu)
         
@@ -117,12 +785,8 @@ class ImageViewerApp:
         
         self.thumbnail_scrollbar = ttk.Scrollbar(self.thumbnail_frame, orient=tk.HORIZONTAL, command=self.thumbnail_canvas.xview)
         self.thumbnail_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
-        self.thumbnail_canvas.configure(xscrollcommand=self.thumbnail_scrollbar.set)
-        
-        # サムネイル内部フレーム
-        self.thumbnail_inner_frame = ttk.Frame(self.thumbnail_canvas)
-        self.thumbnail_canvas.create_window((0, 0), window=self.thumbnail_inner_frame, anchor=tk.NW)
-        self.thumbnail_inner_frame.bind("<Configure>", self.on_thumbnail_frame_configure)
+        self.thumbnail_canvas.configure(xscrollcommand=self.on_thumbnail_scroll)
+        self.thumbnail_canvas.bind("<Configure>", self.on_thumbnail_canvas_configure)
         
         # 下部の選択画像表示エリア
         self.image_frame = ttk.LabelFrame(self.right_frame, text="選択画像")
@@ -131,6 +795,7 @@ class ImageViewerApp:
         # 画像表示用キャンバス
         self.image_canvas = tk.Canvas(self.image_frame, bg="black")
         self.image_canvas.pack(fill=tk.BOTH, expand=True)
+        self.image_canvas.bind("<Configure>", self.on_image_canvas_configure)
         
         # ボタンフレーム
         self.button_frame = ttk.Frame(self.right_frame)
@@ -154,6 +819,7 @@ class ImageViewerApp:
         self.root.bind("<Left>", self.prev_image)
         self.root.bind("<Right>", self.next_image)
         self.root.bind("<space>", self.toggle_check_current)
+        self.root.bind("<F5>", lambda event: self.refresh_images())
 
     def initialize_directory_tree(self):
         # ツールバーの作成
@@ -210,35 +876,40 @@ class ImageViewerApp:
         self.current_folder = folder_path
         self.load_images(folder_path)
 
-    def is_valid_image(self, file_path):
-        """画像ファイルの有効性を確認"""
-        try:
-            # 拡張子チェック
-            ext = os.path.splitext(file_path)[1].lower()
-            if ext not in ['.jpg', '.jpeg', '.png', '.gif', '.bmp']:
-                return False
-            
-            # ファイルの存在確認
-            if not os.path.exists(file_path):
-                return False
-            
-            # 画像として開けるかチェック
-            with Image.open(file_path) as img:
-                img.verify()
-            return True
-        except Exception:
-            return False
+    # 一覧に表示する画像の拡張子
+    IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp')
+
+    def scan_image_stats(self, folder_path):
+        """
+        フォルダ内の画像ファイルを拡張子だけで高速に列挙する
+        
+        中身の検証はサムネイル生成時に行うため、ここではファイルを開かない。
+        
+        Returns:
+        --------
+        dict
+            パス -> (更新日時, ファイルサイズ)
+        """
+        stats = {}
+        with os.scandir(folder_path) as entries:
+            for entry in entries:
+                if entry.name.lower().endswith(self.IMAGE_EXTENSIONS) and entry.is_file():
+                    stat = entry.stat()
+                    stats[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        return stats
 
     def load_images(self, folder_path):
         self.status_var.set(f"フォルダを読み込み中: {folder_path}")
         self.image_files = []
+        self.image_stats = {}
+        self.invalid_images = set()
+        self.clear_preview_cache()
         
         try:
-            # フォルダ内のファイルをチェック
-            for file in sorted(os.listdir(folder_path)):
-                file_path = os.path.join(folder_path, file)
-                if self.is_valid_image(file_path):
-                    self.image_files.append(file_path)
+            # フォルダ内の画像ファイルを列挙（検証はサムネイル生成時に行う）
+            self.image_stats = self.scan_image_stats(folder_path)
+            self.image_files = sorted(self.image_stats, key=os.path.basename)
+            self.folder_mtime = os.stat(folder_path).st_mtime_ns
         except Exception as e:
             messagebox.showerror("エラー", f"フォルダを読み込めませんでした: {e}")
             self.status_var.set("エラー: フォルダを読み込めませんでした")
@@ -257,97 +928,303 @@ class ImageViewerApp:
             self.status_var.set(f"画像が見つかりませんでした: {folder_path}")
             self.clear_display()
 
-    def generate_thumbnails(self):
-        # サムネイル表示エリアをクリア
-        for widget in self.thumbnail_inner_frame.winfo_children():
-            widget.destroy()
+    def thumbnail_cell_size(self):
+        """サムネイル1枠の大きさ（幅, 高さ）"""
+        thumb_width, thumb_height = self.thumbnail_size
+        return max(thumb_width, 80) + 20, thumb_height + 70
+
+    def refresh_images(self):
+        """
+        フォルダの内容を現在の一覧と比較し、変わったファイルだけ反映する
         
-        self.thumbnails = []
+        追加・削除されたファイルと、更新日時やサイズが変わったファイルのサムネイルだけを作り直す。
+        チェック状態と選択中の画像はファイル単位で引き継ぐ。
         
-        # 画像がなければ何もしない
+        Returns:
+        --------
+        bool
+            一覧に変更があった場合 True
+        """
+        if not self.current_folder:
+            return False
+        
+        try:
+            new_stats = self.scan_image_stats(self.current_folder)
+            self.folder_mtime = os.stat(self.current_folder).st_mtime_ns
+        except Exception as e:
+            self.status_var.set(f"エラー: フォルダを読み込めませんでした: {e}")
+            return False
+        
+        old_files = self.image_files
+        new_files = sorted(new_stats, key=os.path.basename)
+        changed = {path for path in new_files if path in self.image_stats and self.image_stats[path] != new_stats[path]}
+        if new_files == old_files and not changed:
+            return False
+        
+        # 画像番号の付け替え（削除されたファイルと変更されたファイルの情報は引き継がない）
+        new_positions = {path: i for i, path in enumerate(new_files)}
+        
+        def remap(indices, keep_changed=True):
+            return {new_positions[old_files[i]] for i in indices
+                    if i < len(old_files) and old_files[i] in new_positions
+                    and (keep_changed or old_files[i] not in changed)}
+        
+        selected_path = old_files[self.selected_image_index] if 0 <= self.selected_image_index < len(old_files) else None
+        self.checked_images = remap(self.checked_images)
+        self.invalid_images = remap(self.invalid_images, keep_changed=False)
+        self.thumbnail_images = OrderedDict(
+            (new_positions[old_files[i]], img) for i, img in self.thumbnail_images.items()
+            if i < len(old_files) and old_files[i] in new_positions and old_files[i] not in changed
+        )
+        with self.preview_cache_lock:
+            for key in [key for key in self.preview_cache if key[0] in changed]:
+                del self.preview_cache[key]
+        
+        self.image_files = new_files
+        self.image_stats = new_stats
+        self.save_check_info()
+        self._restart_thumbnail_strip()
+        
+        # 選択中の画像を引き継ぐ（削除された場合は近い位置の画像を選択）
+        if not new_files:
+            self.clear_display()
+        elif selected_path in new_positions and selected_path not in changed:
+            self.selected_image_index = new_positions[selected_path]
+        else:
+            self.select_image(min(max(self.selected_image_index, 0), len(new_files) - 1))
+        
+        self.status_var.set(f"フォルダを更新しました: {len(new_files)}個のファイル")
+        return True
+
+    def _restart_thumbnail_strip(self):
+        # 生成済みのサムネイルを残したまま、一覧の大きさと枠の割り当てをやり直す
+        with self.thumbnail_lock:
+            self.thumbnail_job = job = object()
+            self.thumbnail_requests = []
+        self.thumbnail_wakeup.set()
         if not self.image_files:
+            self._reset_thumbnail_strip()
+            return
+        if self.thumbnail_placeholder is None:
+            # 前の一覧が空だった場合は枠の大きさも決まっていないので、最初から作り直す
+            self.generate_thumbnails()
             return
         
-        # サムネイルを生成するスレッドを開始
-        threading.Thread(target=self._generate_thumbnails_thread, daemon=True).start()
-    
-    def _generate_thumbnails_thread(self):
-        # サムネイルを生成
-        for i, img_path in enumerate(self.image_files):
+        cell_width, cell_height = self.thumbnail_cell_size()
+        self.thumbnail_canvas.configure(scrollregion=(0, 0, len(self.image_files) * cell_width, cell_height + 10))
+        for slot in self.thumbnail_slots:
+            slot.index = -1
+            self.thumbnail_canvas.coords(slot.window_id, -cell_width * 2, 0)
+        self.update_visible_thumbnails()
+        
+        threading.Thread(target=self._generate_thumbnails_thread,
+                         args=(job, list(self.image_files), self.thumbnail_size), daemon=True).start()
+
+    def toggle_auto_refresh(self):
+        # フォルダの自動更新（ポーリング）の切り替え
+        if self.auto_refresh_var.get():
+            self._poll_folder()
+        elif self.auto_refresh_after_id:
+            self.root.after_cancel(self.auto_refresh_after_id)
+            self.auto_refresh_after_id = None
+
+    def _poll_folder(self):
+        # フォルダの更新日時が変わったときだけ一覧を比較する
+        self.auto_refresh_after_id = None
+        if not self.auto_refresh_var.get():
+            return
+        if self.current_folder:
             try:
-                # 画像の読み込み
-                img = Image.open(img_path)
-                
-                # サムネイルのサイズ計算 (アスペクト比を維持)
-                width, height = img.size
-                thumb_width, thumb_height = self.thumbnail_size
-                
-                if width / height > thumb_width / thumb_height:
-                    # 横長の画像
-                    new_width = thumb_width
-                    new_height = int(height * (thumb_width / width))
-                else:
-                    # 縦長の画像
-                    new_height = thumb_height
-                    new_width = int(width * (thumb_height / height))
-                
-                # サムネイル生成
-                img_thumb = img.resize((new_width, new_height), Image.LANCZOS)
-                img_tk = ImageTk.PhotoImage(img_thumb)
-                
-                # メインスレッドでGUIを更新
-                self.root.after(0, self._add_thumbnail, i, img_tk, os.path.basename(img_path))
-                
-                # 状態を更新
-                self.status_var.set(f"サムネイル生成中... ({i+1}/{len(self.image_files)})")
-            except Exception as e:
-                print(f"Error generating thumbnail for {img_path}: {e}")
-                # エラーの場合もダミーサムネイルを表示
-                self.root.after(0, self._add_thumbnail, i, None, os.path.basename(img_path))
+                if os.stat(self.current_folder).st_mtime_ns != self.folder_mtime:
+                    self.refresh_images()
+            except OSError:
+                pass
+        self.auto_refresh_after_id = self.root.after(self.AUTO_REFRESH_INTERVAL_MS, self._poll_folder)
+
+    def _reset_thumbnail_strip(self):
+        # 再利用中の枠と画像を破棄して一覧を空にする
+        for slot in self.thumbnail_slots:
+            slot.frame.destroy()
+        self.thumbnail_canvas.delete("all")
+        self.thumbnail_slots = []
+        self.thumbnail_images.clear()
+        self.thumbnail_placeholder = None
+        with self.thumbnail_lock:
+            self.thumbnail_requests = []
+        self.thumbnail_canvas.configure(scrollregion=(0, 0, 0, 0))
+        self.thumbnail_canvas.xview_moveto(0)
+
+    def generate_thumbnails(self):
+        # 実行中のサムネイル生成を打ち切るため、ジョブを新しくする
+        with self.thumbnail_lock:
+            self.thumbnail_job = job = object()
+        self.thumbnail_wakeup.set()
         
-        # 完了
-        self.status_var.set(f"画像の読み込みが完了しました: {len(self.image_files)}個のファイル")
-    
-    def _add_thumbnail(self, index, img_tk, filename):
-        # サムネイルフレームを作成
-        frame = ttk.Frame(self.thumbnail_inner_frame)
-        frame.grid(row=0, column=index, padx=5, pady=5)
+        # サムネイル表示エリアをクリア
+        self._reset_thumbnail_strip()
         
-        # 画像ボタン
-        if img_tk:
-            btn = tk.Button(frame, image=img_tk, command=lambda idx=index: self.select_image(idx))
-            btn.image = img_tk  # 参照を保持
-            btn.pack()
-        else:
-            # ダミーボタン（エラー時）
-            btn = tk.Button(frame, text="Error", width=10, height=5, command=lambda idx=index: self.select_image(idx))
-            btn.pack()
+        # 画像がなければ何もしない
+        if not self.image_files:
+            return
         
-        # チェックボックス
-        var = tk.BooleanVar()
-        var.set(index in self.checked_images)
-        cb = ttk.Checkbutton(frame, text="", variable=var, command=lambda idx=index, v=var: self.toggle_check(idx, v.get()))
-        cb.pack()
+        # 一覧全体の大きさだけ先に決め、ウィジェットは表示範囲の分だけ作る
+        cell_width, cell_height = self.thumbnail_cell_size()
+        self.thumbnail_placeholder = tk.PhotoImage(width=self.thumbnail_size[0], height=self.thumbnail_size[1])
+        self.thumbnail_canvas.configure(height=cell_height + 10,
+                                        scrollregion=(0, 0, len(self.image_files) * cell_width, cell_height + 10))
+        self.update_visible_thumbnails()
+        
+        # サムネイルを生成するスレッドを開始（表示範囲から要求された分だけ生成する）
+        threading.Thread(target=self._generate_thumbnails_thread,
+                         args=(job, list(self.image_files), self.thumbnail_size), daemon=True).start()
+
+    def _generate_thumbnails_thread(self, job, image_files, thumb_size):
+        # 要求されたサムネイルを順に生成
+        busy = True
+        while True:
+            with self.thumbnail_lock:
+                # 別のフォルダが選択されたら終了
+                if job is not self.thumbnail_job:
+                    return
+                index = self.thumbnail_requests.pop(0) if self.thumbnail_requests else None
+                if index is None:
+                    self.thumbnail_wakeup.clear()
+            
+            if index is None:
+                # 要求が来るまで待機
+                if busy:
+                    busy = False
+                    self.status_var.set(f"画像の読み込みが完了しました: {len(image_files)}個のファイル")
+                self.thumbnail_wakeup.wait(0.5)
+                continue
+            
+            busy = True
+            img_thumb = self._make_thumbnail(image_files[index], thumb_size)
+            
+            # メインスレッドでGUIを更新
+            self.root.after(0, self._set_thumbnail_image, job, index, img_thumb)
+            self.status_var.set(f"サムネイル生成中... ({index+1}/{len(image_files)})")
+
+    def _make_thumbnail(self, img_path, thumb_size):
+        """サムネイル画像を作成（開けない画像は None）"""
+        try:
+            # キャッシュにあればそれを使う
+            img_thumb = self.thumbnail_cache.get(img_path, thumb_size) if self.thumbnail_cache else None
+            if img_thumb is not None:
+                return img_thumb
+            
+            # 画像の読み込み（ここで初めて中身を検証する）
+            # アスペクト比を維持してサムネイルサイズに収める
+            img_thumb, _ = load_image_fast(img_path, thumb_size, upscale=True, use_exif_thumbnail=True)
+            if self.thumbnail_cache:
+                self.thumbnail_cache.put(img_path, thumb_size, img_thumb)
+            return img_thumb
+        except Exception as e:
+            print(f"Error generating thumbnail for {img_path}: {e}")
+            return None
+
+    def _set_thumbnail_image(self, job, index, img_thumb):
+        # 生成したサムネイルを保持し、表示中の枠があれば差し替える
+        if job is not self.thumbnail_job:
+            return
+        if img_thumb is None:
+            # 開けなかった画像は一覧に残すが、チェックと一括処理の対象からは外す
+            self.invalid_images.add(index)
+            if index in self.checked_images:
+                self.checked_images.discard(index)
+                self._refresh_thumbnail_checks()
+        self.thumbnail_images[index] = img_thumb
+        
+        # メモリに保持する画像数を制限（古く参照されたものから破棄）
+        while len(self.thumbnail_images) > self.THUMBNAIL_MEMORY_LIMIT:
+            self.thumbnail_images.popitem(last=False)
+        
+        for slot in self.thumbnail_slots:
+            if slot.index == index:
+                self._show_thumbnail_image(slot)
+                break
+
+    def update_visible_thumbnails(self):
+        """表示範囲（と前後の余白）の分だけ枠を割り当て、足りないサムネイルの生成を要求する"""
+        count = len(self.image_files)
+        if not count or self.thumbnail_placeholder is None:
+            return
         
-        # ファイル名ラベル (短縮表示)
+        cell_width, _ = self.thumbnail_cell_size()
+        left = self.thumbnail_canvas.canvasx(0)
+        view_width = max(self.thumbnail_canvas.winfo_width(), cell_width)
+        first = max(0, int(left // cell_width) - self.THUMBNAIL_MARGIN)
+        last = min(count, int((left + view_width) // cell_width) + 1 + self.THUMBNAIL_MARGIN)
+        
+        # 必要な数だけ枠を用意
+        while len(self.thumbnail_slots) < last - first:
+            self.thumbnail_slots.append(ThumbnailSlot(self))
+        
+        # 範囲内の枠はそのまま使い、範囲外の枠を空いている番号へ回す
+        visible = set(range(first, last))
+        bound = {slot.index for slot in self.thumbnail_slots if slot.index in visible}
+        free_slots = [slot for slot in self.thumbnail_slots if slot.index not in visible]
+        for index in sorted(visible - bound):
+            self._bind_thumbnail_slot(free_slots.pop(), index)
+        for slot in free_slots:
+            if slot.index != -1:
+                slot.index = -1
+                self.thumbnail_canvas.coords(slot.window_id, -cell_width * 2, 0)
+        
+        # 画面の中央に近いものから生成する
+        center = (left + view_width / 2) / cell_width
+        missing = sorted((i for i in visible if i not in self.thumbnail_images), key=lambda i: abs(i - center))
+        with self.thumbnail_lock:
+            self.thumbnail_requests = missing
+        if missing:
+            self.thumbnail_wakeup.set()
+
+    def _bind_thumbnail_slot(self, slot, index):
+        # 枠を指定番号の画像に割り当てる
+        cell_width, _ = self.thumbnail_cell_size()
+        slot.index = index
+        self.thumbnail_canvas.coords(slot.window_id, index * cell_width + 5, 5)
+        
+        filename = os.path.basename(self.image_files[index])
         max_length = 10
         short_name = filename if len(filename) <= max_length else filename[:max_length-3] + "..."
-        lbl = ttk.Label(frame, text=short_name)
-        lbl.pack()
-        
-        # ツールチップ
-        self.create_tooltip(btn, filename)
-        self.create_tooltip(lbl, filename)
-        
-        self.thumbnails.append((btn, var, lbl))
+        slot.lbl.configure(text=short_name)
+        slot.btn_tooltip.text = filename
+        slot.lbl_tooltip.text = filename
+        slot.var.set(index in self.checked_images)
+        self._show_thumbnail_image(slot)
+
+    def _show_thumbnail_image(self, slot):
+        # 枠の画像を更新（未生成なら読み込み中、開けなければエラー表示）
+        thumb_width, thumb_height = self.thumbnail_size
+        if slot.index not in self.thumbnail_images:
+            slot.photo = None
+            slot.btn.configure(image=self.thumbnail_placeholder, text="...", width=thumb_width, height=thumb_height)
+            return
         
-        # サムネイルフレームを更新
-        self.thumbnail_inner_frame.update_idletasks()
-        self.thumbnail_canvas.config(scrollregion=self.thumbnail_canvas.bbox("all"))
+        self.thumbnail_images.move_to_end(slot.index)
+        img_thumb = self.thumbnail_images[slot.index]
+        if img_thumb is None:
+            slot.photo = None
+            slot.btn.configure(image=self.thumbnail_placeholder, text="Error", width=thumb_width, height=thumb_height)
+        else:
+            slot.photo = ImageTk.PhotoImage(img_thumb)  # 参照を保持
+            slot.btn.configure(image=slot.photo, text="", width=thumb_width, height=thumb_height)
+
+    def _refresh_thumbnail_checks(self):
+        # 表示中の枠のチェック状態をデータに合わせる
+        for slot in self.thumbnail_slots:
+            if slot.index >= 0:
+                slot.var.set(slot.index in self.checked_images)
+
+    def on_thumbnail_scroll(self, first, last):
+        # スクロール位置が変わったら表示範囲の枠を割り当て直す
+        self.thumbnail_scrollbar.set(first, last)
+        self.update_visible_thumbnails()
 
-    def on_thumbnail_frame_configure(self, event):
-        # サムネイルフレームのサイズが変わったときにスクロール領域を更新
-        self.thumbnail_canvas.configure(scrollregion=self.thumbnail_canvas.bbox("all"))
+    def on_thumbnail_canvas_configure(self, event):
+        # キャンバスの幅が変わったら表示範囲の枠を割り当て直す
+        self.update_visible_thumbnails()
 
     def select_image(self, index):
         # 画像を選択
@@ -356,11 +1233,11 @@ class ImageViewerApp:
             self.display_selected_image()
             
             # サムネイルをスクロールして表示
-            if self.thumbnails:
-                btn = self.thumbnails[index][0]
-                x = btn.winfo_x()
-                canvas_width = self.thumbnail_canvas.winfo_width()
-                self.thumbnail_canvas.xview_moveto(max(0, (x - canvas_width/2) / self.thumbnail_inner_frame.winfo_width()))
+            cell_width, _ = self.thumbnail_cell_size()
+            x = index * cell_width + cell_width / 2
+            canvas_width = self.thumbnail_canvas.winfo_width()
+            total_width = len(self.image_files) * cell_width
+            self.thumbnail_canvas.xview_moveto(max(0, (x - canvas_width/2) / total_width))
 
     def display_selected_image(self):
         # 初期化
@@ -375,18 +1252,15 @@ class ImageViewerApp:
             
         img_path = self.image_files[self.selected_image_index]
         
+        # キャンバスの大きさが変わったら縮小済みの画像は使えない
+        canvas_size = (canvas_width, canvas_height)
+        if canvas_size != self.preview_canvas_size:
+            self.clear_preview_cache()
+            self.preview_canvas_size = canvas_size
+        
         try:
-            # 画像を読み込む
-            img = Image.open(img_path)
-            
-            # 画像のサイズを調整
-            width, height = img.size
-            
-            if width > canvas_width or height > canvas_height:
-                ratio = min(canvas_width / width, canvas_height / height)
-                new_width = int(width * ratio)
-                new_height = int(height * ratio)
-                img = img.resize((new_width, new_height), Image.LANCZOS)
+            # 画像をキャンバスに収まる大きさで読み込む（先読み済みならそれを使う）
+            img, (width, height) = self._get_preview(img_path, canvas_size)
             
             # 画像を表示
             img_tk = ImageTk.PhotoImage(img)
@@ -405,9 +1279,73 @@ class ImageViewerApp:
             self.image_canvas.create_text(canvas_width//2, canvas_height//2, 
                                         text=f"画像を表示できません\n{str(e)}", fill="white")
             self.image_frame.configure(text="エラー")
+        
+        # 前後の画像を先読み
+        self._schedule_prefetch()
+
+    def _get_preview(self, img_path, canvas_size):
+        """キャンバスに収まるように縮小した画像を返す（キャッシュがなければ読み込む）"""
+        key = (img_path, canvas_size)
+        with self.preview_cache_lock:
+            if key in self.preview_cache:
+                self.preview_cache.move_to_end(key)
+                return self.preview_cache[key]
+        
+        entry = load_image_fast(img_path, canvas_size)
+        with self.preview_cache_lock:
+            self.preview_cache[key] = entry
+            while len(self.preview_cache) > self.PREVIEW_CACHE_SIZE:
+                self.preview_cache.popitem(last=False)
+        return entry
+
+    def _schedule_prefetch(self):
+        # 実行中の先読みを打ち切り、選択中の画像の前後を近い順（次の画像を優先）に先読みする
+        self.prefetch_generation += 1
+        index = self.selected_image_index
+        if index < 0 or not self.preview_canvas_size:
+            return
+        paths = []
+        for offset in range(1, self.PREFETCH_COUNT + 1):
+            for i in (index + offset, index - offset):
+                if 0 <= i < len(self.image_files):
+                    paths.append(self.image_files[i])
+        self.prefetch_executor.submit(self._prefetch_previews, self.prefetch_generation, paths,
+                                      self.preview_canvas_size)
+
+    def _prefetch_previews(self, generation, paths, canvas_size):
+        # 先読みスレッド: 新しい選択があれば中断する
+        for img_path in paths:
+            if generation != self.prefetch_generation:
+                return
+            try:
+                self._get_preview(img_path, canvas_size)
+            except Exception:
+                pass  # 開けない画像は表示時にエラーを表示する
+
+    def clear_preview_cache(self):
+        # 先読みした画像を破棄（実行中の先読みも打ち切る）
+        self.prefetch_generation += 1
+        with self.preview_cache_lock:
+            self.preview_cache.clear()
+
+    def on_image_canvas_configure(self, event):
+        # キャンバスの大きさが変わったら、落ち着いてから表示し直す
+        if (event.width, event.height) == self.preview_canvas_size:
+            return
+        if self.redisplay_after_id:
+            self.root.after_cancel(self.redisplay_after_id)
+        self.redisplay_after_id = self.root.after(150, self._redisplay_selected_image)
+
+    def _redisplay_selected_image(self):
+        self.redisplay_after_id = None
+        if self.selected_image_index >= 0:
+            self.display_selected_image()
 
     def toggle_check(self, index, checked):
-        # チェック状態の切り替え
+        # チェック状態の切り替え（開けなかった画像はチェックできない）
+        if checked and index in self.invalid_images:
+            self._refresh_thumbnail_checks()
+            return
         if checked:
             self.checked_images.add(index)
         else:
@@ -420,27 +1358,21 @@ class ImageViewerApp:
         # 現在選択中の画像のチェック状態を切り替え
         if self.selected_image_index >= 0:
             idx = self.selected_image_index
-            if idx < len(self.thumbnails):
-                var = self.thumbnails[idx][1]
-                var.set(not var.get())
-                self.toggle_check(idx, var.get())
+            self.toggle_check(idx, idx not in self.checked_images)
+            self._refresh_thumbnail_checks()
 
     def check_all(self):
-        # 全ての画像をチェック
-        for i in range(len(self.image_files)):
-            if i < len(self.thumbnails):
-                self.thumbnails[i][1].set(True)
-            self.checked_images.add(i)
+        # 全ての画像をチェック（開けなかった画像は除く）
+        self.checked_images = set(range(len(self.image_files))) - self.invalid_images
+        self._refresh_thumbnail_checks()
         
         # チェック情報を保存
         self.save_check_info()
 
     def uncheck_all(self):
         # 全ての画像のチェックを解除
-        for i in range(len(self.image_files)):
-            if i < len(self.thumbnails):
-                self.thumbnails[i][1].set(False)
         self.checked_images.clear()
+        self._refresh_thumbnail_checks()
         
         # チェック情報を保存
         self.save_check_info()
@@ -489,14 +1421,20 @@ class ImageViewerApp:
         if self.current_folder:
             self.generate_thumbnails()
 
+    def clear_thumbnail_cache(self):
+        # サムネイルキャッシュを削除
+        if not self.thumbnail_cache:
+            return
+        if messagebox.askyesno("確認", "保存されているサムネイルキャッシュを削除しますか？"):
+            self.thumbnail_cache.clear()
+            self.status_var.set("サムネイルキャッシュを削除しました")
+
     def clear_display(self):
         # 表示をクリア
         self.selected_image_index = -1
         
         # サムネイルをクリア
-        for widget in self.thumbnail_inner_frame.winfo_children():
-            widget.destroy()
-        self.thumbnails = []
+        self._reset_thumbnail_strip()
         
         # 画像表示もクリア
         self.image_canvas.delete("all")
@@ -522,78 +1460,17 @@ class ImageViewerApp:
         target_folder = filedialog.askdirectory(title="コピー先フォルダを選択")
         if not target_folder:
             return
-            
-        # 進捗ダイアログ
-        progress_win = tk.Toplevel(self.root)
-        progress_win.title("コピー中")
-        progress_win.geometry("300x100")
-        progress_win.transient(self.root)
-        progress_win.grab_set()
         
-        progress_lbl = ttk.Label(progress_win, text="ファイルをコピー中...")
-        progress_lbl.pack(pady=10)
-        
-        progress_var = tk.DoubleVar()
-        progress_bar = ttk.Progressbar(progress_win, variable=progress_var, maximum=len(self.checked_images))
-        progress_bar.pack(fill=tk.X, padx=10, pady=10)
+        # 上書きの扱いを先に決める
+        jobs = self._plan_batch_jobs(lambda src_path: os.path.join(target_folder, os.path.basename(src_path)))
+        if jobs is None:
+            return
+        skipped_count = len([i for i in self.checked_images if i < len(self.image_files)]) - len(jobs)
         
         # コピー処理を別スレッドで実行
-        threading.Thread(target=self._copy_files_thread, args=(target_folder, progress_win, progress_var, progress_lbl)).start()
-
-    def _copy_files_thread(self, target_folder, progress_win, progress_var, progress_lbl):
-        # ファイルコピーの実行
-        copied_count = 0
-        error_count = 0
-        skipped_count = 0
-        
-        for i, idx in enumerate(sorted(self.checked_images)):
-            if idx >= len(self.image_files):
-                continue
-                
-            src_path = self.image_files[idx]
-            file_name = os.path.basename(src_path)
-            dst_path = os.path.join(target_folder, file_name)
-            
-            progress_var.set(i + 1)
-            progress_lbl.config(text=f"コピー中: {file_name}")
-            progress_win.update_idletasks()
-            
-            try:
-                if os.path.exists(dst_path):
-                    # 同名ファイルが存在する場合
-                    response = messagebox.askyesnocancel(
-                        "確認", 
-                        f"ファイル '{file_name}' は既に存在します。上書きしますか？\n"
-                        "「はい」で上書き、「いいえ」でスキップ、「キャンセル」で処理を中止します。"
-                    )
-                    
-                    if response is None:  # キャンセル
-                        break
-                    elif response:  # はい（上書き）
-                        shutil.copy2(src_path, dst_path)
-                        copied_count += 1
-                    else:  # いいえ（スキップ）
-                        skipped_count += 1
-                        continue
-                else:
-                    shutil.copy2(src_path, dst_path)
-                    copied_count += 1
-                    
-            except Exception as e:
-                error_count += 1
-                print(f"コピーエラー: {e}")
-        
-        # 処理完了
-        progress_win.destroy()
-        
-        # 結果表示
-        result_msg = f"{copied_count}個のファイルをコピーしました。"
-        if skipped_count > 0:
-            result_msg += f"\n{skipped_count}個のファイルをスキップしました。"
-        if error_count > 0:
-            result_msg += f"\n{error_count}個のファイルでエラーが発生しました。"
-            
-        messagebox.showinfo("コピー完了", result_msg)
+        self._run_transfer("コピー中", "ファイルをコピー中...", jobs, False, "コピー完了",
+                           lambda count: f"{count}個のファイルをコピーしました。" +
+                           (f"\n{skipped_count}個のファイルをスキップしました。" if skipped_count > 0 else ""))
 
     def move_checked_images(self):
         # チェックした画像を移動
@@ -609,86 +1486,44 @@ class ImageViewerApp:
         # 確認ダイアログ
         if not messagebox.askyesno("確認", "選択した画像を移動しますか？この操作は元に戻せません。"):
             return
-            
-        # 進捗ダイアログ
-        progress_win = tk.Toplevel(self.root)
-        progress_win.title("移動中")
-        progress_win.geometry("300x100")
         
-        progress_win.transient(self.root)
-        progress_win.grab_set()
-        
-        progress_lbl = ttk.Label(progress_win, text="ファイルを移動中...")
-        progress_lbl.pack(pady=10)
-        
-        progress_var = tk.DoubleVar()
-        progress_bar = ttk.Progressbar(progress_win, variable=progress_var, maximum=len(self.checked_images))
-        progress_bar.pack(fill=tk.X, padx=10, pady=10)
+        # 上書きの扱いを先に決める
+        jobs = self._plan_batch_jobs(lambda src_path: os.path.join(target_folder, os.path.basename(src_path)))
+        if jobs is None:
+            return
+        skipped_count = len([i for i in self.checked_images if i < len(self.image_files)]) - len(jobs)
         
         # 移動処理を別スレッドで実行
-        threading.Thread(target=self._move_files_thread, args=(target_folder, progress_win, progress_var, progress_lbl)).start()
-
-    def _move_files_thread(self, target_folder, progress_win, progress_var, progress_lbl):
-        # ファイル移動の実行
-        moved_count = 0
-        error_count = 0
-        skipped_count = 0
+        self._run_transfer("移動中", "ファイルを移動中...", jobs, True, "移動完了",
+                           lambda count: f"{count}個のファイルを移動しました。" +
+                           (f"\n{skipped_count}個のファイルをスキップしました。" if skipped_count > 0 else ""))
+
+    def _run_transfer(self, title, message, jobs, move, done_title, done_message):
+        # 進捗ダイアログを表示してコピー・移動を別スレッドから実行
+        if not jobs:
+            messagebox.showinfo("情報", "処理するファイルがありません。")
+            return
         
-        # 移動する画像のインデックスリスト（ソート済み）
-        indices_to_move = sorted(self.checked_images)
+        progress_win, progress_var, progress_lbl, cancel_event = self._open_progress_window(title, message, len(jobs))
         
-        for i, idx in enumerate(indices_to_move):
-            if idx >= len(self.image_files):
-                continue
-                
-            src_path = self.image_files[idx]
-            file_name = os.path.basename(src_path)
-            dst_path = os.path.join(target_folder, file_name)
-            
-            progress_var.set(i + 1)
-            progress_lbl.config(text=f"移動中: {file_name}")
-            progress_win.update_idletasks()
-            
-            try:
-                if os.path.exists(dst_path):
-                    # 同名ファイルが存在する場合
-                    response = messagebox.askyesnocancel(
-                        "確認", 
-                        f"ファイル '{file_name}' は既に存在します。上書きしますか？\n"
-                        "「はい」で上書き、「いいえ」でスキップ、「キャンセル」で処理を中止します。"
-                    )
-                    
-                    if response is None:  # キャンセル
-                        break
-                    elif response:  # はい（上書き）
-                        shutil.move(src_path, dst_path)
-                        moved_count += 1
-                    else:  # いいえ（スキップ）
-                        skipped_count += 1
-                        continue
-                else:
-                    shutil.move(src_path, dst_path)
-                    moved_count += 1
-                    
-            except Exception as e:
-                error_count += 1
-                print(f"移動エラー: {e}")
+        def on_progress(done_count, total, done_bytes, total_bytes, rate):
+            # GUIの更新はメインスレッドで行う
+            def update():
+                if progress_win.winfo_exists():
+                    progress_var.set(done_count)
+                    progress_lbl.config(text=f"{message} ({done_count}/{total}) "
+                                             f"{done_bytes / 1048576:.0f}/{total_bytes / 1048576:.0f} MB, "
+                                             f"{format_transfer_rate(rate)}")
+            self.root.after(0, update)
         
-        # 処理完了
-        progress_win.destroy()
-        
-        # 結果表示
-        result_msg = f"{moved_count}個のファイルを移動しました。"
-        if skipped_count > 0:
-            result_msg += f"\n{skipped_count}個のファイルをスキップしました。"
-        if error_count > 0:
-            result_msg += f"\n{error_count}個のファイルでエラーが発生しました。"
-            
-        messagebox.showinfo("移動完了", result_msg)
+        def worker():
+            results = transfer_files(jobs, move=move, progress_callback=on_progress, cancel_event=cancel_event)
+            if results['seconds'] > 0:
+                print(f"{done_title}: {results['bytes'] / 1048576:.1f} MB, {results['seconds']:.2f}秒, "
+                      f"{format_transfer_rate(results['bytes'] / results['seconds'])}")
+            self.root.after(0, self._finish_batch_operation, progress_win, results, done_title, done_message)
         
-        # 移動後は画像リストを更新
-        if moved_count > 0:
-            self.load_images(self.current_folder)
+        threading.Thread(target=worker, daemon=True).start()
 
     def rename_checked_images(self):
         # チェックした画像をリネーム
@@ -749,9 +1584,9 @@ class ImageViewerApp:
             
         messagebox.showinfo("リネーム完了", result_msg)
         
-        # リネーム後は画像リストを更新
+        # リネーム後は変わったファイルだけ一覧に反映
         if renamed_count > 0:
-            self.load_images(self.current_folder)
+            self.refresh_images()
 
     def convert_checked_images(self):
         # チェックした画像の形式を変更
@@ -766,91 +1601,20 @@ class ImageViewerApp:
             
         # 変換設定を取得
         format_type = convert_dialog.format_type
-        quality = convert_dialog.quality
-        
-        # 進捗ダイアログ
-        progress_win = tk.Toplevel(self.root)
-        progress_win.title("変換中")
-        progress_win.geometry("300x100")
-        progress_win.transient(self.root)
-        progress_win.grab_set()
-        
-        progress_lbl = ttk.Label(progress_win, text="ファイルを変換中...")
-        progress_lbl.pack(pady=10)
+        options = {'format_type': format_type, 'quality': convert_dialog.quality}
         
-        progress_var = tk.DoubleVar()
-        progress_bar = ttk.Progressbar(progress_win, variable=progress_var, maximum=len(self.checked_images))
-        progress_bar.pack(fill=tk.X, padx=10, pady=10)
-        
-        # 変換処理を別スレッドで実行
-        threading.Thread(target=self._convert_files_thread, args=(format_type, quality, progress_win, progress_var, progress_lbl)).start()
-
-    def _convert_files_thread(self, format_type, quality, progress_win, progress_var, progress_lbl):
-        # ファイル変換の実行
-        converted_count = 0
-        error_count = 0
-        
-        for i, idx in enumerate(sorted(self.checked_images)):
-            if idx >= len(self.image_files):
-                continue
-                
-            src_path = self.image_files[idx]
+        def make_dst_path(src_path):
             file_name = os.path.splitext(os.path.basename(src_path))[0]
-            dst_path = os.path.join(os.path.dirname(src_path), f"{file_name}.{format_type.lower()}")
-            
-            progress_var.set(i + 1)
-            progress_lbl.config(text=f"変換中: {os.path.basename(src_path)}")
-            progress_win.update_idletasks()
-            
-            try:
-                # 画像を開く
-                img = Image.open(src_path)
-                
-                # RGB形式に変換（アルファチャンネルを処理）
-                if img.mode == 'RGBA' and format_type.lower() == 'jpg':
-                    background = Image.new('RGB', img.size, (255, 255, 255))
-                    background.paste(img, mask=img.split()[3])
-                    img = background
-                
-                # 同名ファイルが存在する場合
-                if os.path.exists(dst_path) and src_path != dst_path:
-                    response = messagebox.askyesnocancel(
-                        "確認", 
-                        f"ファイル '{os.path.basename(dst_path)}' は既に存在します。上書きしますか？"
-                    )
-                    
-                    if response is None:  # キャンセル
-                        continue
-                    elif not response:  # いいえ
-                        continue
-                
-                # 保存
-                if format_type.lower() == 'jpg':
-                    img.save(dst_path, 'JPEG', quality=quality)
-                elif format_type.lower() == 'png':
-                    img.save(dst_path, 'PNG')
-                elif format_type.lower() == 'bmp':
-                    img.save(dst_path, 'BMP')
-                
-                converted_count += 1
-                
-            except Exception as e:
-                error_count += 1
-                print(f"変換エラー: {e}")
+            return os.path.join(os.path.dirname(src_path), f"{file_name}.{format_type.lower()}")
         
-        # 処理完了
-        progress_win.destroy()
-        
-        # 結果表示
-        result_msg = f"{converted_count}個のファイルを{format_type}形式に変換しました。"
-        if error_count > 0:
-            result_msg += f"\n{error_count}個のファイルでエラーが発生しました。"
-            
-        messagebox.showinfo("変換完了", result_msg)
+        # 上書きの扱いを先に決める
+        jobs = self._plan_batch_jobs(make_dst_path)
+        if jobs is None:
+            return
         
-        # 変換後は画像リストを更新
-        if converted_count > 0:
-            self.load_images(self.current_folder)
+        # 変換処理を複数プロセスで実行
+        self._run_batch_operation("変換中", "ファイルを変換中...", convert_image_task, jobs, options,
+                                  "変換完了", lambda count: f"{count}個のファイルを{format_type}形式に変換しました。")
 
     def resize_checked_images(self):
         # チェックした画像をリサイズ
@@ -864,159 +1628,30 @@ class ImageViewerApp:
             return
             
         # リサイズ設定を取得
-        resize_mode = resize_dialog.resize_mode
-        width = resize_dialog.width
-        height = resize_dialog.height
         format_type = resize_dialog.format_type
-        quality = resize_dialog.quality
-        
-        # 進捗ダイアログ
-        progress_win = tk.Toplevel(self.root)
-        progress_win.title("リサイズ中")
-        progress_win.geometry("300x100")
-        progress_win.transient(self.root)
-        progress_win.grab_set()
-        
-        progress_lbl = ttk.Label(progress_win, text="ファイルをリサイズ中...")
-        progress_lbl.pack(pady=10)
-        
-        progress_var = tk.DoubleVar()
-        progress_bar = ttk.Progressbar(progress_win, variable=progress_var, maximum=len(self.checked_images))
-        progress_bar.pack(fill=tk.X, padx=10, pady=10)
-        
-        # リサイズ処理を別スレッドで実行
-        thread_args = (resize_mode, width, height, format_type, quality, progress_win, progress_var, progress_lbl)
-        threading.Thread(target=self._resize_files_thread, args=thread_args).start()
-
-    def _resize_files_thread(self, resize_mode, width, height, format_type, quality, progress_win, progress_var, progress_lbl):
-        # ファイルリサイズの実行
-        resized_count = 0
-        error_count = 0
-        
-        for i, idx in enumerate(sorted(self.checked_images)):
-            if idx >= len(self.image_files):
-                continue
-                
-            src_path = self.image_files[idx]
-            file_name = os.path.splitext(os.path.basename(src_path))[0]
-            
+        options = {
+            'resize_mode': resize_dialog.resize_mode,
+            'width': resize_dialog.width,
+            'height': resize_dialog.height,
+            'format_type': format_type,
+            'quality': resize_dialog.quality,
+        }
+        
+        def make_dst_path(src_path):
             # 出力ファイル名を生成
+            file_name, ext = os.path.splitext(os.path.basename(src_path))
             if format_type:
-                dst_path = os.path.join(os.path.dirname(src_path), f"{file_name}_resized.{format_type.lower()}")
-            else:
-                ext = os.path.splitext(src_path)[1]
-                dst_path = os.path.join(os.path.dirname(src_path), f"{file_name}_resized{ext}")
-            
-            progress_var.set(i + 1)
-            progress_lbl.config(text=f"リサイズ中: {os.path.basename(src_path)}")
-            progress_win.update_idletasks()
-            
-            try:
-                # 画像を開く
-                img = Image.open(src_path)
-                orig_width, orig_height = img.size
-                
-                # リサイズ方法に応じて処理
-                if resize_mode == "比率を維持":
-                    # アスペクト比を維持
-                    if width and height:
-                        ratio = min(width / orig_width, height / orig_height)
-                    elif width:
-                        ratio = width / orig_width
-                    elif height:
-                        ratio = height / orig_height
-                    else:
-                        ratio = 1.0
-                        
-                    new_width = int(orig_width * ratio)
-                    new_height = int(orig_height * ratio)
-                    resized_img = img.resize((new_width, new_height), Image.LANCZOS)
-                    
-                elif resize_mode == "指定サイズに合わせる":
-                    # 指定サイズに合わせる（余白なし）
-                    if not width:
-                        width = orig_width
-                    if not height:
-                        height = orig_height
-                        
-                    resized_img = img.resize((width, height), Image.LANCZOS)
-                    
-                elif resize_mode == "トリミング":
-                    # アスペクト比を維持しつつ、はみ出た部分をトリミング
-                    if not width:
-                        width = orig_width
-                    if not height:
-                        height = orig_height
-                        
-                    ratio = max(width / orig_width, height / orig_height)
-                    interim_width = int(orig_width * ratio)
-                    interim_height = int(orig_height * ratio)
-                    
-                    interim_img = img.resize((interim_width, interim_height), Image.LANCZOS)
-                    
-                    # 中央部分を切り出し
-                    left = (interim_width - width) // 2
-                    top = (interim_height - height) // 2
-                    right = left + width
-                    bottom = top + height
-                    
-                    resized_img = interim_img.crop((left, top, right, bottom))
-                
-                # RGB形式に変換（アルファチャンネルを処理）
-                if resized_img.mode == 'RGBA' and format_type and format_type.lower() == 'jpg':
-                    background = Image.new('RGB', resized_img.size, (255, 255, 255))
-                    background.paste(resized_img, mask=resized_img.split()[3])
-                    resized_img = background
-                
-                # 同名ファイルが存在する場合
-                if os.path.exists(dst_path):
-                    response = messagebox.askyesnocancel(
-                        "確認", 
-                        f"ファイル '{os.path.basename(dst_path)}' は既に存在します。上書きしますか？"
-                    )
-                    
-                    if response is None or not response:  # キャンセルまたはいいえ
-                        continue
-                
-                # 保存
-                if format_type:
-                    if format_type.lower() == 'jpg':
-                        resized_img.save(dst_path, 'JPEG', quality=quality)
-                    elif format_type.lower() == 'png':
-                        resized_img.save(dst_path, 'PNG')
-                    elif format_type.lower() == 'bmp':
-                        resized_img.save(dst_path, 'BMP')
-                else:
-                    # 元の形式で保存
-                    ext = os.path.splitext(src_path)[1].lower()
-                    if ext == '.jpg' or ext == '.jpeg':
-                        resized_img.save(dst_path, 'JPEG', quality=quality)
-                    elif ext == '.png':
-                        resized_img.save(dst_path, 'PNG')
-                    elif ext == '.bmp':
-                        resized_img.save(dst_path, 'BMP')
-                    else:
-                        resized_img.save(dst_path)
-                
-                resized_count += 1
-                
-            except Exception as e:
-                error_count += 1
-                print(f"リサイズエラー: {e}")
-        
-        # 処理完了
-        progress_win.destroy()
+                ext = f".{format_type.lower()}"
+            return os.path.join(os.path.dirname(src_path), f"{file_name}_resized{ext}")
         
-        # 結果表示
-        result_msg = f"{resized_count}個のファイルをリサイズしました。"
-        if error_count > 0:
-            result_msg += f"\n{error_count}個のファイルでエラーが発生しました。"
-            
-        messagebox.showinfo("リサイズ完了", result_msg)
+        # 上書きの扱いを先に決める
+        jobs = self._plan_batch_jobs(make_dst_path)
+        if jobs is None:
+            return
         
-        # リサイズ後は画像リストを更新
-        if resized_count > 0:
-            self.load_images(self.current_folder)
+        # リサイズ処理を複数プロセスで実行
+        self._run_batch_operation("リサイズ中", "ファイルをリサイズ中...", resize_image_task, jobs, options,
+                                  "リサイズ完了", lambda count: f"{count}個のファイルをリサイズしました。")
 
     def fill_region_checked_images(self):
         # チェックした画像の特定領域を塗りつぶし
@@ -1030,120 +1665,143 @@ class ImageViewerApp:
             return
             
         # 設定を取得
-        x1 = fill_dialog.x1
-        y1 = fill_dialog.y1
-        x2 = fill_dialog.x2
-        y2 = fill_dialog.y2
-        color = fill_dialog.color
         format_type = fill_dialog.format_type
-        quality = fill_dialog.quality
+        options = {
+            'x1': fill_dialog.x1,
+            'y1': fill_dialog.y1,
+            'x2': fill_dialog.x2,
+            'y2': fill_dialog.y2,
+            'color': fill_dialog.color,
+            'format_type': format_type,
+            'quality': fill_dialog.quality,
+        }
+        
+        def make_dst_path(src_path):
+            # 出力ファイル名を生成
+            file_name, ext = os.path.splitext(os.path.basename(src_path))
+            if format_type:
+                ext = f".{format_type.lower()}"
+            return os.path.join(os.path.dirname(src_path), f"{file_name}_filled{ext}")
+        
+        # 上書きの扱いを先に決める
+        jobs = self._plan_batch_jobs(make_dst_path)
+        if jobs is None:
+            return
         
-        # 進捗ダイアログ
+        # 処理を複数プロセスで実行
+        self._run_batch_operation("処理中", "ファイルを処理中...", fill_region_task, jobs, options,
+                                  "処理完了", lambda count: f"{count}個のファイルを処理しました。")
+
+    def _plan_batch_jobs(self, make_dst_path):
+        """
+        チェックした画像の出力先を決め、既存ファイルの扱いを最初にまとめて確認する
+
+        Returns:
+        --------
+        list or None
+            (入力パス, 出力パス) のリスト。キャンセルされた場合は None
+        """
+        jobs = []
+        for idx in sorted(self.checked_images):
+            if idx >= len(self.image_files) or idx in self.invalid_images:
+                continue  # 開けなかった画像は処理しない
+            src_path = self.image_files[idx]
+            jobs.append((src_path, make_dst_path(src_path)))
+        
+        # 同名ファイルが存在する場合（自分自身への上書きは除く）
+        conflicts = [job for job in jobs if job[0] != job[1] and os.path.exists(job[1])]
+        
+        # 複数の画像が同じ出力先になる場合（a.png と a.bmp を JPG に変換するなど）も、
+        # 2つ目以降は上書きとして扱う（並列に書き込むと結果が不定になるため1つに絞る）
+        destinations = set()
+        for job in jobs:
+            key = os.path.normcase(os.path.abspath(job[1]))
+            if key in destinations:
+                conflicts.append(job)
+            destinations.add(key)
+        
+        if conflicts:
+            names = "\n".join(os.path.basename(dst_path) for _, dst_path in conflicts[:10])
+            if len(conflicts) > 10:
+                names += f"\n...他{len(conflicts) - 10}個"
+            response = messagebox.askyesnocancel(
+                "確認",
+                f"{len(conflicts)}個のファイルは既に存在します。\n{names}\n\n"
+                "上書きしますか？（「いいえ」で既存のファイルをスキップ）"
+            )
+            if response is None:  # キャンセル
+                return None
+            if not response:  # いいえ
+                skipped = set(conflicts)
+                jobs = [job for job in jobs if job not in skipped]
+        
+        # 同じ出力先のジョブが残っていれば最後の1つだけにする（順番に処理した場合と同じく最後の画像が残る）
+        last_jobs = {}
+        for job in jobs:
+            last_jobs[os.path.normcase(os.path.abspath(job[1]))] = job
+        kept = set(last_jobs.values())
+        return [job for job in jobs if job in kept]
+
+    def _run_batch_operation(self, title, message, task, jobs, options, done_title, done_message):
+        # 進捗ダイアログを表示してバッチ処理を別スレッドから実行
+        if not jobs:
+            messagebox.showinfo("情報", "処理するファイルがありません。")
+            return
+        
+        progress_win, progress_var, progress_lbl, cancel_event = self._open_progress_window(title, message, len(jobs))
+        
+        def on_progress(done_count, total, src_path, error):
+            # GUIの更新はメインスレッドで行う
+            def update():
+                if progress_win.winfo_exists():
+                    progress_var.set(done_count)
+                    progress_lbl.config(text=f"{message} ({done_count}/{total}) {os.path.basename(src_path)}")
+            self.root.after(0, update)
+        
+        def worker():
+            results = run_batch_operation(task, jobs, options, progress_callback=on_progress, cancel_event=cancel_event)
+            self.root.after(0, self._finish_batch_operation, progress_win, results, done_title, done_message)
+        
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _open_progress_window(self, title, message, maximum):
+        """キャンセルボタン付きの進捗ダイアログを作成"""
         progress_win = tk.Toplevel(self.root)
-        progress_win.title("処理中")
-        progress_win.geometry("300x100")
+        progress_win.title(title)
+        progress_win.geometry("360x130")
         progress_win.transient(self.root)
         progress_win.grab_set()
         
-        progress_lbl = ttk.Label(progress_win, text="ファイルを処理中...")
+        progress_lbl = ttk.Label(progress_win, text=message)
         progress_lbl.pack(pady=10)
         
         progress_var = tk.DoubleVar()
-        progress_bar = ttk.Progressbar(progress_win, variable=progress_var, maximum=len(self.checked_images))
-        progress_bar.pack(fill=tk.X, padx=10, pady=10)
+        progress_bar = ttk.Progressbar(progress_win, variable=progress_var, maximum=maximum)
+        progress_bar.pack(fill=tk.X, padx=10, pady=5)
         
-        # 処理を別スレッドで実行
-        thread_args = (x1, y1, x2, y2, color, format_type, quality, progress_win, progress_var, progress_lbl)
-        threading.Thread(target=self._fill_region_thread, args=thread_args).start()
+        cancel_event = threading.Event()
+        cancel_button = ttk.Button(progress_win, text="キャンセル",
+                                   command=lambda: (cancel_event.set(), cancel_button.config(state=tk.DISABLED)))
+        cancel_button.pack(pady=5)
+        progress_win.protocol("WM_DELETE_WINDOW", cancel_event.set)
+        return progress_win, progress_var, progress_lbl, cancel_event
 
-    def _fill_region_thread(self, x1, y1, x2, y2, color, format_type, quality, progress_win, progress_var, progress_lbl):
-        # 塗りつぶし処理の実行
-        processed_count = 0
-        error_count = 0
-        
-        for i, idx in enumerate(sorted(self.checked_images)):
-            if idx >= len(self.image_files):
-                continue
-                
-            src_path = self.image_files[idx]
-            file_name = os.path.splitext(os.path.basename(src_path))[0]
-            
-            # 出力ファイル名を生成
-            if format_type:
-                dst_path = os.path.join(os.path.dirname(src_path), f"{file_name}_filled.{format_type.lower()}")
-            else:
-                ext = os.path.splitext(src_path)[1]
-                dst_path = os.path.join(os.path.dirname(src_path), f"{file_name}_filled{ext}")
-            
-            progress_var.set(i + 1)
-            progress_lbl.config(text=f"処理中: {os.path.basename(src_path)}")
-            progress_win.update_idletasks()
-            
-            try:
-                # 画像を開く
-                img = Image.open(src_path)
-                
-                # 描画用オブジェクト
-                draw = ImageDraw.Draw(img)
-                
-                # 指定領域を塗りつぶし
-                draw.rectangle([x1, y1, x2, y2], fill=color)
-                
-                # RGB形式に変換（アルファチャンネルを処理）
-                if img.mode == 'RGBA' and format_type and format_type.lower() == 'jpg':
-                    background = Image.new('RGB', img.size, (255, 255, 255))
-                    background.paste(img, mask=img.split()[3])
-                    img = background
-                
-                # 同名ファイルが存在する場合
-                if os.path.exists(dst_path):
-                    response = messagebox.askyesnocancel(
-                        "確認", 
-                        f"ファイル '{os.path.basename(dst_path)}' は既に存在します。上書きしますか？"
-                    )
-                    
-                    if response is None or not response:  # キャンセルまたはいいえ
-                        continue
-                
-                # 保存
-                if format_type:
-                    if format_type.lower() == 'jpg':
-                        img.save(dst_path, 'JPEG', quality=quality)
-                    elif format_type.lower() == 'png':
-                        img.save(dst_path, 'PNG')
-                    elif format_type.lower() == 'bmp':
-                        img.save(dst_path, 'BMP')
-                else:
-                    # 元の形式で保存
-                    ext = os.path.splitext(src_path)[1].lower()
-                    if ext == '.jpg' or ext == '.jpeg':
-                        img.save(dst_path, 'JPEG', quality=quality)
-                    elif ext == '.png':
-                        img.save(dst_path, 'PNG')
-                    elif ext == '.bmp':
-                        img.save(dst_path, 'BMP')
-                    else:
-                        img.save(dst_path)
-                
-                processed_count += 1
-                
-            except Exception as e:
-                error_count += 1
-                print(f"処理エラー: {e}")
-        
+    def _finish_batch_operation(self, progress_win, results, done_title, done_message):
         # 処理完了
         progress_win.destroy()
         
         # 結果表示
-        result_msg = f"{processed_count}個のファイルを処理しました。"
-        if error_count > 0:
-            result_msg += f"\n{error_count}個のファイルでエラーが発生しました。"
-            
-        messagebox.showinfo("処理完了", result_msg)
-        
-        # 処理後は画像リストを更新
+        processed_count = len(results['processed'])
+        result_msg = done_message(processed_count)
+        if results['errors']:
+            result_msg += f"\n{len(results['errors'])}個のファイルでエラーが発生しました。"
+        if results['cancelled']:
+            result_msg += "\n処理はキャンセルされました。"
+        messagebox.showinfo(done_title, result_msg)
+        
+        # 処理後は変わったファイルだけ一覧に反映
         if processed_count > 0:
-            self.load_images(self.current_folder)
+            self.refresh_images()
 
     def prev_image(self, event=None):
         # 前の画像を表示
@@ -1286,6 +1944,9 @@ class RenameDialog:
         self.base_name_var.trace('w', lambda *args: self.update_preview())
         self.start_number_var.trace('w', lambda *args: self.update_preview())
         self.digits_var.trace('w', lambda *args: self.update_preview())
+        
+        # 閉じられるまで待つ
+        parent.wait_window(self.dialog)
 
     def update_preview(self):
         try:
@@ -1357,6 +2018,9 @@ class ConvertDialog:
 
         # 初期状態の設定
         self.on_format_change()
+        
+        # 閉じられるまで待つ
+        parent.wait_window(self.dialog)
 
     def on_format_change(self):
         # JPGの場合のみ品質設定を有効化
@@ -1449,6 +2113,9 @@ class ResizeDialog:
 
         # 初期状態の設定
         self.on_format_change()
+        
+        # 閉じられるまで待つ
+        parent.wait_window(self.dialog)
 
     def on_format_change(self):
         # JPGの場合のみ品質設定を有効化
@@ -1569,6 +2236,9 @@ class FillRegionDialog:
 
         # 初期状態の設定
         self.on_format_change()
+        
+        # 閉じられるまで待つ
+        parent.wait_window(self.dialog)
 
     def choose_color(self):
         color = colorchooser.askcolor(color=self.color_var.get())[1]
@@ -1620,7 +2290,23 @@ class FillRegionDialog:
         self.dialog.destroy()
 
 
+def build_arg_parser():
+    """コマンドライン引数の定義"""
+    parser = argparse.ArgumentParser(description="画像ビューワ（引数なしでGUIを起動）")
+    subparsers = parser.add_subparsers(dest='command')
+    
+    bench = subparsers.add_parser('benchmark-loader', help="フルデコードと高速読み込みの時間を比較")
+    bench.add_argument('images', nargs='*', help="計測する画像（省略時は24MPのJPEGを生成）")
+    return parser
+
+
 def main():
+    args = build_arg_parser().parse_args()
+    
+    if args.command == 'benchmark-loader':
+        benchmark_image_loader(args.images)
+        return
+    
     root = tk.Tk()
     app = ImageViewerApp(root)
     root.mainloop()
@@ -0,0 +1,56 @@
+"""
+tkviewer.py のプレビュー作成のテスト
+
+    python -m unittest TKViewer/test_tkviewer.py
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import tkviewer  # noqa: E402
+
+
+class RenderPreviewTest(unittest.TestCase):
+    """render_preview が返す画像はファイルを閉じた後も使えること"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _render(self, filename, size, target_size):
+        path = os.path.join(self.temp_dir.name, filename)
+        Image.new('RGB', size, (200, 30, 30)).save(path)
+        img = tkviewer.render_preview(path, target_size)
+        img.load()
+        return img
+
+    def test_image_smaller_than_target(self):
+        for filename in ('small.png', 'small.jpg'):
+            with self.subTest(filename=filename):
+                img = self._render(filename, (50, 40), (800, 600))
+                self.assertEqual(img.size, (50, 40))
+
+    def test_image_larger_than_target(self):
+        for filename in ('large.png', 'large.jpg'):
+            with self.subTest(filename=filename):
+                img = self._render(filename, (3000, 2000), (800, 600))
+                self.assertEqual(img.size, (800, 533))
+
+    def test_preview_cache_stores_usable_image(self):
+        path = os.path.join(self.temp_dir.name, 'cached.png')
+        Image.new('RGB', (50, 40), (0, 0, 255)).save(path)
+        cache = tkviewer.PreviewCache()
+        key = (path, os.stat(path).st_mtime_ns, (800, 600))
+        cache.put(key, tkviewer.render_preview(path, (800, 600)))
+        self.assertEqual(cache.get(key).getpixel((0, 0)), (0, 0, 255))
+
+
+if __name__ == '__main__':
+    unittest.main()
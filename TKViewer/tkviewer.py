@@ -5,6 +5,12 @@ import os
 import shutil
 import json
 import math
+import queue
+import threading
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from collections import OrderedDict
 
 # 定数
 THUMBNAIL_SIZES = {
@@ -13,7 +19,507 @@ THUMBNAIL_SIZES = {
 }
 DEFAULT_THUMBNAIL_KEY = "Large (160x90)"
 CHECK_STATE_FILENAME = "_checked_files.json"
+CHECK_STATE_LOG_FILENAME = "_checked_files.log" # スナップショット以降の変更を追記するログ
+CHECK_STATE_FLUSH_MS = 500 # チェック状態の変更をまとめて書き込むまでの待ち時間
+CHECK_STATE_COMPACT_RECORDS = 1000 # ログがこの行数 (またはファイル数) を超えたらスナップショットに書き直す
 SUPPORTED_IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tiff')
+THUMBNAIL_WORKERS = min(8, os.cpu_count() or 1) # サムネイル作成を並列に行うスレッド数
+THUMBNAIL_POLL_INTERVAL_MS = 30 # 作成済みサムネイルを反映する間隔
+THUMBNAIL_APPLY_PER_TICK = 64 # 1回の反映で処理するサムネイルの上限 (UIを固めないため)
+TREE_SCAN_WORKERS = 4 # フォルダツリーのスキャンを並列に行うスレッド数 (ネットワークドライブの待ち時間を隠す)
+TREE_POLL_INTERVAL_MS = 50 # スキャン結果をツリーに反映する間隔
+PROCESS_WORKERS = os.cpu_count() or 1 # 画像処理を並列に行うプロセス数
+PROCESS_POLL_INTERVAL_MS = 50 # 画像処理の結果を回収する間隔
+PREVIEW_CACHE_BYTES = 256 * 1024 * 1024 # プレビューキャッシュの上限 (バイト)
+PREVIEW_POLL_INTERVAL_MS = 20 # 作成中のプレビューの完成を確認する間隔
+
+
+def scan_directory(path):
+    """
+    フォルダ直下を1回の os.scandir で調べる (バックグラウンドスレッドで実行)
+
+    ファイルごとの stat を避けるため、種類の判定は scandir が返す情報を使う。
+
+    Returns:
+    --------
+    dict
+        subdirs: サブフォルダ名のリスト (ソート済み), image_count: 画像ファイルの数
+    """
+    subdirs = []
+    image_count = 0
+    with os.scandir(path) as entries:
+        for entry in entries:
+            try:
+                if entry.is_dir():
+                    subdirs.append(entry.name)
+                elif entry.name.lower().endswith(SUPPORTED_IMAGE_EXTENSIONS) and entry.is_file():
+                    image_count += 1
+            except OSError:
+                pass # アクセスできない項目は無視
+    return {'subdirs': sorted(subdirs), 'image_count': image_count}
+
+
+def make_thumbnail_buffer(img_path, thumb_size):
+    """
+    サムネイル画像を作成し、RGBのバイト列として返す (ワーカースレッドで実行)
+
+    アスペクト比を保ったまま thumb_size の白背景の中央に配置する。
+    Tkのオブジェクトには触れないため、どのスレッドからでも呼び出せる。
+    """
+    max_width, max_height = thumb_size
+    with Image.open(img_path) as img:
+        # RGBAモードの場合、背景を白色で合成してRGBにする (JPEG保存などで問題になるため)
+        if img.mode == 'RGBA':
+            bg = Image.new('RGB', img.size, (255, 255, 255))
+            bg.paste(img, mask=img.split()[3]) # alphaチャンネルをマスクとして使用
+            img = bg
+        elif img.mode != 'RGB': # パレットモードなどもRGBに変換
+            img = img.convert('RGB')
+
+        img.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
+
+        # アスペクト比を保ったまま中央に配置するための背景を作成
+        final_thumb = Image.new('RGB', (max_width, max_height), (255, 255, 255))
+        final_thumb.paste(img, ((max_width - img.width) // 2, (max_height - img.height) // 2))
+    return final_thumb.tobytes()
+
+
+def plan_image_operations(src_mode, src_format, has_alpha, save_format, options, minimal=True):
+    """
+    変換・リサイズ・塗りつぶしの処理内容から、画像に適用する操作の列を組み立てる
+
+    minimal=True の場合は出力結果を変えない範囲でモード変換を最小限にする。
+    - 透過が不要な画像はRGBA化せず、必要な変換はリサイズ後の小さい画像で行う
+    - 白背景への合成はアルファを持つ画像に対して最後に1回だけ行う
+    - 画素に手を加えず、形式とモードも変わらない場合はファイルをコピーするだけにする
+    minimal=False の場合は各処理の前後で変換していた従来の手順を返す (ベンチマーク用)。
+
+    Parameters:
+    -----------
+    src_mode : str
+        入力画像のモード
+    src_format : str or None
+        入力画像の形式 (Pillowの形式名)
+    has_alpha : bool
+        入力画像が透過情報を持つかどうか
+    save_format : str
+        出力形式 (Pillowの形式名)
+    options : dict
+        ProcessDialog で指定された処理内容
+
+    Returns:
+    --------
+    list
+        ('copy',), ('convert', mode), ('flatten',), ('resize',), ('fill',) の列
+    """
+    do_resize = options['do_resize']
+    do_fill = options['do_fill']
+    # 透過を扱う可能性のある処理(PNG変換、塗りつぶし)があればRGBA、なければRGB
+    needs_alpha = (options['do_convert'] and options['convert_format'] == 'png') or do_fill
+    work_mode = "RGBA" if needs_alpha else "RGB"
+    final_mode = "RGB" if save_format in ('JPEG', 'BMP') else work_mode # JPEG・BMPは透過を保存しない
+
+    if not minimal:
+        steps = []
+        if src_mode == 'RGBA' and not needs_alpha:
+            steps.append(('flatten',))
+        elif src_mode != work_mode:
+            steps.append(('convert', work_mode))
+        if do_resize:
+            steps.append(('resize',))
+        if do_fill:
+            steps.append(('fill',))
+        if save_format == 'JPEG' and work_mode == 'RGBA':
+            steps.append(('flatten',))
+        elif final_mode != work_mode:
+            steps.append(('convert', final_mode))
+        return steps
+
+    if not do_resize and not do_fill and src_format == save_format and src_mode == final_mode:
+        return [('copy',)]
+
+    steps = []
+    if has_alpha and needs_alpha:
+        # 透過を保ったまま処理する
+        if src_mode != 'RGBA':
+            steps.append(('convert', 'RGBA'))
+        mode = 'RGBA'
+    elif src_mode == 'RGBA':
+        steps.append(('flatten',)) # 背景を白色で合成してRGBにする
+        mode = 'RGB'
+    elif src_mode in ('RGB', 'L'):
+        mode = src_mode # チャンネルごとの処理なので、変換はリサイズ後に回せる
+    else:
+        steps.append(('convert', 'RGB')) # パレットなどはリサイズ前に変換する必要がある
+        mode = 'RGB'
+
+    if do_resize:
+        steps.append(('resize',))
+    if do_fill:
+        if mode == 'L':
+            steps.append(('convert', 'RGB'))
+            mode = 'RGB'
+        steps.append(('fill',))
+
+    # 出力形式に合わせた最終的な変換
+    if mode == 'RGBA' and final_mode == 'RGB':
+        steps.append(('flatten',) if save_format == 'JPEG' else ('convert', 'RGB'))
+    elif mode != final_mode:
+        steps.append(('convert', final_mode))
+    return steps
+
+
+def _resize_for_options(img, options):
+    """ProcessDialog のリサイズ指定 (scale, fixed, crop) を適用する"""
+    resize_mode = options['resize_mode']
+    resize_w = options['resize_w']
+    resize_h = options['resize_h']
+    img_w, img_h = img.size
+    if resize_mode == "scale":
+        img.thumbnail((resize_w, resize_h), Image.Resampling.LANCZOS)
+    elif resize_mode == "fixed":
+        img = img.resize((resize_w, resize_h), Image.Resampling.LANCZOS)
+    elif resize_mode == "crop":
+        target_aspect = resize_w / resize_h
+        img_aspect = img_w / img_h
+
+        if img_aspect > target_aspect: # 画像が横長すぎる -> 幅をトリミング
+            new_width = int(target_aspect * img_h)
+            offset = (img_w - new_width) // 2
+            img = img.crop((offset, 0, offset + new_width, img_h))
+        else: # 画像が縦長すぎる -> 高さをトリミング
+            new_height = int(img_w / target_aspect)
+            offset = (img_h - new_height) // 2
+            img = img.crop((0, offset, img_w, offset + new_height))
+        # 目標サイズにリサイズ
+        img = img.resize((resize_w, resize_h), Image.Resampling.LANCZOS)
+    return img
+
+
+def apply_image_operations(img, steps, options):
+    """plan_image_operations で組み立てた操作を順に適用する"""
+    for step in steps:
+        operation = step[0]
+        if operation == 'convert':
+            img = img.convert(step[1])
+        elif operation == 'flatten':
+            bg = Image.new('RGB', img.size, (255, 255, 255))
+            bg.paste(img, mask=img.getchannel('A')) # alphaチャンネルをマスクとして使用
+            img = bg
+        elif operation == 'resize':
+            img = _resize_for_options(img, options)
+        elif operation == 'fill':
+            draw = ImageDraw.Draw(img)
+            # 座標が画像の範囲内にあることを確認 (クリッピング)
+            x1 = max(0, options['fill_x1'])
+            y1 = max(0, options['fill_y1'])
+            x2 = min(img.width, options['fill_x2'])
+            y2 = min(img.height, options['fill_y2'])
+            if x1 < x2 and y1 < y2: # 有効な領域がある場合のみ描画
+                draw.rectangle([x1, y1, x2, y2], fill=options['fill_color_rgb']) # 不透明色のみを想定
+    return img
+
+
+def process_image_file(src_path, temp_base, options, minimal=True):
+    """
+    1ファイルに変換・リサイズ・塗りつぶしを適用して一時ファイルに保存する (ワーカープロセスで実行)
+
+    連番は成功したファイルにだけ順番に振るため、最終的なファイル名は
+    呼び出し側が結果を順番に回収するときに決めてリネームする。
+
+    Parameters:
+    -----------
+    src_path : str
+        入力画像のパス
+    temp_base : str
+        一時ファイルのパス (拡張子なし)
+    options : dict
+        ProcessDialog で指定された処理内容
+    minimal : bool
+        モード変換を最小限にした手順で処理するかどうか (plan_image_operations を参照)
+
+    Returns:
+    --------
+    tuple
+        (一時ファイルのパス, 出力ファイルの拡張子)
+    """
+    with Image.open(src_path) as src_img:
+        # 出力形式の決定
+        if options['do_convert']:
+            output_extension = f".{options['convert_format'].lower()}"
+        else:
+            # 元の拡張子を使うか、Pillowが判定した形式を使う
+            ext = os.path.splitext(src_path)[1]
+            if ext:
+                output_extension = ext.lower()
+            elif src_img.format:
+                output_extension = f".{src_img.format.lower()}"
+            else:
+                output_extension = ".jpg" # デフォルト
+        save_format = Image.registered_extensions().get(output_extension)
+        if save_format is None:
+            raise ValueError(f"保存できない形式です: {output_extension}")
+
+        has_alpha = src_img.mode in ('RGBA', 'LA', 'PA') or 'transparency' in src_img.info
+        steps = plan_image_operations(src_img.mode, src_img.format, has_alpha, save_format, options, minimal)
+
+        temp_path = f"{temp_base}{output_extension}"
+        try:
+            if steps == [('copy',)]:
+                shutil.copyfile(src_path, temp_path) # 再エンコードせずにそのまま出力する
+            else:
+                img = apply_image_operations(src_img, steps, options)
+                save_options = {}
+                if save_format == 'JPEG':
+                    save_options['quality'] = 95 # 高品質
+                elif save_format == 'PNG':
+                    save_options['optimize'] = True
+                img.save(temp_path, format=save_format, **save_options)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path) # 書きかけの一時ファイルを残さない
+            raise
+    return temp_path, output_extension
+
+
+def _benchmark_process_worker(paths, out_dir, options, minimal):
+    """ベンチマーク用: 別プロセスで処理し、経過時間と最大メモリの増分を返す"""
+    try:
+        import resource
+    except ImportError: # Windowsでは最大メモリを計測しない
+        resource = None
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else 0
+    start = time.perf_counter()
+    for index, path in enumerate(paths):
+        process_image_file(path, os.path.join(out_dir, f"out_{index}"), options, minimal)
+    elapsed = time.perf_counter() - start
+    peak_mb = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base_rss) / 1024 if resource else None
+    return elapsed, peak_mb
+
+
+def benchmark_process_pipeline(image_paths=None, count=3):
+    """
+    従来の変換手順とモード変換を最小限にした手順の処理時間・最大メモリを比較する
+
+    image_paths を省略した場合は 20MP (5472x3648) のPNGを一時フォルダに作成して計測する。
+    メモリはPillowの画像バッファを含めて測るため、計測ごとに新しいプロセスで実行し、
+    最大常駐メモリ (ru_maxrss) の増分を比較する。
+
+    Returns:
+    --------
+    dict
+        シナリオ名ごとの {'legacy': (秒, MB), 'minimal': (秒, MB)}
+    """
+    import tempfile
+
+    base_options = {
+        'do_convert': False, 'convert_format': None,
+        'do_resize': False, 'resize_mode': None, 'resize_w': 0, 'resize_h': 0,
+        'do_fill': False, 'fill_x1': 100, 'fill_y1': 100, 'fill_x2': 600, 'fill_y2': 400,
+        'fill_color_rgb': (255, 0, 0),
+    }
+    scenarios = [
+        ("JPG変換 + 塗りつぶし", {'do_convert': True, 'convert_format': 'jpg', 'do_fill': True}),
+        ("PNG変換 + 縮小(1920x1080)", {'do_convert': True, 'convert_format': 'png',
+                                      'do_resize': True, 'resize_mode': 'scale', 'resize_w': 1920, 'resize_h': 1080}),
+        ("トリミング(800x800) + 塗りつぶし", {'do_resize': True, 'resize_mode': 'crop', 'resize_w': 800, 'resize_h': 800,
+                                          'do_fill': True}),
+    ]
+
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if not image_paths:
+            image_paths = []
+            base = Image.linear_gradient("L").resize((5472, 3648))
+            for i in range(count):
+                path = os.path.join(temp_dir, f"bench_{i}.png")
+                # 写真に近い内容になるよう、粗いノイズを拡大して使う
+                noise = Image.effect_noise((1368, 912), 40 + i * 10).resize((5472, 3648), Image.Resampling.BICUBIC)
+                Image.merge("RGB", (base, noise, base.rotate(180))).save(path, "PNG", compress_level=1)
+                image_paths.append(path)
+
+        for name, overrides in scenarios:
+            options = dict(base_options, **overrides)
+            results[name] = {}
+            for label, minimal in (('legacy', False), ('minimal', True)):
+                out_dir = tempfile.mkdtemp(dir=temp_dir)
+                with ProcessPoolExecutor(max_workers=1) as executor:
+                    results[name][label] = executor.submit(_benchmark_process_worker, image_paths, out_dir, options, minimal).result()
+                shutil.rmtree(out_dir)
+
+    for name, result in results.items():
+        (legacy_time, legacy_mem), (minimal_time, minimal_mem) = result['legacy'], result['minimal']
+        line = (f"{name}: 従来 {legacy_time / len(image_paths):.2f}秒/枚, 最小変換 {minimal_time / len(image_paths):.2f}秒/枚 "
+                f"({legacy_time / minimal_time if minimal_time > 0 else 0:.1f}倍)")
+        if legacy_mem is not None:
+            line += f", 最大メモリ増分 {legacy_mem:.0f}MB -> {minimal_mem:.0f}MB"
+        print(line)
+    return results
+
+
+def render_preview(img_path, target_size):
+    """
+    プレビュー用に縮小した画像を作成する (ワーカースレッドで実行)
+
+    JPEGは draft でデコード時に縮小してから読み込む (thumbnail と同じく目標の2倍まで)。
+    画像が目標サイズに収まる場合 thumbnail は画素を読み込まないため、
+    ファイルを閉じる前に必ず load しておく。
+    """
+    with Image.open(img_path) as img:
+        img.draft(None, (target_size[0] * 2, target_size[1] * 2))
+        img.load()
+        # アスペクト比を維持してリサイズ
+        img.thumbnail(target_size, Image.Resampling.LANCZOS)
+    return img
+
+
+class PreviewCache:
+    """
+    プレビュー画像のキャッシュ
+
+    (パス, 更新日時, 表示サイズ) をキーにするため、ファイルが更新されれば自動的に作り直される。
+    画像の合計バイト数が上限を超えたら、最も古く使われたものから破棄する。
+    ワーカースレッドからも書き込むためロックで保護する。
+    """
+    def __init__(self, max_bytes=PREVIEW_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict() # {key: (PIL.Image, バイト数)}
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """キャッシュされた画像を返す (なければ None)"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, img):
+        """画像をキャッシュに追加し、上限を超えた分を破棄する"""
+        size = img.width * img.height * len(img.getbands())
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+            self.entries[key] = (img, size)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.total_bytes -= evicted
+
+
+class CheckStateStore:
+    """
+    フォルダごとのチェック状態の保存先
+
+    _checked_files.json (従来と同じ形式のスナップショット) に、変更を1行ずつ追記する
+    _checked_files.log を組み合わせる。変更のたびに全体を書き直さず、溜めた変更を
+    flush でまとめて追記し、ログが長くなったらスナップショットに書き直す。
+    """
+    def __init__(self, folder_path=None):
+        self.folder_path = folder_path
+        self.state = {} # {filename: bool}
+        self.pending = {} # {filename: bool または None(削除)} 未書き込みの変更
+        self.log_records = 0 # ログに追記済みの行数
+        self.log_torn = False # ログの最後の行が書き込み途中で終わっているか
+
+    def _path(self, filename):
+        return os.path.join(self.folder_path, filename)
+
+    def load(self, filenames):
+        """スナップショットとログから状態を読み込む (filenames に含まれるファイルのみ)"""
+        state = {}
+        self.pending = {}
+        self.log_records = 0
+        self.log_torn = False
+        if not self.folder_path:
+            self.state = state
+            return self.state
+
+        snapshot_path = self._path(CHECK_STATE_FILENAME)
+        try:
+            with open(snapshot_path, 'r', encoding='utf-8') as f:
+                state.update(json.load(f))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Error loading check state from {snapshot_path}: {e}") # コンソールにエラー出力
+
+        log_path = self._path(CHECK_STATE_LOG_FILENAME)
+        try:
+            with open(log_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    self.log_torn = not line.endswith("\n")
+                    try:
+                        filename, checked = json.loads(line)
+                    except ValueError:
+                        continue # 書き込み途中で終了した行などは無視
+                    if checked is None:
+                        state.pop(filename, None)
+                    else:
+                        state[filename] = checked
+                    self.log_records += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Error loading check state from {log_path}: {e}")
+
+        # ファイル名が存在するか確認しながら読み込む
+        self.state = {fname: checked for fname, checked in state.items() if fname in filenames}
+        return self.state
+
+    def set_many(self, filenames, checked):
+        """複数ファイルのチェック状態を変更する (書き込みは flush で行う)"""
+        for filename in filenames:
+            self.state[filename] = checked
+            self.pending[filename] = checked
+
+    def remove(self, filenames):
+        """移動したファイルなどの状態を削除する"""
+        for filename in filenames:
+            if self.state.pop(filename, None) is not None:
+                self.pending[filename] = None
+
+    def flush(self):
+        """溜まった変更を書き込む (ログが長くなった場合はスナップショットに書き直す)"""
+        if not self.pending or not self.folder_path or not os.path.isdir(self.folder_path):
+            return
+        if self.log_records + len(self.pending) > max(CHECK_STATE_COMPACT_RECORDS, len(self.state)):
+            self.compact()
+            return
+
+        log_path = self._path(CHECK_STATE_LOG_FILENAME)
+        try:
+            with open(log_path, 'a', encoding='utf-8') as f:
+                if self.log_torn:
+                    f.write("\n") # 途中で終わっている行に続けて書かないようにする
+                    self.log_torn = False
+                f.writelines(json.dumps([filename, checked], ensure_ascii=False) + "\n"
+                             for filename, checked in self.pending.items())
+            self.log_records += len(self.pending)
+            self.pending = {}
+        except OSError as e:
+            print(f"Error saving check state to {log_path}: {e}") # コンソールにエラー出力
+
+    def compact(self):
+        """現在の状態をスナップショットに書き出し、ログを削除する"""
+        snapshot_path = self._path(CHECK_STATE_FILENAME)
+        temp_path = snapshot_path + ".tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f, indent=4)
+            os.replace(temp_path, snapshot_path) # 書き込み途中で終了しても元のファイルが残るように置き換える
+            log_path = self._path(CHECK_STATE_LOG_FILENAME)
+            if os.path.exists(log_path):
+                os.remove(log_path)
+            self.log_records = 0
+            self.log_torn = False
+            self.pending = {}
+        except OSError as e:
+            print(f"Error saving check state to {snapshot_path}: {e}")
+
 
 class ImageCheckerApp(tk.Tk):
     """
@@ -30,14 +536,44 @@ class ImageCheckerApp(tk.Tk):
         self.thumbnail_size_var = tk.StringVar(value=DEFAULT_THUMBNAIL_KEY)
         self.image_files = [] # 現在のフォルダの画像ファイルリスト [(path, filename), ...]
         self.thumbnail_widgets = {} # {path: {'frame': frame, 'label': label, 'check_var': var, 'checkbutton': cb}}
-        self.checked_state = {} # {filename: bool}
+        self.checked_state = {} # {filename: bool} (check_store.state と同じ辞書)
+        self.check_store = CheckStateStore()
+        self.check_flush_id = None # チェック状態の書き込み予約
         self.preview_image_object = None # ImageTkオブジェクトへの参照を保持
         self.thumbnail_image_objects = {} # {path: ImageTkオブジェクト}
         self.root_folder_path = None # 選択されたルートフォルダのパス
 
+        # サムネイル作成用のワーカー
+        self.thumbnail_executor = ThreadPoolExecutor(max_workers=THUMBNAIL_WORKERS)
+        self.thumbnail_results = queue.Queue() # ワーカーから届いた結果
+        self.thumbnail_futures = [] # 現在のフォルダの作成依頼
+        self.thumbnail_generation = 0 # フォルダを切り替えるたびに増やし、古い結果を破棄する
+        self.thumbnail_pending = 0 # 反映待ちのサムネイル数
+        self.thumbnail_poll_id = None # 結果を反映する定期処理
+        self.thumbnail_placeholder = None
+
+        # フォルダツリー用のスキャン (サブフォルダの有無と画像数をキャッシュする)
+        self.dir_metadata = {} # {path: scan_directory の結果}
+        self.tree_node_ids = {} # {path: node_id}
+        self.tree_executor = ThreadPoolExecutor(max_workers=TREE_SCAN_WORKERS)
+        self.tree_results = queue.Queue()
+        self.tree_scans = set() # スキャン中のフォルダ
+        self.tree_expand_requests = set() # スキャン完了後に展開するフォルダ
+        self.tree_generation = 0
+        self.tree_poll_id = None
+
+        # プレビュー画像のキャッシュと作成用のワーカー
+        self.preview_cache = PreviewCache()
+        self.preview_executor = ThreadPoolExecutor(max_workers=1)
+        self.preview_futures = {} # {key: future} 作成中のプレビュー
+        self.preview_request = None # 作成を待って表示するプレビューのキー
+        self.preview_hover_key = None # カーソルが乗ったサムネイルのキー
+        self.preview_poll_id = None
+
         # --- UIのセットアップ ---
         self._setup_ui()
         # self._populate_initial_tree() # 初期ツリー設定は削除
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
 
     def _setup_ui(self):
         """UIウィジェットの配置"""
@@ -65,6 +601,7 @@ class ImageCheckerApp(tk.Tk):
 
         self.tree.bind("<<TreeviewSelect>>", self._on_folder_select)
         self.tree.bind("<Double-1>", self._on_tree_expand) # ダブルクリックで展開
+        self.tree.bind("<<TreeviewOpen>>", self._on_tree_expand) # 展開アイコンのクリックでも展開
 
         # --- 右ペイン (上:サムネイル, 下:プレビュー) ---
         right_paned_window = ttk.PanedWindow(main_paned_window, orient=tk.VERTICAL)
@@ -97,11 +634,11 @@ class ImageCheckerApp(tk.Tk):
 
         self.thumbnail_canvas = tk.Canvas(thumbnail_canvas_frame, borderwidth=0, background="#ffffff")
         thumbnail_scrollbar_h = ttk.Scrollbar(thumbnail_canvas_frame, orient=tk.HORIZONTAL, command=self.thumbnail_canvas.xview)
-        thumbnail_scrollbar_v = ttk.Scrollbar(thumbnail_canvas_frame, orient=tk.VERTICAL, command=self.thumbnail_canvas.yview) # 縦スクロールも追加
-        self.thumbnail_canvas.configure(xscrollcommand=thumbnail_scrollbar_h.set, yscrollcommand=thumbnail_scrollbar_v.set)
+        self.thumbnail_scrollbar_v = ttk.Scrollbar(thumbnail_canvas_frame, orient=tk.VERTICAL, command=self.thumbnail_canvas.yview) # 縦スクロールも追加
+        self.thumbnail_canvas.configure(xscrollcommand=thumbnail_scrollbar_h.set, yscrollcommand=self.thumbnail_scrollbar_v.set)
 
         thumbnail_scrollbar_h.pack(side=tk.BOTTOM, fill=tk.X)
-        thumbnail_scrollbar_v.pack(side=tk.RIGHT, fill=tk.Y) # 縦スクロールバーを右に配置
+        self.thumbnail_scrollbar_v.pack(side=tk.RIGHT, fill=tk.Y) # 縦スクロールバーを右に配置
         self.thumbnail_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
         # キャンバス内にフレームを配置し、そのフレームにウィジェットを追加する
@@ -156,43 +693,29 @@ class ImageCheckerApp(tk.Tk):
         # 既存のツリーアイテムを全て削除
         for item in self.tree.get_children():
             self.tree.delete(item)
+        self.tree_generation += 1 # 以前のルートに対するスキャン結果は破棄する
+        self.dir_metadata = {} # ツリーを作り直すときはフォルダ情報も取り直す (アプリ外での変更を反映)
+        self.tree_node_ids = {}
+        self.tree_scans = set()
+        self.tree_expand_requests = set()
 
         # ルートノードを挿入
         root_display_name = os.path.basename(root_path) if os.path.basename(root_path) else root_path # ルートがドライブ文字などの場合
         root_node_id = self.tree.insert('', 'end', text=root_display_name, values=[root_path], open=True) # 最初は開いた状態にする
+        self.tree_node_ids[root_path] = root_node_id
 
         # ルートフォルダ直下のサブフォルダを挿入 (遅延読み込みのため、ここでは1階層のみ)
-        try:
-            for item in sorted(os.listdir(root_path)):
-                item_path = os.path.join(root_path, item)
-                if os.path.isdir(item_path):
-                    self._insert_node(root_node_id, item_path, item)
-        except OSError as e:
-            self.status_bar.config(text=f"エラー: {root_path} にアクセスできません: {e}")
+        self._expand_node(root_node_id, root_path)
 
 
     def _insert_node(self, parent_id, path, display_name):
-        """ツリービューにノードを挿入 (サブフォルダを持つ可能性を示すダミーノード付き)"""
-        try:
-            # isdirチェックでアクセス権限エラーが発生することがある
-            if os.path.isdir(path):
-                node_id = self.tree.insert(parent_id, 'end', text=display_name, values=[path], open=False)
-                # このフォルダ内にさらにサブフォルダがあるかチェック
-                has_subdir = False
-                try:
-                    for sub_item in os.listdir(path):
-                        sub_item_path = os.path.join(path, sub_item)
-                        if os.path.isdir(sub_item_path):
-                            has_subdir = True
-                            break # 1つでも見つかればOK
-                except OSError:
-                    pass # アクセスできないフォルダは無視
-
-                # サブフォルダがある場合のみ、展開可能アイコンを表示するためのダミーノードを追加
-                if has_subdir:
-                    self.tree.insert(node_id, 'end', text='dummy') # ダミーノード
-        except OSError as e:
-            print(f"Error accessing path {path}: {e}") # コンソールにエラー出力
+        """ツリービューにノードを挿入 (サブフォルダの有無と画像数はキャッシュから、なければバックグラウンドで調べる)"""
+        node_id = self.tree.insert(parent_id, 'end', text=display_name, values=[path], open=False)
+        self.tree_node_ids[path] = node_id
+        if path in self.dir_metadata:
+            self._apply_dir_metadata(path)
+        else:
+            self._request_dir_scan(path)
 
     def _on_tree_expand(self, event=None):
         """ツリーノード展開時の処理 (ダミーノードを実際のサブフォルダで置き換え)"""
@@ -205,14 +728,79 @@ class ImageCheckerApp(tk.Tk):
         if children and self.tree.item(children[0], 'text') == 'dummy':
             self.tree.delete(children[0]) # ダミーノード削除
             parent_path = self.tree.item(selected_id, 'values')[0]
+            self._expand_node(selected_id, parent_path)
+
+    def _expand_node(self, node_id, path):
+        """サブフォルダのノードを挿入する (フォルダ情報が未取得ならスキャン完了後に挿入)"""
+        metadata = self.dir_metadata.get(path)
+        if metadata is None:
+            self.tree_expand_requests.add(path)
+            self.tree.insert(node_id, 'end', text="読み込み中...")
+            self._request_dir_scan(path)
+            return
+        for name in metadata['subdirs']:
+            self._insert_node(node_id, os.path.join(path, name), name)
+
+    def _request_dir_scan(self, path):
+        """フォルダのスキャンをバックグラウンドで開始する"""
+        if path in self.tree_scans:
+            return
+        self.tree_scans.add(path)
+        generation = self.tree_generation
+        future = self.tree_executor.submit(scan_directory, path)
+        future.add_done_callback(lambda f: self.tree_results.put((generation, path, f)))
+        if self.tree_poll_id is None:
+            self.tree_poll_id = self.after(TREE_POLL_INTERVAL_MS, self._poll_tree_results)
+
+    def _refresh_dir_metadata(self, path):
+        """ファイルの追加・削除があったフォルダの情報を取り直す"""
+        self.dir_metadata.pop(path, None)
+        if path in self.tree_node_ids:
+            self._request_dir_scan(path)
+
+    def _poll_tree_results(self):
+        """スキャン結果をツリーに反映する (メインスレッドで定期的に実行)"""
+        self.tree_poll_id = None
+        while True:
             try:
-                # フォルダをソートして挿入
-                subdirs = sorted([d for d in os.listdir(parent_path) if os.path.isdir(os.path.join(parent_path, d))])
-                for item in subdirs:
-                    item_path = os.path.join(parent_path, item)
-                    self._insert_node(selected_id, item_path, item) # 再帰的に挿入関数を呼ぶ
+                generation, path, future = self.tree_results.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self.tree_generation:
+                continue
+            self.tree_scans.discard(path)
+            try:
+                self.dir_metadata[path] = future.result()
             except OSError as e:
-                self.status_bar.config(text=f"エラー: {parent_path} にアクセスできません: {e}")
+                print(f"Error accessing path {path}: {e}") # コンソールにエラー出力
+                self.status_bar.config(text=f"エラー: {path} にアクセスできません: {e}")
+                self.dir_metadata[path] = {'subdirs': [], 'image_count': 0}
+            self._apply_dir_metadata(path)
+
+        if self.tree_scans:
+            self.tree_poll_id = self.after(TREE_POLL_INTERVAL_MS, self._poll_tree_results)
+
+    def _apply_dir_metadata(self, path):
+        """フォルダ情報をノードに反映する (画像数の表示と展開用ダミーノード)"""
+        node_id = self.tree_node_ids.get(path)
+        metadata = self.dir_metadata.get(path)
+        if node_id is None or metadata is None or not self.tree.exists(node_id):
+            return
+
+        display_name = os.path.basename(path) if os.path.basename(path) else path
+        if metadata['image_count']:
+            display_name = f"{display_name} ({metadata['image_count']})"
+        self.tree.item(node_id, text=display_name)
+
+        children = self.tree.get_children(node_id)
+        if path in self.tree_expand_requests:
+            # 展開待ちのノード: 「読み込み中...」を実際のサブフォルダで置き換える
+            self.tree_expand_requests.discard(path)
+            self.tree.delete(*children)
+            self._expand_node(node_id, path)
+        elif not children and metadata['subdirs']:
+            # サブフォルダがある場合のみ、展開可能アイコンを表示するためのダミーノードを追加
+            self.tree.insert(node_id, 'end', text='dummy') # ダミーノード
 
 
     def _on_folder_select(self, event=None):
@@ -280,7 +868,10 @@ class ImageCheckerApp(tk.Tk):
 
 
     def _update_thumbnails_display(self):
-        """サムネイル表示エリアを更新する"""
+        """サムネイル表示エリアを更新する（画像はワーカースレッドで作成し、できたものから表示する）"""
+        # 読み込み中のサムネイルを取り消す
+        self._cancel_thumbnail_jobs()
+
         # 既存のサムネイルウィジェットを削除
         for widget_dict in list(self.thumbnail_widgets.values()): # イテレート中に削除するためリストのコピーを使用
             if widget_dict.get('frame'):
@@ -307,85 +898,68 @@ class ImageCheckerApp(tk.Tk):
         # サムネイルフレームの現在の幅を取得しようとする
         container_width = self.thumbnails_frame.winfo_width()
         if container_width <= 1: # まだ幅が確定していない場合、親のキャンバス幅を使う試み
-             container_width = self.thumbnail_canvas.winfo_width() - thumbnail_scrollbar_v.winfo_width() # スクロールバーの幅を考慮
+             container_width = self.thumbnail_canvas.winfo_width() - self.thumbnail_scrollbar_v.winfo_width() # スクロールバーの幅を考慮
         if container_width <= 1 : # それでもダメならデフォルト値
              container_width = 800 # 適当なデフォルト値
 
         items_per_row = max(1, container_width // (max_width + padding * 2 + 10)) # 余裕を持たせる
 
-        for img_path, filename in self.image_files:
-            try:
-                # --- サムネイル作成 ---
-                img = Image.open(img_path)
-                # RGBAモードの場合、背景を白色で合成してRGBにする (JPEG保存などで問題になるため)
-                if img.mode == 'RGBA':
-                    bg = Image.new('RGB', img.size, (255, 255, 255))
-                    bg.paste(img, mask=img.split()[3]) # alphaチャンネルをマスクとして使用
-                    img = bg
-                elif img.mode == 'P': # パレットモードの場合もRGBに変換
-                    img = img.convert('RGB')
-                elif img.mode != 'RGB': # その他のモードもRGBに試みる
-                    img = img.convert('RGB')
-
-
-                img.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
-
-                # アスペクト比を保ったまま中央に配置するための背景を作成
-                bg_color = (255, 255, 255) # 白色背景
-                final_thumb = Image.new('RGB', (max_width, max_height), bg_color)
-                paste_x = (max_width - img.width) // 2
-                paste_y = (max_height - img.height) // 2
-                final_thumb.paste(img, (paste_x, paste_y))
-
-                # Tkinterで表示できる形式に変換し、参照を保持
-                tk_thumb = ImageTk.PhotoImage(final_thumb)
-                self.thumbnail_image_objects[img_path] = tk_thumb # 参照を保持
-
-                # --- ウィジェット作成 ---
-                item_frame = ttk.Frame(self.thumbnails_frame, padding=padding)
-
-                # チェックボックス
-                check_var = tk.BooleanVar()
-                # 以前のチェック状態を復元
-                if filename in self.checked_state:
-                    check_var.set(self.checked_state[filename])
-                else:
-                    check_var.set(False) # デフォルトはオフ
-                checkbutton = ttk.Checkbutton(item_frame, variable=check_var,
-                                              command=lambda f=filename, v=check_var, p=img_path: self._on_check_change(f, v, p)) # pathも渡す
-
-                # サムネイル画像ラベル
-                img_label = ttk.Label(item_frame, image=tk_thumb, anchor=tk.CENTER)
-                img_label.bind("<Button-1>", lambda e, p=img_path: self._on_thumbnail_click(p))
-
-                # ファイル名ラベル
-                name_label = ttk.Label(item_frame, text=filename, wraplength=max_width, justify=tk.CENTER) # 折り返し
-
-                # 配置
-                checkbutton.pack(side=tk.TOP)
-                img_label.pack(side=tk.TOP)
-                name_label.pack(side=tk.TOP, fill=tk.X)
-
-                # グリッド配置
-                item_frame.grid(row=row, column=col, padx=padding, pady=padding, sticky="nsew")
-
-                # ウィジェット情報を保存 (ファイル名をキーにする方が状態管理と整合性が取れる)
-                self.thumbnail_widgets[filename] = { # キーをfilenameに変更
-                    'frame': item_frame,
-                    'label': img_label,
-                    'check_var': check_var,
-                    'checkbutton': checkbutton,
-                    'path': img_path # パス情報も保持
-                }
-
-                col += 1
-                if col >= items_per_row:
-                    col = 0
-                    row += 1
+        # 読み込みが終わるまで表示する空の画像（レイアウトが崩れないようにサムネイルと同じ大きさ）
+        self.thumbnail_placeholder = tk.PhotoImage(width=max_width, height=max_height)
+        generation = self.thumbnail_generation
 
-            except Exception as e:
-                print(f"Error processing thumbnail for {img_path}: {e}") # コンソールにエラー出力
-                # エラーが発生した画像のプレースホルダーを表示することも検討
+        for img_path, filename in self.image_files:
+            # --- ウィジェット作成 ---
+            item_frame = ttk.Frame(self.thumbnails_frame, padding=padding)
+
+            # チェックボックス
+            check_var = tk.BooleanVar()
+            # 以前のチェック状態を復元
+            if filename in self.checked_state:
+                check_var.set(self.checked_state[filename])
+            else:
+                check_var.set(False) # デフォルトはオフ
+            checkbutton = ttk.Checkbutton(item_frame, variable=check_var,
+                                          command=lambda f=filename, v=check_var, p=img_path: self._on_check_change(f, v, p)) # pathも渡す
+
+            # サムネイル画像ラベル（画像はワーカーの結果が届いたら差し替える）
+            img_label = ttk.Label(item_frame, image=self.thumbnail_placeholder, anchor=tk.CENTER, compound=tk.CENTER)
+            img_label.bind("<Button-1>", lambda e, p=img_path: self._on_thumbnail_click(p))
+            img_label.bind("<Enter>", lambda e, p=img_path: self._on_thumbnail_hover(p)) # プレビューを先読み
+
+            # ファイル名ラベル
+            name_label = ttk.Label(item_frame, text=filename, wraplength=max_width, justify=tk.CENTER) # 折り返し
+
+            # 配置
+            checkbutton.pack(side=tk.TOP)
+            img_label.pack(side=tk.TOP)
+            name_label.pack(side=tk.TOP, fill=tk.X)
+
+            # グリッド配置
+            item_frame.grid(row=row, column=col, padx=padding, pady=padding, sticky="nsew")
+
+            # ウィジェット情報を保存 (ファイル名をキーにする方が状態管理と整合性が取れる)
+            self.thumbnail_widgets[filename] = { # キーをfilenameに変更
+                'frame': item_frame,
+                'label': img_label,
+                'check_var': check_var,
+                'checkbutton': checkbutton,
+                'path': img_path # パス情報も保持
+            }
+
+            # --- サムネイル作成をワーカーに依頼 ---
+            future = self.thumbnail_executor.submit(make_thumbnail_buffer, img_path, thumb_size)
+            future.add_done_callback(lambda f, fname=filename: self._on_thumbnail_done(generation, fname, thumb_size, f))
+            self.thumbnail_futures.append(future)
+
+            col += 1
+            if col >= items_per_row:
+                col = 0
+                row += 1
+
+        self.thumbnail_pending = len(self.thumbnail_futures)
+        if self.thumbnail_poll_id is None:
+            self._poll_thumbnail_results()
 
         # スクロール領域を再計算
         self.thumbnails_frame.update_idletasks() # ウィジェットの配置を確定
@@ -395,108 +969,208 @@ class ImageCheckerApp(tk.Tk):
         else: # サムネイルがない場合
              self.thumbnail_canvas.configure(scrollregion=(0,0,0,0))
 
+    def _cancel_thumbnail_jobs(self):
+        """読み込み中のサムネイル作成を取り消す (届いた結果も世代番号で破棄される)"""
+        self.thumbnail_generation += 1
+        for future in self.thumbnail_futures:
+            future.cancel()
+        self.thumbnail_futures = []
+        self.thumbnail_pending = 0
+
+    def _on_thumbnail_done(self, generation, filename, thumb_size, future):
+        """ワーカーでのサムネイル作成完了 (ワーカースレッドから呼ばれるので結果をキューに積むだけ)"""
+        if not future.cancelled():
+            self.thumbnail_results.put((generation, filename, thumb_size, future))
+
+    def _poll_thumbnail_results(self):
+        """届いたサムネイルをウィジェットに反映する (メインスレッドで定期的に実行)"""
+        self.thumbnail_poll_id = None
+        applied = 0
+        while applied < THUMBNAIL_APPLY_PER_TICK:
+            try:
+                generation, filename, thumb_size, future = self.thumbnail_results.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self.thumbnail_generation:
+                continue # 別のフォルダを選択する前の結果は捨てる
+            applied += 1
+            self.thumbnail_pending -= 1
+
+            widget_dict = self.thumbnail_widgets.get(filename)
+            if widget_dict is None:
+                continue
+            try:
+                img = Image.frombytes('RGB', thumb_size, future.result())
+                tk_thumb = ImageTk.PhotoImage(img)
+                self.thumbnail_image_objects[widget_dict['path']] = tk_thumb # 参照を保持
+                widget_dict['label'].config(image=tk_thumb)
+            except Exception as e:
+                print(f"Error processing thumbnail for {widget_dict['path']}: {e}") # コンソールにエラー出力
+                widget_dict['label'].config(text="読込エラー")
+
+        if self.thumbnail_pending > 0:
+            total = len(self.thumbnail_futures)
+            self.status_bar.config(text=f"サムネイル読み込み中... ({total - self.thumbnail_pending}/{total})")
+            self.thumbnail_poll_id = self.after(THUMBNAIL_POLL_INTERVAL_MS, self._poll_thumbnail_results)
+        elif applied:
+            self.status_bar.config(text=f"{len(self.image_files)} 個の画像ファイルを読み込みました: {self.current_folder.get()}")
+
+    def _on_close(self):
+        """ウィンドウを閉じるときに読み込み中のサムネイルを取り消す"""
+        self._cancel_thumbnail_jobs()
+        self.thumbnail_executor.shutdown(wait=False, cancel_futures=True)
+        self.tree_executor.shutdown(wait=False, cancel_futures=True)
+        self.preview_executor.shutdown(wait=False, cancel_futures=True)
+        self._flush_checked_state() # 未保存のチェック状態を書き込む
+        self.destroy()
+
 
     def _on_thumbnail_click(self, img_path):
         """サムネイルクリック時の処理 (プレビュー表示)"""
         self.selected_image_path.set(img_path)
         self._update_preview_image()
 
+    def _on_thumbnail_hover(self, img_path):
+        """カーソルが乗ったサムネイルのプレビューを先に作成しておく"""
+        key = self._preview_key(img_path)
+        if key is None:
+            return
+        if self.preview_hover_key not in (None, key, self.preview_request):
+            self._cancel_preview(self.preview_hover_key) # まだ始まっていなければ取り消す
+        self.preview_hover_key = key
+        self._request_preview(key)
+
+    def _preview_key(self, img_path):
+        """プレビューキャッシュのキー (パス, 更新日時, 表示サイズ) を返す (未配置などで決まらなければ None)"""
+        preview_width = self.preview_label.winfo_width()
+        preview_height = self.preview_label.winfo_height()
+        if preview_width <= 1 or preview_height <= 1: # ウィジェットがまだ描画されていない場合
+            return None
+        try:
+            mtime = os.stat(img_path).st_mtime_ns
+        except OSError:
+            return None
+        return (img_path, mtime, (preview_width, preview_height))
+
+    def _request_preview(self, key):
+        """プレビュー画像の作成をワーカーに依頼する (作成済み・作成中なら何もしない)"""
+        # 完了済みの依頼を整理 (結果はキャッシュに入っている)
+        for done_key in [k for k, f in self.preview_futures.items() if f.done() and k != self.preview_request]:
+            del self.preview_futures[done_key]
+        if key in self.preview_futures or self.preview_cache.get(key) is not None:
+            return
+        img_path, _, target_size = key
+        future = self.preview_executor.submit(render_preview, img_path, target_size)
+        future.add_done_callback(lambda f: self._on_preview_done(key, f))
+        self.preview_futures[key] = future
+
+    def _on_preview_done(self, key, future):
+        """プレビュー作成完了 (ワーカースレッドから呼ばれるのでキャッシュに入れるだけ)"""
+        if not future.cancelled() and future.exception() is None:
+            self.preview_cache.put(key, future.result())
+
+    def _cancel_preview(self, key):
+        """まだ始まっていないプレビュー作成を取り消す"""
+        future = self.preview_futures.get(key)
+        if future is not None and future.cancel():
+            del self.preview_futures[key]
+
     def _update_preview_image(self, event=None):
-        """プレビュー画像を更新する"""
+        """プレビュー画像を更新する (キャッシュになければワーカーで作成し、完成したら表示する)"""
         img_path = self.selected_image_path.get()
         if not img_path or not os.path.exists(img_path):
             self.preview_label.config(image=None, text="画像を選択してください")
             self.preview_image_object = None
             return
 
-        try:
-            # プレビューエリアのサイズを取得
-            preview_width = self.preview_label.winfo_width()
-            preview_height = self.preview_label.winfo_height()
-
-            if preview_width <= 1 or preview_height <= 1: # ウィジェットがまだ描画されていない場合
-                # 少し待ってから再試行
-                self.after(50, self._update_preview_image)
-                return
-
-            img = Image.open(img_path)
-            img_copy = img.copy() # 元の画像を保持
+        # プレビューエリアのサイズが決まっていなければ何もしない (配置後の <Configure> で再度呼ばれる)
+        key = self._preview_key(img_path)
+        if key is None:
+            return
 
-            # アスペクト比を維持してリサイズ
-            img_copy.thumbnail((preview_width, preview_height), Image.Resampling.LANCZOS)
+        if self.preview_request not in (None, key, self.preview_hover_key):
+            self._cancel_preview(self.preview_request) # 前に選択した画像・サイズの作成は不要
+        img = self.preview_cache.get(key)
+        if img is not None:
+            self.preview_request = None
+            self._show_preview(img)
+            return
 
-            # ImageTkオブジェクトを作成し、参照を保持
-            self.preview_image_object = ImageTk.PhotoImage(img_copy)
-            self.preview_label.config(image=self.preview_image_object, text="") # テキストをクリア
+        self.preview_request = key
+        self._request_preview(key)
+        if self.preview_poll_id is None:
+            self.preview_poll_id = self.after(PREVIEW_POLL_INTERVAL_MS, self._poll_preview)
+
+    def _poll_preview(self):
+        """依頼したプレビューが完成していれば表示する (メインスレッドで定期的に実行)"""
+        self.preview_poll_id = None
+        key = self.preview_request
+        future = self.preview_futures.get(key)
+        if key is None or future is None:
+            return
+        if not future.done():
+            self.preview_poll_id = self.after(PREVIEW_POLL_INTERVAL_MS, self._poll_preview)
+            return
 
+        self.preview_request = None
+        del self.preview_futures[key]
+        try:
+            self._show_preview(future.result())
         except Exception as e:
-            messagebox.showerror("プレビューエラー", f"画像のプレビュー表示に失敗しました:\n{img_path}\n{e}")
+            messagebox.showerror("プレビューエラー", f"画像のプレビュー表示に失敗しました:\n{key[0]}\n{e}")
             self.preview_label.config(image=None, text="プレビューエラー")
             self.preview_image_object = None
 
+    def _show_preview(self, img):
+        """プレビュー画像を表示する"""
+        # ImageTkオブジェクトを作成し、参照を保持
+        self.preview_image_object = ImageTk.PhotoImage(img)
+        self.preview_label.config(image=self.preview_image_object, text="") # テキストをクリア
+
+
     def _on_check_change(self, filename, var, path): # path引数を追加
         """チェックボックスの状態が変更されたときの処理"""
-        self.checked_state[filename] = var.get()
-        # thumbnail_widgetsのキーもfilenameに変更したため、整合性が取れる
-        self._save_checked_state() # 変更を即座に保存
+        self.check_store.set_many([filename], var.get())
+        self._save_checked_state() # 変更はまとめて保存する
 
     def _save_checked_state(self):
-        """現在のチェック状態をJSONファイルに保存"""
-        folder_path = self.current_folder.get()
-        if not folder_path or not os.path.isdir(folder_path):
-            return
+        """チェック状態の保存を予約する (続けて変更された場合はまとめて書き込む)"""
+        if self.check_flush_id is None:
+            self.check_flush_id = self.after(CHECK_STATE_FLUSH_MS, self._flush_checked_state)
 
-        json_path = os.path.join(folder_path, CHECK_STATE_FILENAME)
-        try:
-            # self.checked_stateを直接保存する
-            with open(json_path, 'w', encoding='utf-8') as f:
-                json.dump(self.checked_state, f, indent=4)
-        except Exception as e:
-            print(f"Error saving check state to {json_path}: {e}") # コンソールにエラー出力
+    def _flush_checked_state(self):
+        """予約されたチェック状態の変更を書き込む"""
+        if self.check_flush_id is not None:
+            self.after_cancel(self.check_flush_id)
+            self.check_flush_id = None
+        self.check_store.flush()
 
     def _load_checked_state(self):
-        """JSONファイルからチェック状態を読み込む"""
+        """チェック状態を読み込む (前のフォルダの未保存の変更は先に書き込む)"""
+        self._flush_checked_state()
         folder_path = self.current_folder.get()
-        self.checked_state = {} # 読み込み前にリセット
-        if not folder_path or not os.path.isdir(folder_path):
-            return
+        self.check_store = CheckStateStore(folder_path if folder_path and os.path.isdir(folder_path) else None)
+        self.checked_state = self.check_store.load({fname for _, fname in self.image_files})
 
-        json_path = os.path.join(folder_path, CHECK_STATE_FILENAME)
-        if os.path.exists(json_path):
-            try:
-                with open(json_path, 'r', encoding='utf-8') as f:
-                    loaded_state = json.load(f)
-                    # ファイル名が存在するか確認しながら読み込む
-                    current_filenames = {fname for _, fname in self.image_files}
-                    self.checked_state = {fname: state
-                                          for fname, state in loaded_state.items()
-                                          if fname in current_filenames}
-
-            except Exception as e:
-                print(f"Error loading check state from {json_path}: {e}") # コンソールにエラー出力
-                self.checked_state = {} # エラー時はリセット
+    def _set_all_checked(self, checked):
+        """全ての画像のチェック状態を一括で変更し、表示は変わったものだけ反映する"""
+        changed = [fname for _, fname in self.image_files if self.checked_state.get(fname, False) != checked]
+        if not changed:
+            return
+        self.check_store.set_many(changed, checked)
+        for filename in changed:
+            widget_dict = self.thumbnail_widgets.get(filename)
+            if widget_dict is not None:
+                widget_dict['check_var'].set(checked)
+        self._save_checked_state()
 
     def _check_all(self):
         """表示されている全てのサムネイルをチェック"""
-        changed = False
-        for filename, data in self.thumbnail_widgets.items():
-            if not data['check_var'].get():
-                data['check_var'].set(True)
-                self.checked_state[filename] = True # filenameをキーにする
-                changed = True
-        if changed:
-            self._save_checked_state()
+        self._set_all_checked(True)
 
     def _uncheck_all(self):
         """表示されている全てのサムネイルのチェックを解除"""
-        changed = False
-        for filename, data in self.thumbnail_widgets.items():
-            if data['check_var'].get():
-                data['check_var'].set(False)
-                self.checked_state[filename] = False # filenameをキーにする
-                changed = True
-        if changed:
-            self._save_checked_state()
+        self._set_all_checked(False)
 
     def _get_checked_files(self):
         """チェックされているファイルのフルパスリストを取得"""
@@ -563,6 +1237,7 @@ class ImageCheckerApp(tk.Tk):
              self.status_bar.config(text="コピー処理がキャンセルまたはエラーで中断されました。")
         else:
              self.status_bar.config(text="選択されたファイルのコピーが完了しました。")
+        self._refresh_dir_metadata(dest_folder) # ツリーの画像数を更新
 
 
     def _move_checked(self):
@@ -632,7 +1307,7 @@ class ImageCheckerApp(tk.Tk):
             # 内部リストから削除
             self.image_files = [(p, f) for p, f in self.image_files if p not in moved_paths]
             # チェック状態から削除
-            self.checked_state = {fname: state for fname, state in self.checked_state.items() if fname not in moved_filenames}
+            self.check_store.remove(moved_filenames)
             # サムネイルウィジェットから削除 (filename をキーに)
             for moved_fname in moved_filenames:
                  if moved_fname in self.thumbnail_widgets:
@@ -648,6 +1323,10 @@ class ImageCheckerApp(tk.Tk):
             self._update_thumbnails_display() # 再描画
             self._save_checked_state() # チェック状態の変更を保存
 
+            # ツリーの画像数を更新
+            self._refresh_dir_metadata(src_folder)
+            self._refresh_dir_metadata(dest_folder)
+
         if cancel_operation:
              self.status_bar.config(text="移動処理がキャンセルまたはエラーで中断されました。")
         else:
@@ -987,222 +1666,174 @@ class ProcessDialog(tk.Toplevel):
 
 
         # --- 処理実行 ---
-        num_processed = 0
-        num_errors = 0
-        current_num = start_num
-
-        # 処理中はボタンを無効化
+        options = {
+            'do_convert': do_convert, 'convert_format': convert_format,
+            'do_resize': do_resize, 'resize_mode': resize_mode, 'resize_w': resize_w, 'resize_h': resize_h,
+            'do_fill': do_fill, 'fill_x1': fill_x1, 'fill_y1': fill_y1, 'fill_x2': fill_x2, 'fill_y2': fill_y2,
+            'fill_color_rgb': fill_color_rgb,
+        }
+        self.output_folder = output_folder
+        self.do_rename = do_rename
+        self.prefix = prefix
+        self.digits = digits
+        self.current_num = start_num
+        self.num_processed = 0
+        self.num_errors = 0
+        self.next_index = 0
+        self.cancel_requested = False
+
+        # 処理中は実行ボタンを無効化し、キャンセルボタンを中止に使う
         self.run_button.config(state=tk.DISABLED)
-        self.cancel_button.config(state=tk.DISABLED) # キャンセル機能は未実装のため無効化のまま
+        self.cancel_button.config(text="中止", command=self._cancel_processing)
+        self.protocol("WM_DELETE_WINDOW", self._cancel_processing)
 
         self.progress_var.set(0) # プログレスバーをリセット
 
-        # update()を呼ぶと後続の処理が実行されないことがあるため、afterを使う
-        self.after(10, self._process_batch, output_folder, do_rename, prefix, start_num, digits,
-                   do_convert, convert_format, do_resize, resize_mode, resize_w, resize_h,
-                   do_fill, fill_x1, fill_y1, fill_x2, fill_y2, fill_color_rgb,
-                   0, num_processed, num_errors, current_num) # インデックス0から開始
+        # 全ファイルをワーカープロセスに投入し、結果はファイル順に回収する
+        # 出力は一時ファイル名で書き出し、回収時に連番などの最終的な名前へリネームする
+        self.executor = ProcessPoolExecutor(max_workers=PROCESS_WORKERS)
+        self.futures = []
+        for index, src_path in enumerate(self.file_paths):
+            temp_base = os.path.join(output_folder, f".tkviewer_tmp_{os.getpid()}_{index}")
+            self.futures.append(self.executor.submit(process_image_file, src_path, temp_base, options))
+        self.after(PROCESS_POLL_INTERVAL_MS, self._process_batch)
+
+
+    def _cancel_processing(self):
+        """実行中の処理を中止する (実行中のファイルは完了を待って破棄する)"""
+        if self.cancel_requested:
+            return
+        self.cancel_requested = True
+        self.cancel_button.config(state=tk.DISABLED)
+        self.parent.status_bar.config(text="処理を中止しています...")
+        for future in self.futures[self.next_index:]:
+            future.cancel()
+
+
+    def _process_batch(self):
+        """ワーカーの結果をファイル順に回収し、進捗を更新する (メインスレッドで定期的に実行)"""
+        total = len(self.file_paths)
+        while self.next_index < total and self.futures[self.next_index].done():
+            index = self.next_index
+            future = self.futures[index]
+            self.next_index += 1
+            if future.cancelled():
+                continue
+            src_path = self.file_paths[index]
+            try:
+                temp_path, output_extension = future.result()
+            except Exception as e:
+                self.num_errors += 1
+                print(f"Error processing {src_path}: {e}") # コンソールにエラー出力
+                continue # エラーが発生したファイルはスキップして次に進む
+
+            if self.cancel_requested:
+                os.remove(temp_path) # 中止後に完了したファイルは破棄する
+                continue
+
+            # 出力ファイル名の決定 (連番は成功したファイルにだけ順番に振る)
+            if self.do_rename:
+                output_filename_base = f"{self.prefix}{str(self.current_num).zfill(self.digits)}"
+            else:
+                output_filename_base = os.path.splitext(os.path.basename(src_path))[0]
+            output_path = os.path.join(self.output_folder, f"{output_filename_base}{output_extension}")
+            try:
+                os.replace(temp_path, output_path)
+            except OSError as e:
+                self.num_errors += 1
+                print(f"Error processing {src_path}: {e}")
+                os.remove(temp_path)
+                continue
+            self.num_processed += 1
+            if self.do_rename:
+                self.current_num += 1 # 成功した場合のみ番号を進める
+
+        # プログレスバー更新
+        self.progress_var.set(self.next_index)
+        if self.next_index < total:
+            if not self.cancel_requested:
+                self.parent.status_bar.config(text=f"処理中: {self.next_index} / {total} - {os.path.basename(self.file_paths[self.next_index])}")
+            self.after(PROCESS_POLL_INTERVAL_MS, self._process_batch)
+            return
 
+        self.executor.shutdown(wait=False)
+        self._finish_processing()
 
-    def _process_batch(self, output_folder, do_rename, prefix, start_num, digits,
-                       do_convert, convert_format, do_resize, resize_mode, resize_w, resize_h,
-                       do_fill, fill_x1, fill_y1, fill_x2, fill_y2, fill_color_rgb,
-                       index, num_processed, num_errors, current_num):
-        """ファイル処理を1つずつ実行し、UIを更新する"""
 
-        if index >= len(self.file_paths):
-            # --- 全ての処理完了 ---
+    def _finish_processing(self):
+        """全ファイルの処理完了 (または中止) 後の処理"""
+        output_folder = self.output_folder
+        if self.cancel_requested:
+            self.parent.status_bar.config(text="処理を中止しました")
+            messagebox.showinfo("処理中止",
+                                f"処理を中止しました。\n"
+                                f"成功: {self.num_processed} ファイル\n"
+                                f"エラー: {self.num_errors} ファイル\n"
+                                f"出力先: {output_folder}",
+                                parent=self)
+        else:
             self.parent.status_bar.config(text="処理完了")
             messagebox.showinfo("処理完了",
                                 f"処理が完了しました。\n"
-                                f"成功: {num_processed} ファイル\n"
-                                f"エラー: {num_errors} ファイル\n"
+                                f"成功: {self.num_processed} ファイル\n"
+                                f"エラー: {self.num_errors} ファイル\n"
                                 f"出力先: {output_folder}",
                                 parent=self)
 
-            # 実行ボタンなどを再度有効化
-            self.run_button.config(state=tk.NORMAL)
-            self.cancel_button.config(state=tk.NORMAL)
-
-            # ダイアログを閉じる前に、メインウィンドウのサムネイルを更新するかどうか尋ねる
-            if messagebox.askyesno("確認", "メインウィンドウの表示を更新しますか？\n(処理結果を反映します)", parent=self):
-                # 出力先が現在のフォルダと同じかサブフォルダの場合のみ更新を提案するのが親切かも
-                current_view_folder = self.parent.current_folder.get()
-                should_refresh = False
-                if current_view_folder:
-                    abs_output = os.path.abspath(output_folder)
-                    abs_current = os.path.abspath(current_view_folder)
-                    # 出力先が現在のフォルダ、またはその親フォルダの場合にリフレッシュを促す
-                    if abs_output == abs_current or abs_current.startswith(abs_output + os.sep):
-                         should_refresh = True
-                    # 出力先が現在のフォルダのサブフォルダの場合もリフレッシュが必要な場合がある
-                    elif abs_output.startswith(abs_current + os.sep):
-                         should_refresh = True # Treeviewの更新が必要になる
-
-                if should_refresh:
-                    self.parent._load_images() # 現在のフォルダを再読み込み
-                    self.parent._load_checked_state() # チェック状態も再読み込み
-                    self.parent._update_thumbnails_display()
-                    # 必要であればツリービューも更新 (フォルダ構成が変わった場合)
-                    # self.parent._populate_tree(self.parent.root_folder_path) # ルートから再構築
-                else:
-                     print("表示中のフォルダ外への出力のため、自動更新はスキップされました。")
+        # 実行ボタンなどを再度有効化
+        self.run_button.config(state=tk.NORMAL)
+        self.cancel_button.config(state=tk.NORMAL)
+
+        # ダイアログを閉じる前に、メインウィンドウのサムネイルを更新するかどうか尋ねる
+        if self.num_processed and messagebox.askyesno("確認", "メインウィンドウの表示を更新しますか？\n(処理結果を反映します)", parent=self):
+            # 出力先が現在のフォルダと同じかサブフォルダの場合のみ更新を提案するのが親切かも
+            current_view_folder = self.parent.current_folder.get()
+            should_refresh = False
+            if current_view_folder:
+                abs_output = os.path.abspath(output_folder)
+                abs_current = os.path.abspath(current_view_folder)
+                # 出力先が現在のフォルダ、またはその親フォルダの場合にリフレッシュを促す
+                if abs_output == abs_current or abs_current.startswith(abs_output + os.sep):
+                     should_refresh = True
+                # 出力先が現在のフォルダのサブフォルダの場合もリフレッシュが必要な場合がある
+                elif abs_output.startswith(abs_current + os.sep):
+                     should_refresh = True # Treeviewの更新が必要になる
+
+            if should_refresh:
+                self.parent._load_images() # 現在のフォルダを再読み込み
+                self.parent._load_checked_state() # チェック状態も再読み込み
+                self.parent._update_thumbnails_display()
+                # 必要であればツリービューも更新 (フォルダ構成が変わった場合)
+                # self.parent._populate_tree(self.parent.root_folder_path) # ルートから再構築
+            else:
+                 print("表示中のフォルダ外への出力のため、自動更新はスキップされました。")
+        self.parent._refresh_dir_metadata(output_folder) # ツリーの画像数を更新
 
+        self.destroy() # ダイアログを閉じる
 
-            self.destroy() # ダイアログを閉じる
-            return
 
+# --- アプリケーションの実行 ---
+def build_arg_parser():
+    """コマンドライン引数の定義"""
+    parser = argparse.ArgumentParser(description="画像チェック・管理ツール（引数なしでGUIを起動）")
+    subparsers = parser.add_subparsers(dest='command')
 
-        # --- 1ファイルの処理 ---
-        src_path = self.file_paths[index]
-        self.parent.status_bar.config(text=f"処理中: {index + 1} / {len(self.file_paths)} - {os.path.basename(src_path)}")
-        # self.update_idletasks() # afterを使っているので不要かも
+    bench = subparsers.add_parser('benchmark-process', help="従来の変換手順とモード変換を最小限にした手順を比較")
+    bench.add_argument('images', nargs='*', help="計測する画像（省略時は20MPのPNGを生成）")
+    bench.add_argument('--count', type=int, default=3, help="生成する画像の枚数")
+    return parser
 
-        error_occurred = False
-        try:
-            img = Image.open(src_path)
-            original_format = img.format # 元のフォーマットを保持 (PillowがNoneを返す場合もある)
-
-            # モード変換: 透過を扱う可能性のある処理(PNG変換、塗りつぶし)があればRGBA、なければRGB
-            needs_alpha = (do_convert and convert_format == 'png') or do_fill
-            target_mode = "RGBA" if needs_alpha else "RGB"
-
-            # JPEGなどアルファチャンネルを持てない形式で、かつアルファが必要な処理がない場合
-            if img.mode == 'RGBA' and not needs_alpha and convert_format != 'png':
-                 # 背景を白色で合成してRGBにする
-                 bg = Image.new('RGB', img.size, (255, 255, 255))
-                 bg.paste(img, mask=img.split()[3]) # alphaチャンネルをマスクとして使用
-                 img = bg
-            elif img.mode != target_mode:
-                 # 必要なモードに変換 (Pモードなども考慮)
-                 try:
-                     img = img.convert(target_mode)
-                 except ValueError: # 変換できない場合 (例: モノクロ画像をRGBAに)
-                      # 一旦RGBに変換してからRGBAに試みるなど、より丁寧な処理が可能
-                      img = img.convert("RGB").convert(target_mode)
-
-
-            # 1. リサイズ (リサイズする場合、他の処理より先に行うことが多い)
-            if do_resize:
-                img_w, img_h = img.size
-                if resize_mode == "scale":
-                    img.thumbnail((resize_w, resize_h), Image.Resampling.LANCZOS)
-                elif resize_mode == "fixed":
-                    img = img.resize((resize_w, resize_h), Image.Resampling.LANCZOS)
-                elif resize_mode == "crop":
-                    target_aspect = resize_w / resize_h
-                    img_aspect = img_w / img_h
-
-                    if img_aspect > target_aspect: # 画像が横長すぎる -> 幅をトリミング
-                        new_width = int(target_aspect * img_h)
-                        offset = (img_w - new_width) // 2
-                        img = img.crop((offset, 0, offset + new_width, img_h))
-                    else: # 画像が縦長すぎる -> 高さをトリミング
-                        new_height = int(img_w / target_aspect)
-                        offset = (img_h - new_height) // 2
-                        img = img.crop((0, offset, img_w, offset + new_height))
-                    # 目標サイズにリサイズ
-                    img = img.resize((resize_w, resize_h), Image.Resampling.LANCZOS)
-
-            # 2. 領域塗りつぶし
-            if do_fill:
-                # RGBAモードでないと透過色での塗りができない場合があるため、モードを確認
-                if img.mode != 'RGBA':
-                    img = img.convert('RGBA') # 必要ならRGBAに変換
-                draw = ImageDraw.Draw(img)
-                # 座標が画像の範囲内にあることを確認 (クリッピング)
-                x1 = max(0, fill_x1)
-                y1 = max(0, fill_y1)
-                x2 = min(img.width, fill_x2)
-                y2 = min(img.height, fill_y2)
-                if x1 < x2 and y1 < y2: # 有効な領域がある場合のみ描画
-                    # fill_color_rgb にアルファ値を追加する必要があるか？
-                    # ImageDraw.rectangle は fill タプルにアルファ値を含められる
-                    # 簡単のため、ここでは不透明色のみを想定
-                    draw.rectangle([x1, y1, x2, y2], fill=fill_color_rgb) # fill_color_rgbはRGBタプル
-
-
-            # 3. 出力ファイル名と形式の決定
-            base_filename = os.path.splitext(os.path.basename(src_path))[0]
-            if do_rename:
-                num_str = str(current_num).zfill(digits)
-                output_filename_base = f"{prefix}{num_str}"
-                # current_num は次の呼び出しのためにインクリメントしておく
-            else:
-                output_filename_base = base_filename
 
-            if do_convert:
-                output_extension = f".{convert_format.lower()}"
-            else:
-                # 元の拡張子を使うか、Pillowが判定した形式を使う
-                ext = os.path.splitext(src_path)[1]
-                if ext:
-                    output_extension = ext.lower()
-                elif original_format:
-                    output_extension = f".{original_format.lower()}"
-                else:
-                    output_extension = ".jpg" # デフォルト
-
-            output_filename = f"{output_filename_base}{output_extension}"
-            output_path = os.path.join(output_folder, output_filename)
-
-            # 4. 保存
-            save_options = {}
-            fmt = output_extension.lstrip('.').upper()
-            save_format = fmt # Pillowに渡すフォーマット名
-            if fmt == 'JPG':
-                 save_format = 'JPEG'
-                 save_options['quality'] = 95 # 高品質
-                 # JPEGは透過をサポートしないため、RGBモードに変換
-                 if img.mode == 'RGBA':
-                      # 透過部分を白色背景で合成
-                      bg = Image.new('RGB', img.size, (255, 255, 255))
-                      bg.paste(img, mask=img.split()[3])
-                      img = bg
-                 elif img.mode != 'RGB':
-                     img = img.convert('RGB')
-
-            elif fmt == 'PNG':
-                 save_options['optimize'] = True
-                 # PNGは透過をサポートするのでRGBAのままでOK
-                 if img.mode != 'RGBA':
-                      # 透過情報がない場合でも、互換性のためRGBAに変換しておく方が安全な場合も
-                      # img = img.convert('RGBA')
-                      pass # RGBのままでも保存は可能
-
-            elif fmt == 'BMP':
-                 # BMPは通常RGBだが、透過BMP(RGBA)もある。Pillowの挙動に依存。
-                 # 安全のためRGBに変換しておく
-                 if img.mode != 'RGB':
-                      img = img.convert('RGB')
-
-
-            # 上書き確認 (ここでも行う場合) - シンプルにするため省略
-            # 同名ファイルが存在する場合の処理はダイアログで一括指定する方がUIが良いかも
-
-            img.save(output_path, format=save_format, **save_options)
-            num_processed += 1
-            if do_rename:
-                current_num += 1 # 成功した場合のみ番号を進める
+def main():
+    args = build_arg_parser().parse_args()
 
-        except Exception as e:
-            num_errors += 1
-            error_occurred = True
-            print(f"Error processing {src_path}: {e}") # コンソールにエラー出力
-            # エラーが発生したファイルはスキップして次に進む
-
-        # プログレスバー更新
-        self.progress_var.set(index + 1)
-        # self.update_idletasks() # afterを使っているので不要かも
+    if args.command == 'benchmark-process':
+        benchmark_process_pipeline(args.images, args.count)
+        return
 
-        # 次のファイルを処理するために再帰的に呼び出す
-        self.after(10, self._process_batch, output_folder, do_rename, prefix, start_num, digits,
-                   do_convert, convert_format, do_resize, resize_mode, resize_w, resize_h,
-                   do_fill, fill_x1, fill_y1, fill_x2, fill_y2, fill_color_rgb,
-                   index + 1, num_processed, num_errors, current_num)
+    app = ImageCheckerApp()
+    app.mainloop()
 
 
-# --- アプリケーションの実行 ---
 if __name__ == "__main__":
-    app = ImageCheckerApp()
-    app.mainloop()
+    main()